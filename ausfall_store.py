@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Ausfall-Store
+Speicher für bereits gemeldete Ausfälle: JSON-Datei (bisheriges Format)
+oder eingebettete SQLite-Datenbank, beide mit Ablauf vergangener Tage
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+from typing import Iterable, Optional, Set
+
+from state_writer import StateWriter, atomic_write_json
+
+SQLITE_ENDUNGEN = ('.db', '.sqlite', '.sqlite3')
+
+
+def datum_aus_id(ausfall_id: str) -> Optional[str]:
+    """
+    Liest das Datum aus einer Ausfall-ID ("01.12.2025_3_Nie")
+
+    Returns:
+        str: Datum im ISO-Format ("2025-12-01") oder None
+    """
+    try:
+        return datetime.strptime(ausfall_id.split('_', 1)[0], '%d.%m.%Y').date().isoformat()
+    except ValueError:
+        return None
+
+
+def ohne_abgelaufene(ids: Iterable[str], heute: date = None) -> Set[str]:
+    """
+    Entfernt die IDs, deren Datum vor heute liegt
+
+    IDs ohne lesbares Datum bleiben erhalten (wie im SQLite-Speicher).
+
+    Returns:
+        set: IDs von heute und später
+    """
+    heute = (heute or date.today()).isoformat()
+    # Viele IDs teilen sich ein Datum - jedes nur einmal parsen
+    aktuell = {}
+    def gilt(ausfall_id: str) -> bool:
+        prefix = ausfall_id.split('_', 1)[0]
+        if prefix not in aktuell:
+            aktuell[prefix] = (datum_aus_id(ausfall_id) or heute) >= heute
+        return aktuell[prefix]
+    return {ausfall_id for ausfall_id in ids if gilt(ausfall_id)}
+
+
+class JsonAusfallStore:
+    """
+    Bisheriges Format: alle IDs als Liste in einer JSON-Datei,
+    IDs vergangener Tage fallen beim Laden und Speichern weg
+    """
+
+    def __init__(self, path: str, writer: StateWriter = None):
+        """
+        Args:
+            path: Pfad zur JSON-Datei
+            writer: Optionaler StateWriter - dann wird im Hintergrund
+                geschrieben, sonst sofort (beides atomar)
+        """
+        self.path = path
+        self.writer = writer
+
+    def load(self) -> Set[str]:
+        """Lädt alle bekannten Ausfall-IDs von heute und später"""
+        if not os.path.exists(self.path):
+            return set()
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                return ohne_abgelaufene(data.get('ausfaelle', []))
+        except Exception as e:
+            print(f"⚠️  Warnung: Fehler beim Laden von {self.path}: {e}")
+            return set()
+
+    def save(self, known_ausfaelle: Set[str], neue_ids: Iterable[str]):
+        """Schreibt die komplette Menge ohne abgelaufene IDs (das JSON-Format kennt kein Anhängen)"""
+        try:
+            data = {
+                'ausfaelle': list(ohne_abgelaufene(known_ausfaelle)),
+                'letzte_aktualisierung': datetime.now().isoformat()
+            }
+            if self.writer is not None:
+                self.writer.write_json(self.path, data)
+            else:
+                atomic_write_json(self.path, data)
+        except Exception as e:
+            print(f"⚠️  Warnung: Fehler beim Speichern von {self.path}: {e}")
+
+    def pending(self) -> bool:
+        """Ob ein Schreibvorgang im Hintergrund noch aussteht"""
+        return self.writer is not None and self.writer.pending(self.path)
+
+    def own_signature(self):
+        """file_signature nach dem letzten Schreiben im Hintergrund (oder None)"""
+        return self.writer.signature(self.path) if self.writer is not None else None
+
+
+class SqliteAusfallStore:
+    """
+    SQLite-Speicher: neue IDs werden in einer Transaktion eingefügt,
+    IDs vergangener Tage beim Laden und Speichern gelöscht
+    """
+
+    def __init__(self, path: str, json_import: str = None):
+        """
+        Args:
+            path: Pfad zur Datenbank
+            json_import: JSON-Datei im bisherigen Format, die einmalig
+                importiert wird (Standard: gleicher Name mit .json)
+        """
+        self.path = path
+        self.json_import = json_import or os.path.splitext(path)[0] + '.json'
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ausfaelle ("
+                " ausfall_id TEXT PRIMARY KEY,"
+                " datum TEXT,"
+                " gemeldet TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ausfaelle_datum ON ausfaelle (datum)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._import_json()
+
+    def _import_json(self):
+        """Übernimmt die bisherige JSON-Datei genau einmal"""
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'json_import'").fetchone()
+            if done or not os.path.exists(self.json_import):
+                return
+            ids = JsonAusfallStore(self.json_import).load()
+            with self._conn:
+                self._insert(ids)
+                self._conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('json_import', ?)",
+                    (f"{self.json_import} ({len(ids)} IDs, {datetime.now().isoformat()})",)
+                )
+        print(f"📥 {len(ids)} bekannte Ausfälle aus {self.json_import} importiert")
+
+    def _insert(self, ids: Iterable[str]):
+        gemeldet = datetime.now().isoformat()
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO ausfaelle (ausfall_id, datum, gemeldet) VALUES (?, ?, ?)",
+            ((ausfall_id, datum_aus_id(ausfall_id), gemeldet) for ausfall_id in ids)
+        )
+
+    def _prune(self, heute: date = None) -> int:
+        # IDs ohne lesbares Datum (datum IS NULL) bleiben erhalten
+        heute = (heute or date.today()).isoformat()
+        return self._conn.execute("DELETE FROM ausfaelle WHERE datum < ?", (heute,)).rowcount
+
+    def prune(self, heute: date = None) -> int:
+        """
+        Löscht alle IDs, deren Datum vor heute liegt
+
+        Returns:
+            int: Anzahl gelöschter IDs
+        """
+        with self._lock, self._conn:
+            return self._prune(heute)
+
+    def load(self) -> Set[str]:
+        """Lädt alle bekannten Ausfall-IDs von heute und später"""
+        with self._lock:
+            with self._conn:
+                self._prune()
+            return {row[0] for row in self._conn.execute("SELECT ausfall_id FROM ausfaelle")}
+
+    def save(self, known_ausfaelle: Set[str], neue_ids: Iterable[str]):
+        """Fügt nur die neuen IDs ein (eine Transaktion) und entfernt abgelaufene"""
+        try:
+            with self._lock, self._conn:
+                self._insert(neue_ids)
+                self._prune()
+        except sqlite3.Error as e:
+            print(f"⚠️  Warnung: Fehler beim Speichern von {self.path}: {e}")
+
+    def pending(self) -> bool:
+        """SQLite schreibt sofort in einer Transaktion"""
+        return False
+
+    def own_signature(self):
+        return None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ausfaelle").fetchone()[0]
+
+    def close(self):
+        """Schließt die Datenbank"""
+        with self._lock:
+            self._conn.close()
+
+
+def open_store(path: str, writer: StateWriter = None):
+    """
+    Wählt den Speicher anhand der Dateiendung
+
+    Args:
+        path: .json für das bisherige Format, .db/.sqlite für SQLite
+        writer: Optionaler StateWriter für den JSON-Speicher
+
+    Returns:
+        JsonAusfallStore oder SqliteAusfallStore
+    """
+    if path.lower().endswith(SQLITE_ENDUNGEN):
+        return SqliteAusfallStore(path)
+    return JsonAusfallStore(path, writer)
+
+
+def main():
+    """Test-Funktion: JSON-Import, Ablauf und Schreibkosten bei langer Historie"""
+    import tempfile
+    import time
+    from datetime import timedelta
+
+    folder = tempfile.mkdtemp()
+    json_path = os.path.join(folder, 'known_ausfaelle.json')
+    db_path = os.path.join(folder, 'known_ausfaelle.db')
+
+    # Ein Schuljahr Historie plus ein paar Einträge für die kommenden Tage
+    heute = date.today()
+    history = {f"{(heute - timedelta(days=d)):%d.%m.%Y}_{h}_L{n:02d}"
+               for d in range(1, 366) for h in range(1, 11) for n in range(10)}
+    kommend = {f"{(heute + timedelta(days=d)):%d.%m.%Y}_3_Nie" for d in range(3)}
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({'ausfaelle': list(history | kommend | {"kaputt_1_X"})}, f)
+    assert JsonAusfallStore(json_path).load() == kommend | {"kaputt_1_X"}, "JSON: abgelaufene IDs geladen"
+
+    store = SqliteAusfallStore(db_path)
+    known = store.load()
+    assert known == kommend | {"kaputt_1_X"}, "Abgelaufene IDs wurden nicht entfernt"
+    store.close()
+
+    # Zweites Öffnen importiert nicht erneut
+    store = SqliteAusfallStore(db_path)
+    assert len(store) == len(known)
+
+    neue = [f"{heute:%d.%m.%Y}_{h}_Neu" for h in range(1, 4)]
+    start = time.perf_counter()
+    store.save(known | set(neue), neue)
+    t_sqlite = time.perf_counter() - start
+
+    start = time.perf_counter()
+    JsonAusfallStore(json_path).save(history | kommend | set(neue), neue)
+    t_json = time.perf_counter() - start
+    with open(json_path, 'r', encoding='utf-8') as f:
+        assert set(json.load(f)['ausfaelle']) == kommend | set(neue), "JSON: abgelaufene IDs gespeichert"
+
+    assert set(neue) <= store.load()
+    store.close()
+    print(f"💾 3 neue Ausfälle speichern bei {len(history)} IDs Historie: "
+          f"JSON {t_json * 1000:.1f} ms, SQLite {t_sqlite * 1000:.1f} ms")
+    print("\n✅ Ausfall-Store funktioniert")
+
+
+if __name__ == "__main__":
+    main()
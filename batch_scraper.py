@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Batch-Scraper
+Ruft den Vertretungsplan für viele Konten gleichzeitig ab: jedes Konto
+bekommt einen eigenen Kontext im gemeinsamen Browser des AsyncBrowserPool,
+höchstens max_parallel Abrufe laufen gleichzeitig, und die Ergebnisse
+werden geliefert, sobald sie fertig sind. Optional wird das HTML in einem
+Prozess-Pool geparst, damit der Event-Loop die Browser weiter bedienen kann.
+
+Aufruf:
+    python batch_scraper.py konten.json
+
+konten.json hat das Format der Abonnenten-Datei (siehe tenant_monitor),
+Einträge ohne Zugangsdaten werden übersprungen.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+from schulportal_lib import PhaseTimer
+
+DEFAULT_MAX_PARALLEL = 4
+
+
+class BatchResult:
+    """Ergebnis eines Abrufs"""
+
+    __slots__ = ('job', 'vp_data', 'dauer', 'fehler', 'timer')
+
+    def __init__(self, job: Tuple[str, str, str], vp_data: Optional[dict], dauer: float,
+                 fehler: str = None, timer: PhaseTimer = None):
+        self.job = job
+        self.vp_data = vp_data
+        self.dauer = dauer
+        self.fehler = fehler
+        self.timer = timer
+
+    @property
+    def ok(self) -> bool:
+        return self.vp_data is not None
+
+    @property
+    def username(self) -> str:
+        return self.job[0]
+
+    @property
+    def institution(self) -> str:
+        return self.job[2]
+
+
+def jobs_from_file(path: str) -> List[Tuple[str, str, str]]:
+    """
+    Zugangsdaten aus einer Abonnenten-Datei (doppelte Konten nur einmal)
+
+    Returns:
+        list: [(username, password, institution)]
+    """
+    from tenant_monitor import load_abonnenten
+
+    jobs = []
+    for abonnent in load_abonnenten(path):
+        if abonnent.credentials is not None and abonnent.credentials not in jobs:
+            jobs.append(abonnent.credentials)
+    return jobs
+
+
+def parse_pool(processes: int = None) -> Optional[ProcessPoolExecutor]:
+    """
+    Prozess-Pool für das Parsen (siehe schulportal_aio.parse_in_executor)
+
+    Args:
+        processes: Anzahl Prozesse (Standard: SCHULPORTAL_PARSE_PROCESSES, 0 = kein Pool)
+
+    Returns:
+        ProcessPoolExecutor oder None
+    """
+    if processes is None:
+        processes = int(os.getenv('SCHULPORTAL_PARSE_PROCESSES', '0'))
+    if processes <= 0:
+        return None
+    return ProcessPoolExecutor(max_workers=processes)
+
+
+class BatchScraper:
+    """Begrenzt parallele Abrufe über einen gemeinsamen Pool"""
+
+    def __init__(self, pool, max_parallel: int = DEFAULT_MAX_PARALLEL):
+        """
+        Args:
+            pool: Objekt mit async scan(username, password, institution_id, timer=None)
+                (z.B. AsyncBrowserPool - ein Kontext pro Konto im selben Browser)
+            max_parallel: Höchstzahl gleichzeitiger Abrufe
+        """
+        self.pool = pool
+        self.max_parallel = max_parallel
+        self.stats = {'jobs': 0, 'ok': 0, 'fehlgeschlagen': 0}
+
+    async def _run(self, job: Tuple[str, str, str], semaphore: asyncio.Semaphore) -> BatchResult:
+        async with semaphore:
+            timer = PhaseTimer()
+            start = time.perf_counter()
+            try:
+                vp_data = await self.pool.scan(*job, timer=timer)
+                fehler = None if vp_data is not None else "Abruf fehlgeschlagen"
+            except Exception as e:
+                vp_data, fehler = None, str(e)
+            result = BatchResult(job, vp_data, time.perf_counter() - start, fehler, timer)
+
+        self.stats['ok' if result.ok else 'fehlgeschlagen'] += 1
+        return result
+
+    async def stream(self, jobs: Iterable[Tuple[str, str, str]]) -> AsyncIterator[BatchResult]:
+        """
+        Startet alle Abrufe und liefert die Ergebnisse in Fertigstellungs-Reihenfolge
+
+        Bricht der Aufrufer die Schleife ab, werden die übrigen Abrufe abgebrochen.
+
+        Args:
+            jobs: [(username, password, institution)]
+
+        Yields:
+            BatchResult
+        """
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        tasks = [asyncio.create_task(self._run(job, semaphore)) for job in jobs]
+        self.stats['jobs'] += len(tasks)
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run_all(self, jobs: Iterable[Tuple[str, str, str]]) -> List[BatchResult]:
+        """Wie stream, aber gesammelt (in Fertigstellungs-Reihenfolge)"""
+        return [result async for result in self.stream(jobs)]
+
+
+async def run_batch(path: str):
+    """Ruft alle Konten aus path ab und gibt jedes Ergebnis sofort aus"""
+    from browser_pool import AsyncBrowserPool
+
+    jobs = jobs_from_file(path)
+    max_parallel = int(os.getenv('BATCH_MAX_PARALLEL', str(DEFAULT_MAX_PARALLEL)))
+    executor = parse_pool()
+    pool = AsyncBrowserPool(
+        transport=os.getenv('SCHULPORTAL_TRANSPORT', 'browser'),
+        lean=os.getenv('SCHULPORTAL_LEAN', '0') == '1',
+        detect_changes=os.getenv('SCHULPORTAL_SKIP_UNCHANGED', '1') == '1',
+        parse_executor=executor
+    )
+    scraper = BatchScraper(pool, max_parallel)
+    print(f"🚀 {len(jobs)} Konten, höchstens {max_parallel} gleichzeitig")
+
+    start = time.perf_counter()
+    try:
+        async for result in scraper.stream(jobs):
+            if result.ok:
+                # Ausgegeben = verarbeitet: der nächste Lauf überspringt einen unveränderten Plan
+                pool.commit(*result.job, result.vp_data)
+            if not result.ok:
+                print(f"❌ {result.username}@{result.institution}: {result.fehler} ({result.dauer:.1f}s)")
+            elif result.vp_data.get('unveraendert'):
+                print(f"♻️  {result.username}@{result.institution}: unverändert ({result.dauer:.1f}s)")
+            else:
+                print(f"✅ {result.username}@{result.institution}: "
+                      f"{result.vp_data['anzahl_tage']} Tage ({result.dauer:.1f}s)")
+    finally:
+        await pool.close()
+        if executor is not None:
+            executor.shutdown()
+    print(f"\n📊 {scraper.stats['ok']}/{scraper.stats['jobs']} erfolgreich "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    """Test-Funktion (ohne Argument): Parallelitätsgrenze, Streaming und Parsen im Prozess-Pool"""
+    if len(sys.argv) > 1:
+        asyncio.run(run_batch(sys.argv[1]))
+        return
+
+    import contextlib
+    import io
+    import random
+
+    import schulportal_aio as aio
+    from parser_engines import SAMPLE_HTML
+    from schulportal_lib import build_vertretungsplan
+    from vertretung_model import tage_dicts
+
+    random.seed(25)
+    with contextlib.redirect_stdout(io.StringIO()):
+        erwartet = tage_dicts(build_vertretungsplan(SAMPLE_HTML))
+
+    class FakePool:
+        """Simuliert Seitenladezeiten und parst wie AsyncBrowserPool mit parse_executor"""
+
+        def __init__(self, executor):
+            self.executor = executor
+            self.running = 0
+            self.max_running = 0
+            self.ladezeit = 0.0
+
+        async def scan(self, username, password, institution_id, timer=None, input_signature=None):
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            try:
+                dauer = random.uniform(0.05, 0.3)
+                self.ladezeit += dauer
+                await asyncio.sleep(dauer)  # Seite laden
+                if username == 'kaputt':
+                    return None
+                return await aio.parse_in_executor(SAMPLE_HTML, self.executor)
+            finally:
+                self.running -= 1
+
+    jobs = [(f"konto{i}", 'x', '6081') for i in range(23)] + [('kaputt', 'x', '6081')]
+
+    async def demo(executor):
+        pool = FakePool(executor)
+        scraper = BatchScraper(pool, max_parallel=6)
+        start = time.perf_counter()
+        erstes = None
+        reihenfolge = []
+        async for result in scraper.stream(jobs):
+            erstes = erstes or time.perf_counter() - start
+            reihenfolge.append(result.username)
+            if result.ok:
+                assert tage_dicts(result.vp_data) == erwartet
+        gesamt = time.perf_counter() - start
+
+        assert pool.max_running <= 6
+        assert sorted(reihenfolge) == sorted(j[0] for j in jobs)
+        assert scraper.stats == {'jobs': 24, 'ok': 23, 'fehlgeschlagen': 1}
+        return erstes, gesamt, reihenfolge, pool.ladezeit
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        with contextlib.redirect_stdout(io.StringIO()):
+            erstes, gesamt, reihenfolge, ladezeit = asyncio.run(demo(executor))
+
+    print(f"📦 24 Konten, höchstens 6 gleichzeitig: erstes Ergebnis nach {erstes:.2f}s, "
+          f"alle nach {gesamt:.2f}s (nacheinander mindestens {ladezeit:.2f}s)")
+    print(f"🔀 Reihenfolge nach Fertigstellung: {', '.join(reihenfolge[:5])}, ...")
+
+    # Abbruch durch den Aufrufer beendet die übrigen Abrufe
+    async def abbrechen():
+        scraper = BatchScraper(FakePool(None), max_parallel=2)
+        async for _ in scraper.stream(jobs):
+            break
+        await asyncio.sleep(0)
+        return scraper.stats
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = asyncio.run(abbrechen())
+    assert stats['ok'] + stats['fehlgeschlagen'] < len(jobs)
+    print("\n✅ Batch-Scraper funktioniert")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""
+Browser-Pool
+Hält einen warmen Chromium samt eingeloggtem Kontext über mehrere Scans,
+recycelt ihn nach N Scans, bei zu hohem Speicherverbrauch oder nach einem
+Absturz und bereitet rechtzeitig einen Ersatz-Browser vor.
+
+AsyncBrowserPool nutzt die async API direkt im Event-Loop (Discord Bot,
+batch_scraper). Die CLI (vertretungsplan_scraper) startet pro Lauf einen
+eigenen Browser und braucht kein Recycling.
+Mit transport='http' wird zuerst browserlos abgerufen und der Browser
+nur gestartet, wenn das fehlschlägt.
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor
+from contextlib import nullcontext
+from typing import Optional
+
+from schulportal_lib import (
+    SESSION_DIR,
+    PhaseTimer,
+    load_session_state,
+    session_state_path,
+)
+import schulportal_aio as aio
+import http_transport
+from change_detector import ChangeDetector
+from lean_profile import LeanProfile, enable_lean_mode_async
+from panel_cache import PanelCache
+
+logger = logging.getLogger('BrowserPool')
+
+
+def _proc_parents() -> dict:
+    """{pid: ppid} aller Prozesse aus /proc (nur Linux)"""
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # Feld 4 ist die PPID, der Prozessname in Klammern kann Leerzeichen enthalten
+                parents[int(entry)] = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+    return parents
+
+
+def _proc_children(pid: int) -> Optional[list]:
+    """Direkte Kindprozesse über /proc/<pid>/task/*/children (None wenn nicht verfügbar)"""
+    children = []
+    try:
+        for tid in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{tid}/children', 'r') as f:
+                children += [int(child) for child in f.read().split()]
+    except OSError:
+        return None
+    return children
+
+
+def _descendants(pid: int) -> list:
+    """pid und alle Prozesse darunter"""
+    try:
+        import psutil
+        try:
+            return [pid] + [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+    except ImportError:
+        pass
+
+    if not os.path.isdir('/proc'):
+        return []
+
+    # Nur den Teilbaum lesen, wenn der Kernel die Kinder direkt liefert
+    if _proc_children(pid) is not None:
+        result, frontier = [], [pid]
+        while frontier:
+            result += frontier
+            frontier = [child for p in frontier for child in (_proc_children(p) or [])]
+        return result
+
+    parents = _proc_parents()
+    result, frontier = [], {pid}
+    while frontier:
+        result += frontier
+        frontier = {p for p, ppid in parents.items() if ppid in frontier}
+    return result
+
+
+def _cmdline(pid: int) -> list:
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return f.read().decode('utf-8', 'replace').split('\0')
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).cmdline()
+    except Exception:
+        return []
+
+
+def find_browser_pid(exclude=()) -> Optional[int]:
+    """
+    Ermittelt den Hauptprozess eines von Playwright gestarteten Chromium
+
+    Playwright verbindet sich über --remote-debugging-pipe mit dem Browser,
+    Renderer und Hilfsprozesse haben dieses Argument nicht.
+
+    Args:
+        exclude: PIDs bereits bekannter Browser (aktiv, Ersatz)
+
+    Returns:
+        int oder None wenn nicht ermittelbar
+    """
+    candidates = [pid for pid in _descendants(os.getpid())[1:]
+                  if pid not in exclude and '--remote-debugging-pipe' in _cmdline(pid)]
+    return max(candidates) if candidates else None
+
+
+def get_browser_rss_mb(pid: int) -> float:
+    """
+    Ermittelt den Speicherverbrauch (RSS) eines Browsers in MB
+
+    Summiert den Hauptprozess und alle seine Renderer, aber keine anderen
+    Kindprozesse des Bots (Ersatz-Browser, Parse-Prozesse).
+
+    Args:
+        pid: Hauptprozess des Browsers (siehe find_browser_pid)
+
+    Returns:
+        float: RSS in MB (0.0 wenn nicht ermittelbar)
+    """
+    try:
+        import psutil
+        total = 0
+        for child in _descendants(pid):
+            try:
+                total += psutil.Process(child).memory_info().rss
+            except psutil.Error:
+                pass
+        return total / (1024 * 1024)
+    except ImportError:
+        pass
+
+    total_kb = 0
+    for child in _descendants(pid):
+        try:
+            with open(f'/proc/{child}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+
+class RecyclePolicy:
+    """Entscheidet, wann ein Browser ersetzt werden muss"""
+
+    def __init__(self, max_scans: int = 50, max_rss_mb: float = 800.0,
+                 standby_margin: int = 1):
+        """
+        Args:
+            max_scans: Anzahl Scans, nach denen der Browser ersetzt wird
+            max_rss_mb: Speichergrenze in MB (0 = deaktiviert)
+            standby_margin: Wie viele Scans vor dem Limit der Ersatz vorbereitet wird
+        """
+        self.max_scans = max_scans
+        self.max_rss_mb = max_rss_mb
+        self.standby_margin = standby_margin
+
+    def recycle_due(self, scans: int, rss_mb: float, crashed: bool) -> bool:
+        """Prüft ob der aktuelle Browser ersetzt werden muss"""
+        if crashed:
+            return True
+        if self.max_scans and scans >= self.max_scans:
+            return True
+        if self.max_rss_mb and rss_mb >= self.max_rss_mb:
+            return True
+        return False
+
+    def standby_due(self, scans: int, rss_mb: float, crashed: bool) -> bool:
+        """Prüft ob schon jetzt ein Ersatz-Browser vorbereitet werden sollte"""
+        if self.recycle_due(scans, rss_mb, crashed):
+            return True
+        if self.max_scans and scans >= self.max_scans - self.standby_margin:
+            return True
+        if self.max_rss_mb and rss_mb >= self.max_rss_mb * 0.9:
+            return True
+        return False
+
+
+class _AsyncSession:
+    """Eingeloggter Browser-Kontext für ein Konto"""
+
+    def __init__(self):
+        self.context = None
+        self.page = None
+        self.lock = asyncio.Lock()
+
+
+class _AsyncBrowserSlot:
+    """Ein gestarteter async Browser mit einem Kontext pro Konto"""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.sessions = {}
+        self.scans = 0
+        self.in_flight = 0
+        self.retired = False
+        self.crashed = False
+        self.pid = None  # Hauptprozess (nur bei Speichergrenze ermittelt)
+        self.rss_mb = 0.0  # letzte Messung, nach jedem Scan aktualisiert
+        browser.on("disconnected", self._on_disconnected)
+
+    def _on_disconnected(self, *args):
+        self.crashed = True
+
+    def session(self, credentials: tuple) -> _AsyncSession:
+        if credentials not in self.sessions:
+            self.sessions[credentials] = _AsyncSession()
+        return self.sessions[credentials]
+
+    async def close(self):
+        try:
+            await self.browser.close()
+        except Exception:
+            pass
+
+
+class AsyncBrowserPool:
+    """
+    Langlebiger Chromium für den Event-Loop des Bots
+
+    Nutzt playwright.async_api direkt - ohne Worker-Thread und ohne zweiten
+    Playwright-Treiber. Scans verschiedener Konten laufen parallel in
+    eigenen Kontexten, Scans desselben Kontos nacheinander.
+    """
+
+    def __init__(self, policy: Optional[RecyclePolicy] = None, headless: bool = True,
+                 warm_standby: bool = True, session_dir: str = SESSION_DIR,
+                 transport: str = 'browser', lean: bool = False,
+                 detect_changes: bool = True, parse_executor: Executor = None):
+        """
+        Args:
+            policy: Recycling-Regeln (Standard: RecyclePolicy())
+            headless: Browser ohne Fenster starten
+            warm_standby: Ersatz-Browser vor dem Recycling vorbereiten
+            session_dir: Ordner für gespeicherte Sessions (Cookies)
+            transport: 'browser' oder 'http' (HTTP zuerst, Browser als Fallback)
+            lean: Nicht benötigte Ressourcen blockieren (siehe lean_profile)
+            detect_changes: Unveränderte Seiten nicht erneut parsen (siehe change_detector)
+            parse_executor: Optionaler Executor (z.B. ProcessPoolExecutor), in dem
+                die Browser-Seiten statt im Event-Loop geparst werden
+        """
+        self.policy = policy or RecyclePolicy()
+        self.headless = headless
+        self.warm_standby = warm_standby
+        self.session_dir = session_dir
+        self.transport = transport
+        self.lean = lean
+        self.detect_changes = detect_changes
+        self.parse_executor = parse_executor
+        self.last_lean_report = None
+        self._http = {}
+        self._lean_profiles = {}
+        self._detectors = {}
+        self._playwright = None
+        self._active: Optional[_AsyncBrowserSlot] = None
+        self._standby_task: Optional[asyncio.Task] = None
+        self._launch_lock = asyncio.Lock()
+        self._background = set()
+        self.stats = {
+            'launches': 0,
+            'recycles': 0,
+            'crashes': 0,
+            'sessions': 0,
+            'scans': 0,
+            'http_scans': 0,
+            'http_fallbacks': 0,
+            'unchanged': 0
+        }
+
+    async def scan(self, username: str, password: str, institution_id: str,
+                   timer: PhaseTimer = None, input_signature=None) -> Optional[dict]:
+        """
+        Führt einen Scan im warmen Browser aus
+
+        Args:
+            timer: Optionaler PhaseTimer (zusätzlich browser_start und context_open)
+            input_signature: Eingabe des anschließenden Abgleichs (siehe
+                ChangeDetector.input_signature) - ändert sie sich, ist der
+                Plan nicht 'unveraendert'
+
+        Returns:
+            Ergebnis von get_vertretungsplan oder None bei Fehler
+        """
+        credentials = (username, password, institution_id)
+        timer = timer or PhaseTimer()
+        detector = self._change_detector(credentials)
+        if detector is not None:
+            detector.input_signature = input_signature
+        transport = self._http_transport(credentials)
+        if transport is not None:
+            # requests blockiert, daher in einem Thread ausführen
+            vp_data = await asyncio.to_thread(
+                transport.get_vertretungsplan, timer=timer, detector=self._change_detector(credentials)
+            )
+            if vp_data is not None:
+                self.stats['http_scans'] += 1
+                self._count_unchanged(vp_data)
+                return vp_data
+            self.stats['http_fallbacks'] += 1
+            logger.warning("HTTP-Abruf fehlgeschlagen - Fallback auf Browser")
+
+        slot = None
+        try:
+            slot = await self._acquire(timer)
+            slot.in_flight += 1
+            session = slot.session(credentials)
+
+            async with session.lock:
+                if session.page is None:
+                    with timer.phase('context_open'):
+                        await self._open_session(slot, session, credentials)
+                if self.lean:
+                    self._lean_profile(credentials).start_scan()
+
+                # Login nur, wenn die gespeicherte Session abgelaufen ist
+                vp_data = await aio.fetch_vertretungsplan(
+                    session.page, *credentials,
+                    session_file=self._session_file(credentials),
+                    timer=timer,
+                    detector=self._change_detector(credentials),
+                    parse_executor=self.parse_executor
+                )
+
+                if self.lean:
+                    self.last_lean_report = self._lean_profile(credentials).report()
+
+            slot.scans += 1
+            self.stats['scans'] += 1
+            self._count_unchanged(vp_data)
+            return vp_data
+
+        except Exception as e:
+            logger.error(f"Fehler im Browser-Pool: {e}", exc_info=True)
+            if slot is not None:
+                slot.crashed = True
+            return None
+
+        finally:
+            if slot is not None:
+                slot.in_flight -= 1
+                if slot.retired and slot.in_flight == 0:
+                    self._spawn(slot.close())
+                elif not slot.retired:
+                    # Einmal pro Scan messen, Recycling und Ersatz nutzen den Wert
+                    slot.rss_mb = await self._rss(slot)
+            self._schedule_standby()
+
+    def commit(self, username: str, password: str, institution_id: str, vp_data: dict):
+        """
+        Markiert den Plan eines Scans als geprüft (nach Abgleich und Benachrichtigung)
+
+        Erst danach gilt dieselbe Seite beim nächsten Scan als 'unveraendert'.
+        """
+        detector = self._change_detector((username, password, institution_id))
+        if detector is not None and vp_data is not None:
+            detector.commit(vp_data.get('fingerprint'))
+
+    async def close(self):
+        """Schließt alle Browser und stoppt Playwright"""
+        for transport in self._http.values():
+            transport.close()
+        self._http.clear()
+        if self._standby_task is not None:
+            self._standby_task.cancel()
+            try:
+                standby = await self._standby_task
+            except (asyncio.CancelledError, Exception):
+                standby = None
+            if standby is not None:
+                await standby.close()
+            self._standby_task = None
+        if self._active is not None:
+            await self._active.close()
+            self._active = None
+        for task in list(self._background):
+            await asyncio.gather(task, return_exceptions=True)
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    # ------------------------------------------------------------------
+    # Interna
+    # ------------------------------------------------------------------
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _rss(self, slot: _AsyncBrowserSlot) -> float:
+        """Speicher nur dieses Browsers, im Thread gemessen (/proc-Auswertung blockiert)"""
+        if not self.policy.max_rss_mb or slot.pid is None:
+            return 0.0
+        return await asyncio.to_thread(get_browser_rss_mb, slot.pid)
+
+    async def _launch(self, timer: PhaseTimer = None) -> _AsyncBrowserSlot:
+        # Ohne Timer (Ersatz-Browser im Hintergrund) wird nicht gemessen
+        with timer.phase('browser_start') if timer else nullcontext():
+            if self._playwright is None:
+                from playwright.async_api import async_playwright
+                self._playwright = await async_playwright().start()
+            browser = await self._playwright.chromium.launch(headless=self.headless)
+        self.stats['launches'] += 1
+        logger.info(f"Browser gestartet (#{self.stats['launches']})")
+        slot = _AsyncBrowserSlot(browser)
+        if self.policy.max_rss_mb:
+            known = {other.pid for other in (self._active,) if other is not None}
+            slot.pid = await asyncio.to_thread(find_browser_pid, known)
+            if slot.pid is None:
+                logger.warning("Browser-Prozess nicht gefunden - Speichergrenze wird nicht geprüft")
+        return slot
+
+    def _session_file(self, credentials: tuple) -> str:
+        username, _, institution_id = credentials
+        return session_state_path(username, institution_id, self.session_dir)
+
+    def _lean_profile(self, credentials: tuple) -> LeanProfile:
+        # Pro Konto, damit die gelernten Größen ein Recycling überleben
+        if credentials not in self._lean_profiles:
+            self._lean_profiles[credentials] = LeanProfile()
+        return self._lean_profiles[credentials]
+
+    def _change_detector(self, credentials: tuple) -> Optional[ChangeDetector]:
+        # Pro Konto und unabhängig vom Transport (HTTP und Browser teilen sich den Stand)
+        if not self.detect_changes:
+            return None
+        if credentials not in self._detectors:
+            self._detectors[credentials] = ChangeDetector(panel_cache=PanelCache())
+        return self._detectors[credentials]
+
+    def _count_unchanged(self, vp_data: Optional[dict]):
+        if vp_data is not None and vp_data.get('unveraendert'):
+            self.stats['unchanged'] += 1
+
+    def _http_transport(self, credentials: tuple):
+        if self.transport != 'http' or not http_transport.is_available():
+            return None
+        if credentials not in self._http:
+            self._http[credentials] = http_transport.HttpTransport(
+                *credentials, session_file=self._session_file(credentials)
+            )
+        return self._http[credentials]
+
+    async def _open_session(self, slot: _AsyncBrowserSlot, session: _AsyncSession,
+                            credentials: tuple):
+        """Öffnet einen Kontext mit der gespeicherten Session des Kontos"""
+        storage_state = load_session_state(self._session_file(credentials))
+        session.context = await slot.browser.new_context(storage_state=storage_state)
+        if self.lean:
+            await enable_lean_mode_async(session.context, self._lean_profile(credentials))
+        session.page = await session.context.new_page()
+        self.stats['sessions'] += 1
+
+    async def _acquire(self, timer: PhaseTimer = None) -> _AsyncBrowserSlot:
+        """Liefert einen nutzbaren Browser, recycelt bei Bedarf"""
+        async with self._launch_lock:
+            active = self._active
+            if active is not None and not self.policy.recycle_due(active.scans, active.rss_mb, active.crashed):
+                return active
+
+            if active is not None:
+                if active.crashed:
+                    self.stats['crashes'] += 1
+                    logger.warning("Browser abgestürzt - wird ersetzt")
+                else:
+                    logger.info(f"Browser wird nach {active.scans} Scans recycelt")
+                self.stats['recycles'] += 1
+                # Laufende Scans dürfen zu Ende laufen, danach wird geschlossen
+                active.retired = True
+                if active.in_flight == 0:
+                    self._spawn(active.close())
+
+            standby = None
+            if self._standby_task is not None:
+                try:
+                    standby = await self._standby_task
+                except Exception:
+                    standby = None
+                self._standby_task = None
+
+            if standby is not None and not standby.crashed:
+                self._active = standby
+            else:
+                if standby is not None:
+                    await standby.close()
+                self._active = await self._launch(timer)
+            return self._active
+
+    def _schedule_standby(self):
+        active = self._active
+        if not self.warm_standby or active is None or self._standby_task is not None:
+            return
+        if self.policy.standby_due(active.scans, active.rss_mb, active.crashed):
+            credentials = list(active.sessions)
+            self._standby_task = asyncio.create_task(self._prepare_standby(credentials))
+
+    async def _prepare_standby(self, credentials: list) -> Optional[_AsyncBrowserSlot]:
+        try:
+            standby = await self._launch()
+            for creds in credentials:
+                await self._open_session(standby, standby.session(creds), creds)
+            logger.info("Ersatz-Browser bereit")
+            return standby
+        except Exception as e:
+            logger.error(f"Ersatz-Browser konnte nicht gestartet werden: {e}")
+            return None
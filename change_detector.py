@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Change-Detector
+Erkennt anhand eines Fingerabdrucks der normalisierten Seite, ob sich der
+Vertretungsplan seit dem letzten Scan geändert hat
+"""
+
+import hashlib
+import json
+import os
+import re
+from typing import Optional
+
+from state_writer import atomic_write_json
+
+# Teile der Seite, die sich bei jedem Abruf ändern, ohne dass sich der Plan ändert
+VOLATILE_PATTERNS = [
+    re.compile(r'<script\b.*?</script>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'<style\b.*?</style>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'<!--.*?-->', re.DOTALL),
+    re.compile(r'<input\b[^>]*type=["\']?hidden[^>]*>', re.IGNORECASE),
+    re.compile(r'<meta\b[^>]*>', re.IGNORECASE),
+    re.compile(r'\s+(?:nonce|data-token|data-sid)=("[^"]*"|\'[^\']*\')', re.IGNORECASE),
+]
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_html(html_content: str) -> str:
+    """
+    Entfernt flüchtige Teile (Skripte, Tokens, Kommentare) und Leerraum
+
+    Args:
+        html_content: HTML der Vertretungsplan-Seite
+
+    Returns:
+        str: Normalisiertes HTML
+    """
+    for pattern in VOLATILE_PATTERNS:
+        html_content = pattern.sub('', html_content)
+    return WHITESPACE.sub(' ', html_content).strip()
+
+
+class ChangeDetector:
+    """
+    Merkt sich den Fingerabdruck der zuletzt vollständig geprüften Seite
+
+    Ein Fingerabdruck gilt erst als geprüft, wenn der Aufrufer nach Abgleich
+    und Benachrichtigung commit() aufruft - bricht der Lauf vorher ab, wird
+    dieselbe Seite beim nächsten Mal erneut geprüft. In den Schlüssel geht
+    zusätzlich input_signature ein (z.B. die Signatur der Stundenplan-Datei),
+    damit eine geänderte Eingabe des Abgleichs ebenfalls neu prüfen lässt.
+    """
+
+    def __init__(self, state_file: str = None, panel_cache=None):
+        """
+        Args:
+            state_file: Optionale Datei, in der der letzte geprüfte
+                Fingerabdruck über Programmstarts hinweg gespeichert wird
+            panel_cache: Optionaler PanelCache - bei geänderter Seite werden
+                nur die geänderten Panels neu geparst
+        """
+        self.state_file = state_file
+        self.panel_cache = panel_cache
+        # Vom Aufrufer vor dem Abruf gesetzt (z.B. StundenplanChecker.input_signature())
+        self.input_signature = None
+        self.last_fingerprint = None  # zuletzt geprüft (Seite + input_signature)
+        self.parsed_fingerprint = None  # zuletzt geparste Seite
+        self.last_days = None
+        self._load()
+
+    def _load(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                self.last_fingerprint = json.load(f).get('fingerprint')
+        except Exception as e:
+            print(f"⚠️  Warnung: Fehler beim Laden von {self.state_file}: {e}")
+
+    def _save(self):
+        if not self.state_file:
+            return
+        try:
+            atomic_write_json(self.state_file, {'fingerprint': self.last_fingerprint}, indent=None)
+        except Exception as e:
+            print(f"⚠️  Warnung: Fehler beim Speichern von {self.state_file}: {e}")
+
+    @staticmethod
+    def fingerprint_html(html_content: str) -> str:
+        """Fingerabdruck des normalisierten HTML"""
+        return hashlib.sha256(normalize_html(html_content).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def fingerprint_data(data) -> str:
+        """Fingerabdruck bereits strukturierter Daten (z.B. aus der DOM-Extraktion)"""
+        encoded = json.dumps(data, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def key(self, fingerprint: str) -> str:
+        """Schlüssel aus Seiten-Fingerabdruck und input_signature"""
+        if self.input_signature is None:
+            return fingerprint
+        combined = f"{fingerprint}|{self.input_signature!r}"
+        return hashlib.sha256(combined.encode('utf-8')).hexdigest()
+
+    def is_unchanged(self, key: str) -> bool:
+        """Prüft ob Seite und Eingabe dem zuletzt geprüften Stand entsprechen"""
+        return key == self.last_fingerprint
+
+    def cached_days(self, fingerprint: str) -> Optional[list]:
+        """
+        Liefert die Tage der zuletzt geparsten Seite, wenn sie unverändert ist
+
+        Returns:
+            list oder None (geändert oder nach Neustart noch nichts im Speicher)
+        """
+        if fingerprint == self.parsed_fingerprint:
+            return self.last_days
+        return None
+
+    def remember(self, fingerprint: str, days: list):
+        """Merkt sich die geparsten Tage als Tag-Objekte (nur im Speicher, siehe commit)"""
+        self.parsed_fingerprint = fingerprint
+        self.last_days = days
+
+    def commit(self, key: str):
+        """
+        Markiert den Stand als geprüft, erst nach erfolgreichem Abgleich und
+        Benachrichtigung aufrufen
+
+        Args:
+            key: vp_data['fingerprint'] des geprüften Abrufs
+        """
+        if key and key != self.last_fingerprint:
+            self.last_fingerprint = key
+            self._save()
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 Discord Bot für Schulportal Vertretungsplan
-Automatische Benachrichtigungen bei neuen Ausfällen alle 5 Minuten
+Automatische Benachrichtigungen bei neuen Ausfällen, Scan-Abstand je nach
+Schulzeit, Ferien und Änderungshäufigkeit (Standard: alle 5 Minuten)
 """
 
 import discord
@@ -9,14 +10,26 @@ from discord.ext import commands, tasks
 import os
 import asyncio
 import json
+import time
 from datetime import datetime
 from dotenv import load_dotenv
-from playwright.async_api import async_playwright
 import logging
 
 # Importiere unsere Module
-from schulportal_lib import login, get_vertretungsplan
+import schulportal_lib
 from stundenplan_checker import StundenplanChecker
+from ausfall_store import open_store
+from state_writer import StateWriter
+from discord_outbox import DiscordOutbox, DiscordSink
+from notifier import Notifier, sinks_from_env
+from plan_diff import diff_plans, summarize
+from snapshot_archive import ARCHIVE_DIR, SnapshotArchive
+from scan_scheduler import DEFAULT_ZEITFENSTER, ScanScheduler, letzte_aktualisierung
+from scan_coordinator import ScanCoordinator
+from scan_metrics import MetricsServer, ScanMetrics
+from tenant_monitor import TenantMonitor, load_abonnenten
+from browser_pool import AsyncBrowserPool, RecyclePolicy
+from batch_scraper import parse_pool
 
 # Logging Setup
 logging.basicConfig(
@@ -32,150 +45,353 @@ logger = logging.getLogger('VertretungsplanBot')
 # Lade .env Datei
 load_dotenv()
 
+# Parser-Backend für den Vertretungsplan (auto, lxml, html.parser, selectolax)
+schulportal_lib.DEFAULT_PARSER = os.getenv('SCHULPORTAL_PARSER', 'auto')
+# Extraktion: html (page.content() + Parser) oder dom (Skript im Browser)
+schulportal_lib.DEFAULT_EXTRACTION = os.getenv('SCHULPORTAL_EXTRACTION', 'html')
+
 # Bot Setup - Nur default intents
 intents = discord.Intents.default()
 intents.message_content = True  # Für Commands
 bot = commands.Bot(command_prefix='/', intents=intents)
 
 # Globale Variablen
+STATS_DATEI = 'bot_stats.json'
 user_credentials = {}
 scan_stats = {
     'total_scans': 0,
     'successful_scans': 0,
     'failed_scans': 0,
     'last_scan': None,
-    'new_ausfaelle_found': 0
+    'new_ausfaelle_found': 0,
+    'unchanged_scans': 0
 }
 is_monitoring = False
+checker = None  # Wird beim ersten Scan erstellt und lädt Dateien nur bei Änderungen neu
+last_plan = None  # Plan des letzten Scans für den Zeilen-Diff
 target_user_id = int(os.getenv('DISCORD_USER_ID'))
+browser_pool = AsyncBrowserPool(
+    RecyclePolicy(
+        max_scans=int(os.getenv('BROWSER_MAX_SCANS', '50')),
+        max_rss_mb=float(os.getenv('BROWSER_MAX_RSS_MB', '800'))
+    ),
+    transport=os.getenv('SCHULPORTAL_TRANSPORT', 'browser'),
+    lean=os.getenv('SCHULPORTAL_LEAN', '0') == '1',
+    detect_changes=os.getenv('SCHULPORTAL_SKIP_UNCHANGED', '1') == '1',
+    # Optional: Seiten in SCHULPORTAL_PARSE_PROCESSES Prozessen parsen (viele Abonnenten)
+    parse_executor=parse_pool()
+)
+scan_metrics = ScanMetrics()
+# Zustandsdateien werden gesammelt und atomar im Hintergrund geschrieben
+state_writer = StateWriter(delay=float(os.getenv('STATE_WRITE_DELAY', '1.0')))
+# Benachrichtigungen pro Tag gebündelt, ohne feste Pausen zwischen den DMs
+outbox = DiscordOutbox(bot, target_user_id)
+# Discord plus weitere Ziele aus NOTIFY_SINKS (Webhook, NDJSON, Konsole)
+env_sinks = sinks_from_env()
+notifier = Notifier([DiscordSink(outbox)] + env_sinks)
+# Mehrere Abonnenten: ein Abruf pro Schule und Sichtbarkeit (siehe tenant_monitor)
+tenant_monitor = None
+if os.getenv('ABONNENTEN_DATEI'):
+    tenant_monitor = TenantMonitor(
+        browser_pool,
+        # IDs sind Discord-User-IDs: ungültige fallen schon beim Start auf
+        load_abonnenten(os.getenv('ABONNENTEN_DATEI'), id_typ=int),
+        max_parallel=int(os.getenv('TENANT_MAX_PARALLEL', '2')),
+        writer=state_writer
+    )
+# Outbox und Notifier pro Abonnent (der Bot-Besitzer nutzt die obigen)
+abonnenten_outboxes = {target_user_id: outbox}
+abonnenten_notifier = {target_user_id: notifier}
+# Archiv geänderter Pläne wie in der CLI (pro Gruppe ein eigenes, siehe archiv_fuer)
+archive = {}
+scheduler = ScanScheduler(
+    interval=float(os.getenv('CHECK_INTERVAL', '300')),
+    min_interval=float(os.getenv('SCAN_INTERVAL_MIN', '120')),
+    ruhe_interval=float(os.getenv('SCAN_INTERVAL_RUHE', '3600')),
+    zeitfenster=os.getenv('SCAN_ZEITFENSTER', DEFAULT_ZEITFENSTER),
+    ferien=os.getenv('SCAN_FERIEN', '')
+)
 
 
 def load_stats():
     """Lade Statistiken aus JSON"""
     global scan_stats
     try:
-        if os.path.exists('bot_stats.json'):
-            with open('bot_stats.json', 'r') as f:
-                scan_stats = json.load(f)
+        if os.path.exists(STATS_DATEI):
+            with open(STATS_DATEI, 'r') as f:
+                # Zähler, die in älteren Dateien fehlen, behalten ihren Startwert
+                scan_stats.update(json.load(f))
                 logger.info("Statistiken geladen")
+    except json.JSONDecodeError as e:
+        # Defekte Datei aufheben statt beim nächsten Speichern zu überschreiben
+        os.replace(STATS_DATEI, f"{STATS_DATEI}.defekt")
+        logger.error(f"{STATS_DATEI} ist defekt ({e}), gesichert als {STATS_DATEI}.defekt")
     except Exception as e:
         logger.error(f"Fehler beim Laden der Statistiken: {e}")
 
 
 def save_stats():
-    """Speichere Statistiken in JSON"""
+    """Speichere Statistiken in JSON (im Hintergrund, blockiert den Event-Loop nicht)"""
     try:
-        with open('bot_stats.json', 'w') as f:
-            json.dump(scan_stats, f, indent=2)
+        state_writer.write_json(STATS_DATEI, scan_stats)
     except Exception as e:
         logger.error(f"Fehler beim Speichern der Statistiken: {e}")
 
 
+def notifier_fuer(user_id: int) -> Notifier:
+    """Notifier eines Abonnenten (eigene Outbox, gemeinsame Zusatz-Ziele)"""
+    if user_id not in abonnenten_notifier:
+        abonnenten_outboxes[user_id] = DiscordOutbox(bot, user_id)
+        abonnenten_notifier[user_id] = Notifier([DiscordSink(abonnenten_outboxes[user_id])] + env_sinks)
+    return abonnenten_notifier[user_id]
+
+
+def archiv_fuer(gruppe=None) -> SnapshotArchive:
+    """Archiv des Bot-Besitzers (gruppe None) oder einer Abonnenten-Gruppe"""
+    if gruppe not in archive:
+        folder = ARCHIVE_DIR if gruppe is None else os.path.join(ARCHIVE_DIR, '_'.join(gruppe))
+        archive[gruppe] = SnapshotArchive(folder)
+    return archive[gruppe]
+
+
+async def archivieren(vp_data: dict, gruppe=None):
+    """
+    Archiviert einen geänderten Plan in einem Thread (Dateizugriffe blockieren
+    den Event-Loop nicht), alte Stände entfallen nach ARCHIV_AUFBEWAHRUNG_TAGE
+    """
+    try:
+        await asyncio.to_thread(archiv_fuer(gruppe).add_and_compact, vp_data)
+    except Exception as e:
+        logger.error(f"Fehler beim Archivieren: {e}")
+
+
+def get_checker() -> StundenplanChecker:
+    """Ein Checker für alle Scans (lädt geänderte Dateien selbst neu)"""
+    global checker
+    if checker is None:
+        tracking_datei = os.getenv('AUSFALL_STORE_DATEI', 'known_ausfaelle.json')
+        checker = StundenplanChecker(tracking_datei=tracking_datei,
+                                     store=open_store(tracking_datei, writer=state_writer))
+    return checker
+
+
+def notify_im_hintergrund(ziel: Notifier, ausfaelle: list, **meta) -> asyncio.Task:
+    """
+    notify_nowait mit Messung: die Zustellung an alle Ziele läuft nach dem
+    Scan weiter, ihre Dauer geht bei Abschluss als Phase 'notify' in
+    scan_metrics ein (eine Messung pro Benachrichtigung)
+    """
+    start = time.perf_counter()
+    task = ziel.notify_nowait(ausfaelle, **meta)
+    task.add_done_callback(lambda _: scan_metrics.observe('notify', time.perf_counter() - start))
+    return task
+
+
+def commit_when_accepted(task: asyncio.Task, commit):
+    """
+    Ruft commit() auf, sobald alle Ziele die Benachrichtigung angenommen haben
+    
+    Angenommen heißt nicht zugestellt: Discord legt die Nachricht nur in der
+    Outbox ab, gesendet wird im Hintergrund. Nimmt ein Ziel nicht an, bleibt
+    der Plan ungeprüft und der nächste Scan gleicht die Seite erneut ab, statt
+    sie als unverändert zu überspringen. Die Ausfälle sind dann aber schon als
+    bekannt gespeichert und werden nicht noch einmal gemeldet.
+    """
+    def done(task: asyncio.Task):
+        if task.cancelled() or task.exception() is not None:
+            return
+        if all(status == 'ok' for status in task.result().values()):
+            commit()
+    task.add_done_callback(done)
+
+
 async def check_vertretungsplan():
-    """Prüfe Vertretungsplan und sende Benachrichtigungen"""
-    global scan_stats, is_monitoring
+    """
+    Prüfe Vertretungsplan und sende Benachrichtigungen
+    
+    Nicht direkt aufrufen, sondern über scan_coordinator.run(), damit nie
+    zwei Scans gleichzeitig laufen.
     
-    if not user_credentials:
+    Returns:
+        dict: zeitstempel, unveraendert, ausfaelle und neue_ausfaelle
+            (Anzahl) oder None bei Fehlern
+    """
+    if not user_credentials and tenant_monitor is None:
         logger.warning("Keine Credentials gesetzt. Überspringe Scan.")
-        return
+        return None
+    
+    # Phasen-Dauern des Scans für /scanstatus und den Metrik-Endpunkt
+    timer = schulportal_lib.PhaseTimer()
+    start = time.perf_counter()
+    if tenant_monitor is not None:
+        result = await scan_abonnenten(timer)
+    else:
+        result = await scan_and_notify(timer)
+    scan_metrics.record(timer, total=time.perf_counter() - start, ok=result is not None)
+    return result
+
+
+async def scan_and_notify(timer: schulportal_lib.PhaseTimer):
+    """Ein Scan mit Prüfung und Benachrichtigung, Phasen werden in timer gemessen"""
+    global scan_stats, is_monitoring, last_plan
     
     try:
         scan_stats['total_scans'] += 1
         logger.info(f"Starte Scan #{scan_stats['total_scans']}")
+        credentials = (user_credentials['username'], user_credentials['password'],
+                       user_credentials.get('institution', '6081'))
+        
+        # Scan im warmen Browser des Pools ausführen (direkt im Event-Loop);
+        # ein geänderter Stundenplan erzwingt den Abgleich auch bei unveränderter Seite
+        vp_data = await browser_pool.scan(*credentials, timer=timer,
+                                          input_signature=get_checker().input_signature())
+        
+        if not vp_data:
+            scan_stats['failed_scans'] += 1
+            scheduler.record_failure()
+            with timer.phase('persist'):
+                save_stats()
+            logger.error("Fehler beim Abrufen des Vertretungsplans")
+            return None
+        
+        # Seite unverändert: nichts Neues zu prüfen, Scan endet hier
+        if vp_data.get('unveraendert'):
+            scheduler.record_success(False, aktualisierung=letzte_aktualisierung(vp_data))
+            scan_stats['unchanged_scans'] += 1
+            scan_stats['successful_scans'] += 1
+            scan_stats['last_scan'] = datetime.now().isoformat()
+            with timer.phase('persist'):
+                save_stats()
+            logger.info("✅ Scan erfolgreich. Vertretungsplan unverändert - Prüfung übersprungen")
+            return {'zeitstempel': vp_data['zeitstempel'], 'unveraendert': True,
+                    'ausfaelle': None, 'neue_ausfaelle': 0}
         
-        # Playwright Browser starten
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
+        # Was hat sich seit dem letzten Scan geändert?
+        changed = False
+        if last_plan is not None:
+            diff = diff_plans(last_plan, vp_data)
+            changed = bool(diff['tage'])
+            logger.info(f"Änderungen seit dem letzten Scan: {summarize(diff)}")
+        last_plan = vp_data
+        scheduler.record_success(changed, aktualisierung=letzte_aktualisierung(vp_data))
+        
+        # Stundenplan-Check (ein Checker für alle Scans)
+        with timer.phase('check'):
+            ausfaelle = get_checker().check_vertretungsplan(vp_data)
+        
+        # Neue Ausfälle finden
+        neue_ausfaelle = [a for a in ausfaelle if a['neu']]
+        
+        if neue_ausfaelle:
+            scan_stats['new_ausfaelle_found'] += len(neue_ausfaelle)
+            logger.info(f"🚨 {len(neue_ausfaelle)} neue Ausfälle gefunden!")
             
-            try:
-                # Login (wir müssen die synchronen Funktionen anpassen)
-                from concurrent.futures import ThreadPoolExecutor
-                
-                def sync_check():
-                    from playwright.sync_api import sync_playwright
-                    with sync_playwright() as p_sync:
-                        browser_sync = p_sync.chromium.launch(headless=True)
-                        page_sync = browser_sync.new_page()
-                        
-                        # Login
-                        if not login(page_sync, 
-                                   user_credentials['username'],
-                                   user_credentials['password'],
-                                   user_credentials.get('institution', '6081')):
-                            logger.error("Login fehlgeschlagen")
-                            return None
-                        
-                        # Vertretungsplan abrufen
-                        vp_data = get_vertretungsplan(page_sync)
-                        browser_sync.close()
-                        return vp_data
-                
-                # Führe in Thread-Pool aus
-                with ThreadPoolExecutor() as executor:
-                    vp_data = await asyncio.get_event_loop().run_in_executor(
-                        executor, sync_check
-                    )
-                
-                if not vp_data:
-                    scan_stats['failed_scans'] += 1
-                    save_stats()
-                    logger.error("Fehler beim Abrufen des Vertretungsplans")
-                    return
-                
-                # Stundenplan-Check
-                checker = StundenplanChecker()
-                ausfaelle = checker.check_vertretungsplan(vp_data)
-                
-                # Neue Ausfälle finden
-                neue_ausfaelle = [a for a in ausfaelle if a['neu']]
-                
-                if neue_ausfaelle:
-                    scan_stats['new_ausfaelle_found'] += len(neue_ausfaelle)
-                    logger.info(f"🚨 {len(neue_ausfaelle)} neue Ausfälle gefunden!")
-                    
-                    # Sende Discord-Nachricht
-                    user = await bot.fetch_user(target_user_id)
-                    if user:
-                        for ausfall in neue_ausfaelle:
-                            embed = discord.Embed(
-                                title="🚨 NEUER AUSFALL!",
-                                color=discord.Color.red(),
-                                timestamp=datetime.now()
-                            )
-                            embed.add_field(name="📅 Datum", 
-                                          value=f"{ausfall['wochentag']}, {ausfall['datum']}", 
-                                          inline=False)
-                            embed.add_field(name="⏰ Stunde", 
-                                          value=str(ausfall['stunde']), 
-                                          inline=True)
-                            embed.add_field(name="👨‍🏫 Lehrer", 
-                                          value=ausfall['lehrer'], 
-                                          inline=True)
-                            embed.set_footer(text=f"Scan #{scan_stats['total_scans']}")
-                            
-                            await user.send(embed=embed)
-                            await asyncio.sleep(0.5)  # Rate limiting
-                
-                scan_stats['successful_scans'] += 1
-                scan_stats['last_scan'] = datetime.now().isoformat()
+            # Zustellung im Hintergrund: der Scan wartet auf keines der Ziele
+            task = notify_im_hintergrund(notifier, neue_ausfaelle, scan=scan_stats['total_scans'],
+                                         zeitstempel=vp_data['zeitstempel'])
+            # Als geprüft gilt der Plan erst, wenn alle Ziele angenommen haben
+            commit_when_accepted(task, lambda: browser_pool.commit(*credentials, vp_data))
+        else:
+            browser_pool.commit(*credentials, vp_data)
+        
+        scan_stats['successful_scans'] += 1
+        scan_stats['last_scan'] = datetime.now().isoformat()
+        with timer.phase('persist'):
+            save_stats()
+            await archivieren(vp_data)
+        logger.info(f"✅ Scan erfolgreich. Neue Ausfälle: {len(neue_ausfaelle)}")
+        return {'zeitstempel': vp_data['zeitstempel'], 'unveraendert': False,
+                'ausfaelle': len(ausfaelle), 'neue_ausfaelle': len(neue_ausfaelle)}
+        
+    except Exception as e:
+        scan_stats['failed_scans'] += 1
+        scheduler.record_failure()
+        save_stats()
+        logger.error(f"❌ Fehler beim Scan: {e}", exc_info=True)
+        return None
+
+
+async def scan_abonnenten(timer: schulportal_lib.PhaseTimer):
+    """
+    Ein Durchlauf für alle Abonnenten: ein Abruf pro Gruppe, Abgleich und
+    Benachrichtigung pro Abonnent (Rückgabe wie scan_and_notify, summiert)
+    """
+    try:
+        scan_stats['total_scans'] += 1
+        scan_nr = scan_stats['total_scans']
+        gruppen = tenant_monitor.gruppen()
+        logger.info(f"Starte Scan #{scan_nr} für {len(tenant_monitor.abonnenten)} Abonnenten "
+                    f"in {len(gruppen)} Gruppen")
+        
+        vorher = dict(tenant_monitor.last_plans)
+        zaehler = {'ausfaelle': 0, 'neue_ausfaelle': 0}
+        
+        async def melden(abonnent, neue_ausfaelle, vp_data):
+            zaehler['neue_ausfaelle'] += len(neue_ausfaelle)
+            notify_im_hintergrund(notifier_fuer(abonnent.id), neue_ausfaelle, scan=scan_nr,
+                                  zeitstempel=vp_data['zeitstempel'], abonnent=abonnent.id)
+        
+        ergebnisse = await tenant_monitor.scan_all(timer, on_neue_ausfaelle=melden)
+        
+        if not any(r is not None for r in ergebnisse.values()):
+            scan_stats['failed_scans'] += 1
+            scheduler.record_failure()
+            with timer.phase('persist'):
                 save_stats()
-                logger.info(f"✅ Scan erfolgreich. Neue Ausfälle: {len(neue_ausfaelle)}")
-                
-            finally:
-                await browser.close()
-                
+            logger.error("Fehler beim Abrufen der Vertretungspläne aller Gruppen")
+            return None
+        
+        # Geändert, wenn sich der Plan mindestens einer Gruppe geändert hat
+        changed = False
+        aktualisierungen = []
+        for gruppe, ergebnis in ergebnisse.items():
+            if ergebnis is None:
+                logger.warning(f"Gruppe {gruppe} konnte nicht abgerufen werden")
+            elif ergebnis:
+                plan = tenant_monitor.last_plans[gruppe]
+                if gruppe in vorher and diff_plans(vorher[gruppe], plan)['tage']:
+                    changed = True
+                aktualisierungen.append(letzte_aktualisierung(plan))
+        aktualisierungen = [a for a in aktualisierungen if a is not None]
+        scheduler.record_success(changed, aktualisierung=max(aktualisierungen) if aktualisierungen else None)
+        
+        unveraendert = all(r is False for r in ergebnisse.values())
+        if unveraendert:
+            scan_stats['unchanged_scans'] += 1
+        scan_stats['new_ausfaelle_found'] += zaehler['neue_ausfaelle']
+        scan_stats['successful_scans'] += 1
+        scan_stats['last_scan'] = datetime.now().isoformat()
+        with timer.phase('persist'):
+            save_stats()
+            for gruppe, ergebnis in ergebnisse.items():
+                if ergebnis:
+                    await archivieren(tenant_monitor.last_plans[gruppe], gruppe)
+        logger.info(f"✅ Scan erfolgreich: {tenant_monitor.stats['abrufe']} Abrufe insgesamt, "
+                    f"neue Ausfälle: {zaehler['neue_ausfaelle']}")
+        return {'zeitstempel': datetime.now().isoformat(), 'unveraendert': unveraendert,
+                'ausfaelle': None, 'neue_ausfaelle': zaehler['neue_ausfaelle']}
+        
     except Exception as e:
         scan_stats['failed_scans'] += 1
+        scheduler.record_failure()
         save_stats()
         logger.error(f"❌ Fehler beim Scan: {e}", exc_info=True)
+        return None
+
 
+# Ein Scan zur Zeit: Loop und /scan teilen laufende und frische Ergebnisse
+scan_coordinator = ScanCoordinator(check_vertretungsplan, freshness=float(os.getenv('SCAN_FRESHNESS', '60')))
 
-@tasks.loop(seconds=300)  # 5 Minuten
+
+@tasks.loop(seconds=300)  # Startwert, danach bestimmt der Scheduler den Abstand
 async def monitoring_loop():
-    """Haupt-Monitoring-Loop"""
+    """Haupt-Monitoring-Loop: scannt und plant den nächsten Scan"""
     if is_monitoring:
-        await check_vertretungsplan()
+        await scan_coordinator.run()
+    
+    delay = scheduler.next_delay()
+    monitoring_loop.change_interval(seconds=delay)
+    logger.info(f"⏰ Nächster Scan um {scheduler.next_scan.strftime('%d.%m. %H:%M:%S')} ({scheduler.reason})")
 
 
 @bot.event
@@ -194,7 +410,7 @@ async def on_ready():
             timestamp=datetime.now()
         )
         embed.add_field(name="Commands", 
-                       value="`/start` - Monitoring starten\n`/stop` - Monitoring stoppen\n`/scanstatus` - Status anzeigen", 
+                       value="`/start` - Monitoring starten\n`/stop` - Monitoring stoppen\n`/scan` - Jetzt prüfen\n`/scanstatus` - Status anzeigen", 
                        inline=False)
         await user.send(embed=embed)
         logger.info("✅ Bereit-Nachricht gesendet")
@@ -213,6 +429,23 @@ async def start_monitoring(ctx):
         await ctx.send("⚠️ Monitoring läuft bereits!")
         return
     
+    # Abonnenten-Datei: Zugangsdaten stehen dort, keine Abfrage nötig
+    if tenant_monitor is not None:
+        is_monitoring = True
+        monitoring_loop.start()
+        embed = discord.Embed(
+            title="✅ Monitoring gestartet!",
+            description=f"Prüfe in der Schulzeit alle {scheduler.interval / 60:g} Minuten auf neue Ausfälle "
+                        f"für alle Abonnenten.",
+            color=discord.Color.green(),
+            timestamp=datetime.now()
+        )
+        embed.add_field(name="Abonnenten", value=str(len(tenant_monitor.abonnenten)), inline=True)
+        embed.add_field(name="Abrufe pro Scan", value=str(len(tenant_monitor.gruppen())), inline=True)
+        await ctx.send(embed=embed)
+        logger.info(f"✅ Monitoring gestartet für {len(tenant_monitor.abonnenten)} Abonnenten")
+        return
+    
     # Frage nach Credentials
     await ctx.send("📝 Bitte gib deinen **Benutzernamen** für das Schulportal ein:\n(Sende `.` für Standard aus .env)")
     
@@ -268,13 +501,14 @@ async def start_monitoring(ctx):
             'institution': institution
         }
         
-        # Starte Monitoring
+        # Starte Monitoring (der erste Durchlauf scannt sofort)
         is_monitoring = True
         monitoring_loop.start()
         
         embed = discord.Embed(
             title="✅ Monitoring gestartet!",
-            description=f"Prüfe alle 5 Minuten auf neue Ausfälle.",
+            description=f"Prüfe in der Schulzeit alle {scheduler.interval / 60:g} Minuten auf neue Ausfälle "
+                        f"(öfter bei Änderungen, seltener nachts, am Wochenende und in den Ferien).",
             color=discord.Color.green(),
             timestamp=datetime.now()
         )
@@ -284,9 +518,6 @@ async def start_monitoring(ctx):
         
         logger.info(f"✅ Monitoring gestartet für Benutzer {username}")
         
-        # Führe ersten Check durch
-        await check_vertretungsplan()
-        
     except asyncio.TimeoutError:
         await ctx.send("❌ Timeout - Vorgang abgebrochen.")
     except Exception as e:
@@ -314,6 +545,45 @@ async def stop_monitoring(ctx):
     logger.info("⏹️ Monitoring gestoppt")
 
 
+@bot.command(name='scan')
+async def scan_now(ctx):
+    """Prüfe sofort (teilt einen laufenden oder gerade beendeten Scan)"""
+    if ctx.author.id != target_user_id:
+        await ctx.send("❌ Du bist nicht autorisiert.")
+        return
+    
+    if not user_credentials and tenant_monitor is None:
+        await ctx.send("⚠️ Keine Zugangsdaten gesetzt. Starte zuerst mit `/start`.")
+        return
+    
+    if scan_coordinator.in_flight:
+        await ctx.send("⏳ Ein Scan läuft bereits, warte auf sein Ergebnis...")
+    else:
+        await ctx.send("🔍 Prüfe Vertretungsplan...")
+    
+    result = await scan_coordinator.run()
+    if result is None:
+        await ctx.send("❌ Scan fehlgeschlagen. Details stehen im Log.")
+        return
+    
+    embed = discord.Embed(
+        title="🔍 Scan-Ergebnis",
+        color=discord.Color.red() if result['neue_ausfaelle'] else discord.Color.green(),
+        timestamp=datetime.now()
+    )
+    if result['unveraendert']:
+        embed.add_field(name="Vertretungsplan", value="Unverändert seit dem letzten Scan", inline=False)
+    elif result['ausfaelle'] is None:
+        embed.add_field(name="Neue Ausfälle (alle Abonnenten)", value=str(result['neue_ausfaelle']), inline=True)
+    else:
+        embed.add_field(name="Ausfälle in deinem Stundenplan", value=str(result['ausfaelle']), inline=True)
+        embed.add_field(name="Davon neu", value=str(result['neue_ausfaelle']), inline=True)
+    embed.add_field(name="Stand",
+                   value=datetime.fromisoformat(result['zeitstempel']).strftime('%d.%m.%Y %H:%M:%S'),
+                   inline=False)
+    await ctx.send(embed=embed)
+
+
 @bot.command(name='scanstatus')
 async def show_status(ctx):
     """Zeige Scan-Status und Statistiken"""
@@ -333,6 +603,20 @@ async def show_status(ctx):
     embed.add_field(name="Erfolgreich", value=str(scan_stats['successful_scans']), inline=True)
     embed.add_field(name="Fehlgeschlagen", value=str(scan_stats['failed_scans']), inline=True)
     embed.add_field(name="Neue Ausfälle gefunden", value=str(scan_stats['new_ausfaelle_found']), inline=True)
+    embed.add_field(name="Unverändert übersprungen", value=str(scan_stats['unchanged_scans']), inline=True)
+    embed.add_field(name="Benachrichtigungen",
+                   value=f"{sum(o.stats['nachrichten'] for o in abonnenten_outboxes.values())} gesendet, "
+                         f"{sum(o.pending for o in abonnenten_outboxes.values())} wartend",
+                   inline=True)
+    embed.add_field(name="Geteilte Scans",
+                   value=str(scan_coordinator.stats['joined'] + scan_coordinator.stats['reused']),
+                   inline=True)
+    if tenant_monitor is not None:
+        embed.add_field(name="Abonnenten",
+                       value=f"{len(tenant_monitor.abonnenten)} in {len(tenant_monitor.gruppen())} Gruppen, "
+                             f"{tenant_monitor.stats['abrufe']} Abrufe "
+                             f"({tenant_monitor.stats['fehlgeschlagen']} fehlgeschlagen)",
+                       inline=False)
     
     if scan_stats['last_scan']:
         last_scan = datetime.fromisoformat(scan_stats['last_scan'])
@@ -340,9 +624,45 @@ async def show_status(ctx):
                        value=last_scan.strftime('%d.%m.%Y %H:%M:%S'), 
                        inline=False)
     
+    if scan_metrics.summary():
+        embed.add_field(name="Phasen (p50 / p95, Anzahl)",
+                       value=f"```\n{scan_metrics.format_table()}\n```",
+                       inline=False)
+    
+    if is_monitoring and scheduler.next_scan:
+        embed.add_field(name="Nächster Scan",
+                       value=f"{scheduler.next_scan.strftime('%d.%m.%Y %H:%M:%S')} ({scheduler.reason})",
+                       inline=False)
+    
     await ctx.send(embed=embed)
 
 
+async def run_bot(token: str):
+    """Startet den Bot und räumt den Browser-Pool beim Beenden auf"""
+    # Optionaler lokaler Metrik-Endpunkt (Prometheus /metrics, JSON /metrics.json)
+    metrics_server = None
+    metrics_port = int(os.getenv('METRICS_PORT', '0'))
+    if metrics_port:
+        metrics_server = MetricsServer(scan_metrics, metrics_port).start()
+    
+    async with bot:
+        try:
+            await bot.start(token)
+        finally:
+            for abonnent_notifier in abonnenten_notifier.values():
+                await abonnent_notifier.close()
+            for abonnent_outbox in abonnenten_outboxes.values():
+                await abonnent_outbox.close()
+            await browser_pool.close()
+            if browser_pool.parse_executor is not None:
+                browser_pool.parse_executor.shutdown()
+            if metrics_server is not None:
+                metrics_server.close()
+            # Ausstehende Zustandsdateien vor dem Beenden schreiben
+            state_writer.close()
+            logger.info(f"Zustand gespeichert ({state_writer.stats['written']} Schreibvorgänge)")
+
+
 def main():
     """Hauptfunktion"""
     token = os.getenv('DISCORD_BOT_TOKEN')
@@ -355,7 +675,10 @@ def main():
         return
     
     logger.info("🚀 Starte Discord Bot...")
-    bot.run(token)
+    try:
+        asyncio.run(run_bot(token))
+    except KeyboardInterrupt:
+        logger.info("⏹️ Bot beendet")
 
 
 if __name__ == "__main__":
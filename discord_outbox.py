@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Discord-Outbox
+Warteschlange für Ausfall-Benachrichtigungen: der Scan legt neue Ausfälle
+nur ab, ein Hintergrund-Task fasst sie pro Tag zu einer Nachricht mit
+mehreren Embeds zusammen und sendet sie über den gemerkten DM-Kanal.
+Wartezeiten richten sich nach Discords Rate-Limit-Antworten statt nach
+festen Pausen.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+import discord
+
+from notifier import Sink
+
+logger = logging.getLogger('DiscordOutbox')
+
+# Discord erlaubt höchstens 10 Embeds pro Nachricht
+MAX_EMBEDS = 10
+MAX_VERSUCHE = 5
+
+
+def ist_ausfall(ausfall: dict) -> bool:
+    """True für Ausfälle aus dem Stundenplan und Regeltreffer der Art Entfall"""
+    art = ausfall.get('art')
+    return not art or 'Entfall' in art
+
+
+def ausfall_embed(ausfall: dict, scan_nr: int = None) -> discord.Embed:
+    """Embed für einen Ausfall oder Regeltreffer (wie bisher eine DM pro Ausfall)"""
+    if ist_ausfall(ausfall):
+        title, color = "🚨 NEUER AUSFALL!", discord.Color.red()
+    else:
+        title, color = f"🔔 NEU: {ausfall['art']}", discord.Color.orange()
+    embed = discord.Embed(title=title, color=color, timestamp=datetime.now())
+    embed.add_field(name="📅 Datum",
+                    value=f"{ausfall['wochentag']}, {ausfall['datum']}",
+                    inline=False)
+    embed.add_field(name="⏰ Stunde", value=str(ausfall['stunde']), inline=True)
+    embed.add_field(name="👨‍🏫 Lehrer", value=ausfall['lehrer'] or '-', inline=True)
+    if ausfall.get('art'):
+        embed.add_field(name="📋 Art", value=ausfall['art'], inline=True)
+    if scan_nr is not None:
+        embed.set_footer(text=f"Scan #{scan_nr}")
+    return embed
+
+
+def build_digests(eintraege: List[tuple]) -> List[tuple]:
+    """
+    Gruppiert Ausfälle pro Tag zu Nachrichten
+
+    Args:
+        eintraege: [(ausfall, scan_nr)] in Eingangsreihenfolge
+
+    Returns:
+        list: [(text, [ausfall, ...], [scan_nr, ...])], höchstens MAX_EMBEDS Ausfälle pro Nachricht
+    """
+    tage = {}
+    for ausfall, scan_nr in eintraege:
+        tage.setdefault(ausfall['datum'], []).append((ausfall, scan_nr))
+
+    digests = []
+    for datum, liste in tage.items():
+        wochentag = liste[0][0]['wochentag']
+        for i in range(0, len(liste), MAX_EMBEDS):
+            teil = liste[i:i + MAX_EMBEDS]
+            anzahl = len(liste)
+            if all(ist_ausfall(a) for a, _ in liste):
+                text = (f"🚨 {anzahl} neue Ausfälle am {wochentag}, {datum}" if anzahl > 1
+                        else f"🚨 Neuer Ausfall am {wochentag}, {datum}")
+            else:
+                text = (f"🔔 {anzahl} neue Meldungen am {wochentag}, {datum}" if anzahl > 1
+                        else f"🔔 Neue Meldung am {wochentag}, {datum}")
+            digests.append((text, [a for a, _ in teil], [s for _, s in teil]))
+    return digests
+
+
+class DiscordOutbox:
+    """
+    Zustellung im Hintergrund
+
+    enqueue() kehrt sofort zurück. Der Worker wartet `sammelzeit` Sekunden
+    auf weitere Ausfälle, gruppiert dann alles Wartende pro Tag und sendet
+    jede Gruppe als eine Nachricht.
+    """
+
+    def __init__(self, client: discord.Client, user_id: int, sammelzeit: float = 1.0):
+        """
+        Args:
+            client: Bot bzw. Client, über den gesendet wird
+            user_id: Discord-User, der die DMs erhält
+            sammelzeit: Sekunden, die auf weitere Ausfälle gewartet wird
+        """
+        self.client = client
+        self.user_id = user_id
+        self.sammelzeit = sammelzeit
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._channel = None
+        self._in_arbeit = 0  # aus der Queue geholt, aber noch nicht zugestellt
+        self.stats = {'ausfaelle': 0, 'nachrichten': 0, 'rate_limits': 0, 'fehler': 0}
+
+    @property
+    def pending(self) -> int:
+        """Anzahl noch nicht zugestellter Ausfälle (auch die gerade gesammelten)"""
+        return (self._queue.qsize() if self._queue is not None else 0) + self._in_arbeit
+
+    def enqueue(self, ausfaelle: List[dict], scan_nr: int = None):
+        """Legt neue Ausfälle zur Zustellung ab (blockiert nicht)"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        for ausfall in ausfaelle:
+            self._queue.put_nowait((ausfall, scan_nr))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self, timeout: float = 10.0):
+        """Stellt Wartendes noch zu (höchstens timeout Sekunden) und beendet den Worker"""
+        if self._worker is None:
+            return
+        if self._queue is not None and not self._worker.done():
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self.pending} Ausfälle beim Beenden nicht zugestellt")
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+    async def _get_channel(self):
+        """DM-Kanal einmal ermitteln und merken (spart fetch_user pro Scan)"""
+        if self._channel is None:
+            user = self.client.get_user(self.user_id) or await self.client.fetch_user(self.user_id)
+            self._channel = user.dm_channel or await user.create_dm()
+        return self._channel
+
+    async def _run(self):
+        while True:
+            eintraege = [await self._queue.get()]
+            self._in_arbeit += 1
+            await asyncio.sleep(self.sammelzeit)
+            while not self._queue.empty():
+                eintraege.append(self._queue.get_nowait())
+                self._in_arbeit += 1
+            try:
+                digests = build_digests(eintraege)
+            except Exception as e:
+                self.stats['fehler'] += 1
+                logger.error(f"Ausfälle konnten nicht gruppiert werden: {e}", exc_info=True)
+                self._erledigt(len(eintraege))
+                continue
+            # Jede Nachricht für sich: ein Fehler verwirft nicht den Rest des Stapels
+            for text, ausfaelle, scan_nrs in digests:
+                try:
+                    embeds = [ausfall_embed(a, s) for a, s in zip(ausfaelle, scan_nrs)]
+                    if await self._send(text, embeds):
+                        self.stats['ausfaelle'] += len(ausfaelle)
+                except Exception as e:
+                    self.stats['fehler'] += 1
+                    self._channel = None
+                    logger.error(f"Fehler bei der Zustellung: {e}", exc_info=True)
+                finally:
+                    self._erledigt(len(ausfaelle))
+
+    def _erledigt(self, anzahl: int):
+        """Markiert anzahl gesammelte Ausfälle als abgearbeitet (für close und pending)"""
+        self._in_arbeit -= anzahl
+        for _ in range(anzahl):
+            self._queue.task_done()
+
+    async def _send(self, text: str, embeds: List[discord.Embed]) -> bool:
+        """
+        Sendet eine Nachricht, wartet bei Rate-Limits so lange wie Discord verlangt
+
+        Returns:
+            bool: True wenn die Nachricht zugestellt wurde
+        """
+        for versuch in range(1, MAX_VERSUCHE + 1):
+            try:
+                channel = await self._get_channel()
+                await channel.send(content=text, embeds=embeds)
+                self.stats['nachrichten'] += 1
+                return True
+            except discord.RateLimited as e:
+                warten = e.retry_after
+            except discord.Forbidden as e:
+                # DMs geschlossen - erneutes Senden hilft nicht
+                self.stats['fehler'] += 1
+                logger.error(f"DM nicht erlaubt: {e}")
+                return False
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    warten = float(e.response.headers.get('Retry-After', 1.0))
+                elif e.status >= 500:
+                    warten = 2.0 ** versuch
+                else:
+                    self.stats['fehler'] += 1
+                    logger.error(f"Nachricht konnte nicht gesendet werden: {e}")
+                    self._channel = None
+                    return False
+            self.stats['rate_limits'] += 1
+            logger.warning(f"Discord verlangt {warten:.1f}s Pause (Versuch {versuch}/{MAX_VERSUCHE})")
+            await asyncio.sleep(warten)
+
+        self.stats['fehler'] += 1
+        logger.error(f"Nachricht nach {MAX_VERSUCHE} Versuchen verworfen: {text}")
+        return False
+
+
+class DiscordSink(Sink):
+    """Notifier-Ziel: legt die Ausfälle in der Outbox ab (Zustellung im Hintergrund)"""
+
+    name = 'discord'
+
+    def __init__(self, outbox: DiscordOutbox, timeout: float = 1.0):
+        """
+        Args:
+            outbox: Outbox, über die zugestellt wird
+            timeout: Höchstdauer des Ablegens in Sekunden
+        """
+        super().__init__(timeout)
+        self.outbox = outbox
+
+    async def deliver(self, ausfaelle: List[dict], meta: dict):
+        self.outbox.enqueue(ausfaelle, scan_nr=meta.get('scan'))
+
+
+def main():
+    """Test-Funktion: Zusammenfassen pro Tag, gemerkter Kanal und Rate-Limits"""
+    import time
+    from types import SimpleNamespace
+
+    class FakeResponse:
+        status = 429
+        reason = 'Too Many Requests'
+        headers = {'Retry-After': '0.2'}
+
+    class FakeChannel:
+        def __init__(self):
+            self.sent = []
+            self.limited = True
+
+        async def send(self, content=None, embeds=()):
+            if self.limited:
+                self.limited = False
+                raise discord.HTTPException(FakeResponse(), 'rate limited')
+            self.sent.append((content, len(embeds)))
+
+    channel = FakeChannel()
+    fetches = []
+
+    class FakeClient:
+        def get_user(self, user_id):
+            return None
+
+        async def fetch_user(self, user_id):
+            fetches.append(user_id)
+            await asyncio.sleep(0.05)  # REST-Aufruf
+            return SimpleNamespace(dm_channel=channel)
+
+    async def demo():
+        outbox = DiscordOutbox(FakeClient(), 1, sammelzeit=0.05)
+        ausfaelle = [{'datum': '01.12.2025', 'wochentag': 'Montag', 'stunde': s, 'lehrer': 'Nie'}
+                     for s in range(1, 11)]
+        ausfaelle.append({'datum': '02.12.2025', 'wochentag': 'Dienstag', 'stunde': 3, 'lehrer': 'Smi'})
+
+        start = time.perf_counter()
+        outbox.enqueue(ausfaelle, scan_nr=1)
+        blockiert = time.perf_counter() - start
+        await outbox.close()
+        zustellung = time.perf_counter() - start
+
+        outbox.enqueue(ausfaelle[:1], scan_nr=2)
+        await outbox.close()
+
+        assert channel.sent[:2] == [("🚨 10 neue Ausfälle am Montag, 01.12.2025", 10),
+                                    ("🚨 Neuer Ausfall am Dienstag, 02.12.2025", 1)]
+        assert len(fetches) == 1, "DM-Kanal wird gemerkt"
+
+        # Regeltreffer ohne Entfall werden nicht als Ausfall gemeldet
+        umzug = {'datum': '03.12.2025', 'wochentag': 'Mittwoch', 'stunde': 5, 'lehrer': '',
+                 'art': 'Raumänderung'}
+        assert build_digests([(umzug, 3)])[0][0] == "🔔 Neue Meldung am Mittwoch, 03.12.2025"
+        embed = ausfall_embed(umzug)
+        assert embed.title == "🔔 NEU: Raumänderung"
+        assert [(f.name, f.value) for f in embed.fields][-2:] == [("👨‍🏫 Lehrer", '-'), ("📋 Art", 'Raumänderung')]
+        assert ausfall_embed(dict(umzug, art='Entfall')).title == "🚨 NEUER AUSFALL!"
+        print(f"📨 11 Ausfälle -> {len(channel.sent) - 1} Nachrichten, "
+              f"enqueue {blockiert * 1e6:.0f} µs, zugestellt nach {zustellung:.2f}s "
+              f"(inkl. 0.2s Rate-Limit; bisher 11 DMs + 5.5s Pausen)")
+        print(f"📊 {outbox.stats}")
+
+    asyncio.run(demo())
+
+    # Ein Fehler verwirft nur seine Nachricht, gezählt werden nur zugestellte Ausfälle
+    class FlakyChannel:
+        def __init__(self):
+            self.sent = []
+
+        async def send(self, content=None, embeds=()):
+            if 'Montag' in content:
+                raise OSError("Verbindung getrennt")
+            if 'Mittwoch' in content:
+                raise discord.Forbidden(SimpleNamespace(status=403, reason='Forbidden'), 'DMs geschlossen')
+            self.sent.append(content)
+
+    async def fehler():
+        flaky = FlakyChannel()
+        client = FakeClient()
+        client.fetch_user = lambda user_id: asyncio.sleep(0, SimpleNamespace(dm_channel=flaky))
+        outbox = DiscordOutbox(client, 1, sammelzeit=0.05)
+        outbox.enqueue([{'datum': f"0{tag}.12.2025", 'wochentag': name, 'stunde': 1, 'lehrer': 'Nie'}
+                        for tag, name in ((1, 'Montag'), (2, 'Dienstag'), (3, 'Mittwoch'))])
+        await asyncio.sleep(0.01)
+        wartend = outbox.pending  # bereits aus der Queue geholt, aber noch nicht gesendet
+        await outbox.close()
+        return flaky.sent, wartend, outbox
+
+    sent, wartend, outbox = asyncio.run(fehler())
+    assert wartend == 3, "pending zählt die gerade gesammelten Ausfälle mit"
+    assert sent == ["🚨 Neuer Ausfall am Dienstag, 02.12.2025"]
+    assert outbox.stats['ausfaelle'] == 1 and outbox.stats['fehler'] == 2 and outbox.pending == 0
+    print(f"🧯 Fehler in 2 von 3 Nachrichten: {outbox.stats}")
+    print("\n✅ Discord-Outbox funktioniert")
+
+
+if __name__ == "__main__":
+    main()
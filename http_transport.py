@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+HTTP-Transport
+Lädt den Vertretungsplan ohne Browser über eine HTTP-Session mit
+Cookie-Jar. Schlägt das fehl, greifen die Aufrufer auf Playwright zurück.
+"""
+
+import json
+import os
+from typing import Optional
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+from change_detector import ChangeDetector
+from schulportal_lib import (
+    LOGIN_URL,
+    VERTRETUNGSPLAN_URL,
+    PhaseTimer,
+    build_vertretungsplan,
+    print_login_header,
+    print_vertretungsplan_header,
+    write_session_state,
+)
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:  # optionale Abhängigkeit
+    requests = None
+
+USER_AGENT = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/130.0 Safari/537.36")
+
+
+def is_available() -> bool:
+    """Prüft ob der HTTP-Transport nutzbar ist (requests installiert)"""
+    return requests is not None
+
+
+class HttpTransport:
+    """Browserloser Abruf des Vertretungsplans für ein Konto"""
+
+    def __init__(self, username: str, password: str, institution_id: str,
+                 session_file: str = None, login_url: str = LOGIN_URL,
+                 vertretungsplan_url: str = VERTRETUNGSPLAN_URL, timeout: float = 15.0):
+        """
+        Args:
+            username: Benutzername
+            password: Passwort
+            institution_id: Institutions-ID
+            session_file: Session-Datei im Playwright-Format (geteilt mit dem Browser)
+            login_url: Login-URL mit Platzhalter {institution_id}
+            vertretungsplan_url: URL des Vertretungsplans
+            timeout: Timeout pro Request in Sekunden
+        """
+        if requests is None:
+            raise RuntimeError("HTTP-Transport benötigt das Paket 'requests'")
+
+        self.username = username
+        self.password = password
+        self.institution_id = institution_id
+        self.session_file = session_file
+        self.login_url = login_url.format(institution_id=institution_id)
+        self.vertretungsplan_url = vertretungsplan_url
+        self.timeout = timeout
+
+        # Eine Session pro Konto: Keep-Alive-Verbindungen + Cookie-Jar
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=2)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['User-Agent'] = USER_AGENT
+        self._load_cookies()
+
+    # ------------------------------------------------------------------
+    # Cookies <-> Playwright Storage-State
+    # ------------------------------------------------------------------
+
+    def _load_cookies(self):
+        if not self.session_file or not os.path.exists(self.session_file):
+            return
+        try:
+            with open(self.session_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            for cookie in state.get('cookies', []):
+                self.session.cookies.set(
+                    cookie['name'], cookie['value'],
+                    domain=cookie.get('domain', ''), path=cookie.get('path', '/')
+                )
+        except Exception as e:
+            print(f"⚠️  Warnung: Session konnte nicht geladen werden: {e}")
+
+    def _save_cookies(self):
+        if not self.session_file:
+            return
+        cookies = []
+        for c in self.session.cookies:
+            cookies.append({
+                'name': c.name,
+                'value': c.value,
+                'domain': c.domain,
+                'path': c.path,
+                'expires': c.expires if c.expires else -1,
+                'httpOnly': bool(c.has_nonstandard_attr('HttpOnly')),
+                'secure': bool(c.secure),
+                'sameSite': 'Lax'
+            })
+        try:
+            write_session_state({'cookies': cookies, 'origins': []}, self.session_file)
+        except Exception as e:
+            print(f"⚠️  Warnung: Session konnte nicht gespeichert werden: {e}")
+
+    # ------------------------------------------------------------------
+    # Abruf
+    # ------------------------------------------------------------------
+
+    def _is_login_url(self, url: str) -> bool:
+        return urlparse(url).netloc == urlparse(self.login_url).netloc
+
+    def login(self) -> bool:
+        """
+        Sendet das Login-Formular wie der Browser ab
+
+        Returns:
+            bool: True wenn Login erfolgreich, False sonst
+        """
+        print_login_header(self.username, self.login_url)
+
+        response = self.session.get(self.login_url, timeout=self.timeout)
+        response.raise_for_status()
+
+        soup = BeautifulSoup(response.text, 'html.parser')
+        user_input = soup.find('input', id='username2')
+        password_input = soup.find('input', id='inputPassword')
+        form = user_input.find_parent('form') if user_input else None
+        if not form or not password_input:
+            print("❌ Login-Formular nicht gefunden")
+            return False
+
+        # Alle vorbelegten Felder übernehmen, dann Zugangsdaten eintragen
+        data = {}
+        for field in form.find_all('input'):
+            name = field.get('name')
+            if name:
+                data[name] = field.get('value', '')
+        data[user_input.get('name', 'user2')] = self.username
+        data[password_input.get('name', 'password')] = self.password
+        # Das Formular-Skript setzt "user" auf "<Institution>.<Benutzername>"
+        if 'user' in data and not data['user']:
+            data['user'] = f"{self.institution_id}.{self.username}"
+
+        action = urljoin(response.url, form.get('action') or response.url)
+        response = self.session.post(action, data=data, timeout=self.timeout)
+        response.raise_for_status()
+
+        if self._is_login_url(response.url):
+            print("❌ Login fehlgeschlagen!")
+            print(f"   Aktuelle URL: {response.url}")
+            return False
+
+        print("✅ Login erfolgreich!\n")
+        self._save_cookies()
+        return True
+
+    def fetch_html(self) -> Optional[str]:
+        """
+        Lädt das HTML des Vertretungsplans
+
+        Returns:
+            str: HTML oder None wenn die Session abgelaufen ist
+        """
+        response = self.session.get(self.vertretungsplan_url, timeout=self.timeout)
+        response.raise_for_status()
+        if self._is_login_url(response.url):
+            return None
+        return response.text
+
+    def get_vertretungsplan(self, timer: PhaseTimer = None,
+                            detector: ChangeDetector = None) -> Optional[dict]:
+        """
+        Ruft den Vertretungsplan ab, Login nur bei abgelaufener Session
+
+        Args:
+            timer: Optionaler PhaseTimer für die Zeitmessung
+            detector: Optionaler ChangeDetector für unveränderte Seiten
+
+        Returns:
+            dict: Vertretungsplan-Daten oder None bei Fehler
+        """
+        print_vertretungsplan_header(self.vertretungsplan_url)
+        timer = timer or PhaseTimer()
+        try:
+            with timer.phase('page_load'):
+                html_content = self.fetch_html()
+            if html_content is None:
+                print("🔒 Session abgelaufen - Login erforderlich")
+                with timer.phase('login_submit'):
+                    logged_in = self.login()
+                if not logged_in:
+                    return None
+                with timer.phase('page_load'):
+                    html_content = self.fetch_html()
+                if html_content is None:
+                    return None
+
+            # Wie im Browser-Pfad: ohne Vertretungsplan-Tabelle kein gültiger Abruf
+            if 'vtable' not in html_content:
+                print("❌ Keine Vertretungsplan-Tabelle im HTML gefunden")
+                return None
+
+            print("✅ Vertretungsplan-Seite geladen (HTTP)")
+            with timer.phase('extract'):
+                return build_vertretungsplan(html_content, detector=detector)
+
+        except Exception as e:
+            print(f"❌ Fehler beim HTTP-Abruf: {e}")
+            return None
+
+    def close(self):
+        """Schließt die Verbindungen der Session"""
+        self.session.close()
+
+
+def main():
+    """Test-Funktion: Login und Abruf gegen einen lokalen Ersatz-Server"""
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    from vertretung_model import tage_dicts
+
+    plan_html = """<html><body>
+<div class="panel panel-primary" id="tag01_12_2025">
+  <div class="panel-heading">Montag, den 01.12.2025 <span class="badge">heute</span></div>
+  <div class="panel-body">
+    <table class="table" data-toggle="table" id="vtable01_12_2025">
+      <thead><tr><th data-field="Stunde">Stunde</th><th data-field="Lehrer">Lehrer</th>
+      <th data-field="Art">Art</th></tr></thead>
+      <tbody><tr><td>3</td><td>Nie</td><td>Entfall</td></tr></tbody>
+    </table>
+    <i>Letzte Aktualisierung: 01.12.2025 um 07:12:00 Uhr</i>
+  </div>
+</div></body></html>"""
+
+    login_html = """<html><body><form method="post" action="/login">
+<input type="hidden" name="user" value="">
+<input id="username2" name="user2"><input id="inputPassword" name="password" type="password">
+<button>Anmelden</button></form></body></html>"""
+
+    class StandIn(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=b'', headers=None):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            port = self.server.server_address[1]
+            if self.path.startswith('/connect'):
+                # Übergabe vom Login-Host an den Start-Host setzt das Session-Cookie
+                self._send(302, headers={'Location': '/vertretungsplan.php',
+                                         'Set-Cookie': 'sid=ok; Path=/'})
+            elif self.path.startswith('/vertretungsplan.php'):
+                if 'sid=ok' in self.headers.get('Cookie', ''):
+                    self._send(200, plan_html.encode())
+                else:
+                    self._send(302, headers={'Location': f'http://localhost:{port}/?i=6081'})
+            else:
+                self._send(200, login_html.encode())
+
+        def do_POST(self):
+            port = self.server.server_address[1]
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length).decode()
+            if 'user=6081.test' in body and 'password=geheim' in body:
+                self._send(302, headers={'Location': f'http://127.0.0.1:{port}/connect'})
+            else:
+                self._send(302, headers={'Location': f'http://localhost:{port}/?i=6081'})
+
+    server = HTTPServer(('127.0.0.1', 0), StandIn)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Login-Host (localhost) und Start-Host (127.0.0.1) unterscheiden sich wie im Original
+    transport = HttpTransport(
+        'test', 'geheim', '6081',
+        login_url=f'http://localhost:{port}/?i={{institution_id}}',
+        vertretungsplan_url=f'http://127.0.0.1:{port}/vertretungsplan.php'
+    )
+    detector = ChangeDetector()
+    data = transport.get_vertretungsplan(detector=detector)
+    detector.commit(data['fingerprint'])
+    again = transport.get_vertretungsplan(detector=detector)
+    transport.close()
+    server.shutdown()
+
+    assert data is not None, "Abruf fehlgeschlagen"
+    assert tage_dicts(data)[0]['vertretungen']['rows'] == [['3', 'Nie', 'Entfall']]
+    assert not data['unveraendert'] and again['unveraendert'], "Unveränderte Seite nicht erkannt"
+    assert tage_dicts(again) == tage_dicts(data)
+    print("\n✅ HTTP-Transport funktioniert gegen den Ersatz-Server")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Lean-Profil
+Blockiert beim Scrapen Bilder, Fonts, Stylesheets und fremde Hosts per
+Request-Routing und zählt, wie viele Requests und Bytes dadurch entfallen
+"""
+
+from urllib.parse import urlparse
+
+# Für Login und Vertretungsplan nicht benötigte Ressourcentypen
+LEAN_BLOCKED_TYPES = {"image", "media", "font", "stylesheet", "texttrack", "manifest"}
+
+# Nur Hosts des Schulportals werden geladen (Skripte dort sind für den Login nötig)
+LEAN_ALLOWED_HOSTS = ("schulportal.hessen.de",)
+
+
+class LeanProfile:
+    """Entscheidet pro Request über Blockieren und führt die Zählung"""
+
+    def __init__(self, blocked_types=None, allowed_hosts=None, calibrate_every: int = 100):
+        """
+        Args:
+            blocked_types: Zu blockierende Ressourcentypen (Standard: LEAN_BLOCKED_TYPES)
+            allowed_hosts: Erlaubte Host-Endungen (Standard: LEAN_ALLOWED_HOSTS)
+            calibrate_every: Jeder N-te Scan lädt alles, um die Größen der
+                blockierten Ressourcen zu lernen (0 = nie)
+        """
+        self.blocked_types = set(blocked_types or LEAN_BLOCKED_TYPES)
+        self.allowed_hosts = tuple(allowed_hosts or LEAN_ALLOWED_HOSTS)
+        self.calibrate_every = calibrate_every
+        self.size_hints = {}
+        self.scans = 0
+        self.calibrating = False
+        self._reset()
+
+    def _reset(self):
+        self.requests_allowed = 0
+        self.requests_blocked = 0
+        self.bytes_loaded = 0
+        self.bytes_saved = 0
+        self.unknown_sizes = 0
+
+    def start_scan(self):
+        """Setzt die Zähler für einen neuen Scan zurück"""
+        self._reset()
+        self.scans += 1
+        # Erster Scan und jeder N-te laden alles und lernen die Größen
+        self.calibrating = bool(self.calibrate_every) and (self.scans - 1) % self.calibrate_every == 0
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        """Prüft ob ein Request blockiert werden soll"""
+        if resource_type in ("document", "xhr", "fetch") and self._allowed_host(url):
+            return False
+        if resource_type in self.blocked_types:
+            return True
+        return not self._allowed_host(url)
+
+    def _allowed_host(self, url: str) -> bool:
+        host = urlparse(url).hostname or ''
+        return any(host == h or host.endswith('.' + h) for h in self.allowed_hosts)
+
+    def decide(self, resource_type: str, url: str) -> bool:
+        """
+        Entscheidet und zählt einen Request
+
+        Returns:
+            bool: True wenn der Request abgebrochen werden soll
+        """
+        block = self.should_block(resource_type, url)
+        if block and not self.calibrating:
+            self.requests_blocked += 1
+            if url in self.size_hints:
+                self.bytes_saved += self.size_hints[url]
+            else:
+                self.unknown_sizes += 1
+            return True
+        self.requests_allowed += 1
+        return False
+
+    def record_response(self, response):
+        """Zählt die geladenen Bytes einer Antwort (laut Content-Length)"""
+        try:
+            size = int(response.headers.get('content-length', 0))
+        except (TypeError, ValueError):
+            return
+        self.bytes_loaded += size
+        if self.should_block(response.request.resource_type, response.url):
+            self.size_hints[response.url] = size
+
+    def report(self) -> dict:
+        """
+        Gibt die Ersparnis des letzten Scans aus
+
+        Returns:
+            dict: requests_blocked, requests_allowed, bytes_loaded, bytes_saved
+        """
+        if self.calibrating:
+            print(f"🪶 Lean: Kalibrier-Scan, {len(self.size_hints)} Ressourcengrößen bekannt")
+        else:
+            hint = f", {self.unknown_sizes} ohne bekannte Größe" if self.unknown_sizes else ""
+            print(f"🪶 Lean: {self.requests_blocked} Requests blockiert, "
+                  f"~{self.bytes_saved / 1024:.0f} KB gespart{hint}, "
+                  f"{self.bytes_loaded / 1024:.0f} KB geladen")
+        return {
+            'requests_blocked': self.requests_blocked,
+            'requests_allowed': self.requests_allowed,
+            'bytes_loaded': self.bytes_loaded,
+            'bytes_saved': self.bytes_saved
+        }
+
+
+def enable_lean_mode(context, profile: LeanProfile):
+    """
+    Aktiviert das Lean-Profil für einen Kontext der synchronen API
+
+    Args:
+        context: playwright.sync_api BrowserContext (oder Page)
+        profile: LeanProfile mit Regeln und Zählern
+    """
+    def handle(route):
+        request = route.request
+        if profile.decide(request.resource_type, request.url):
+            route.abort()
+        else:
+            route.continue_()
+
+    context.route("**/*", handle)
+    context.on("response", profile.record_response)
+
+
+async def enable_lean_mode_async(context, profile: LeanProfile):
+    """
+    Aktiviert das Lean-Profil für einen Kontext der async API
+
+    Args:
+        context: playwright.async_api BrowserContext (oder Page)
+        profile: LeanProfile mit Regeln und Zählern
+    """
+    async def handle(route):
+        request = route.request
+        if profile.decide(request.resource_type, request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route("**/*", handle)
+    context.on("response", profile.record_response)
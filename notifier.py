@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Notifier
+Verteilt neue Ausfälle gleichzeitig an mehrere Ziele (Discord, Webhook,
+NDJSON-Datei, Konsole). Jedes Ziel hat ein eigenes Timeout; ein langsames
+oder fehlerhaftes Ziel hält die anderen nicht auf.
+"""
+
+import abc
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Dict, List
+
+try:
+    import requests
+except ImportError:  # optionale Abhängigkeit (nur für WebhookSink)
+    requests = None
+
+DEFAULT_TIMEOUT = 5.0
+
+
+class Sink(abc.ABC):
+    """Ein Ziel für Benachrichtigungen (Unterklassen implementieren deliver)"""
+
+    name = 'sink'
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT):
+        """
+        Args:
+            timeout: Höchstdauer einer Zustellung in Sekunden
+        """
+        self.timeout = timeout
+
+    @abc.abstractmethod
+    async def deliver(self, ausfaelle: List[dict], meta: dict):
+        """
+        Stellt neue Ausfälle zu
+
+        Args:
+            ausfaelle: Neue Ausfälle aus StundenplanChecker.check_vertretungsplan
+            meta: Zusatzangaben (z.B. scan, zeitstempel)
+        """
+
+
+class StdoutSink(Sink):
+    """Ausgabe in der Konsole (bisherige Ausgabe der CLI)"""
+
+    name = 'stdout'
+
+    async def deliver(self, ausfaelle: List[dict], meta: dict):
+        print("\n" + "🚨" * 35)
+        print("WICHTIG: NEUE AUSFÄLLE IN DEINEM STUNDENPLAN!")
+        print("🚨" * 35)
+        for ausfall in ausfaelle:
+            print(f"📅 {ausfall['wochentag']}, {ausfall['datum']}")
+            print(f"   ⏰ Stunde {ausfall['stunde']}")
+            print(f"   👨‍🏫 Lehrer: {ausfall['lehrer']}")
+            if ausfall.get('art'):
+                print(f"   📋 Art: {ausfall['art']}")
+            print()
+
+
+class NdjsonSink(Sink):
+    """Hängt jeden Ausfall als JSON-Zeile an eine Datei an"""
+
+    name = 'ndjson'
+
+    def __init__(self, path: str, timeout: float = DEFAULT_TIMEOUT):
+        """
+        Args:
+            path: Zieldatei (wird angelegt, Zeilen werden angehängt)
+            timeout: Höchstdauer einer Zustellung in Sekunden
+        """
+        super().__init__(timeout)
+        self.path = path
+
+    def _append(self, lines: List[str]):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(lines))
+
+    async def deliver(self, ausfaelle: List[dict], meta: dict):
+        gemeldet = datetime.now().isoformat()
+        lines = [json.dumps({'gemeldet': gemeldet, **meta, **ausfall}, ensure_ascii=False) + '\n'
+                 for ausfall in ausfaelle]
+        await asyncio.to_thread(self._append, lines)
+
+
+class WebhookSink(Sink):
+    """POST an eine URL: {"ausfaelle": [...], ...meta}"""
+
+    name = 'webhook'
+
+    def __init__(self, url: str, timeout: float = DEFAULT_TIMEOUT):
+        """
+        Args:
+            url: Ziel-URL
+            timeout: Höchstdauer einer Zustellung in Sekunden
+        """
+        if requests is None:
+            raise RuntimeError("WebhookSink benötigt das Paket 'requests'")
+        super().__init__(timeout)
+        self.url = url
+
+    def _post(self, payload: dict):
+        response = requests.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+    async def deliver(self, ausfaelle: List[dict], meta: dict):
+        await asyncio.to_thread(self._post, {'ausfaelle': ausfaelle, **meta})
+
+
+class Notifier:
+    """Verteilt Benachrichtigungen gleichzeitig an alle Ziele"""
+
+    def __init__(self, sinks: List[Sink]):
+        """
+        Args:
+            sinks: Ziele der Benachrichtigungen (Ergebnis und stats sind nach
+                sink.name geschlüsselt, Namen müssen daher eindeutig sein)
+        """
+        names = [sink.name for sink in sinks]
+        doppelt = sorted({name for name in names if names.count(name) > 1})
+        if doppelt:
+            raise ValueError(f"Doppelte Benachrichtigungsziele: {', '.join(doppelt)}")
+        self.sinks = list(sinks)
+        self.stats = {sink.name: {'ok': 0, 'timeout': 0, 'fehler': 0} for sink in self.sinks}
+        self._tasks = set()
+
+    async def _deliver(self, sink: Sink, ausfaelle: List[dict], meta: dict) -> str:
+        try:
+            await asyncio.wait_for(sink.deliver(ausfaelle, meta), sink.timeout)
+            self.stats[sink.name]['ok'] += 1
+            return 'ok'
+        except asyncio.TimeoutError:
+            self.stats[sink.name]['timeout'] += 1
+            print(f"⚠️  Warnung: {sink.name} hat nach {sink.timeout:g}s nicht geantwortet")
+            return 'timeout'
+        except Exception as e:
+            self.stats[sink.name]['fehler'] += 1
+            print(f"⚠️  Warnung: {sink.name} fehlgeschlagen: {e}")
+            return f'fehler: {e}'
+
+    async def notify(self, ausfaelle: List[dict], **meta) -> Dict[str, str]:
+        """
+        Stellt neue Ausfälle an alle Ziele gleichzeitig zu
+
+        Args:
+            ausfaelle: Neue Ausfälle
+            **meta: Zusatzangaben für die Ziele (z.B. scan=42)
+
+        Returns:
+            dict: {ziel: 'ok' | 'timeout' | 'fehler: ...'}
+        """
+        if not ausfaelle or not self.sinks:
+            return {}
+        results = await asyncio.gather(*(self._deliver(sink, ausfaelle, meta) for sink in self.sinks))
+        return {sink.name: result for sink, result in zip(self.sinks, results)}
+
+    def notify_nowait(self, ausfaelle: List[dict], **meta) -> asyncio.Task:
+        """
+        Wie notify, aber im Hintergrund (der Aufrufer wartet nicht)
+
+        Returns:
+            asyncio.Task mit dem Ergebnis von notify
+        """
+        task = asyncio.create_task(self.notify(ausfaelle, **meta))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def notify_sync(self, ausfaelle: List[dict], **meta) -> Dict[str, str]:
+        """notify für synchronen Code (CLI)"""
+        return asyncio.run(self.notify(ausfaelle, **meta))
+
+    async def close(self):
+        """Wartet auf laufende Zustellungen aus notify_nowait"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def sinks_from_env(stdout: bool = False) -> List[Sink]:
+    """
+    Ziele aus der Umgebung
+
+    NOTIFY_SINKS: kommagetrennt stdout, ndjson, webhook
+    NOTIFY_NDJSON_DATEI, NOTIFY_WEBHOOK_URL, NOTIFY_TIMEOUT (Sekunden)
+
+    Args:
+        stdout: StdoutSink immer einschließen
+
+    Returns:
+        list: Ziele in der angegebenen Reihenfolge
+    """
+    timeout = float(os.getenv('NOTIFY_TIMEOUT', str(DEFAULT_TIMEOUT)))
+    names = [n.strip() for n in os.getenv('NOTIFY_SINKS', '').split(',') if n.strip()]
+    if stdout and 'stdout' not in names:
+        names.insert(0, 'stdout')
+
+    sinks = []
+    for i, name in enumerate(names):
+        if name in names[:i]:
+            print(f"⚠️  Warnung: Benachrichtigungsziel '{name}' mehrfach angegeben")
+            continue
+        if name == 'stdout':
+            sinks.append(StdoutSink(timeout))
+        elif name == 'ndjson':
+            sinks.append(NdjsonSink(os.getenv('NOTIFY_NDJSON_DATEI', 'ausfaelle.ndjson'), timeout))
+        elif name == 'webhook':
+            url = os.getenv('NOTIFY_WEBHOOK_URL', '')
+            if not url:
+                print("⚠️  Warnung: NOTIFY_WEBHOOK_URL fehlt - Webhook deaktiviert")
+                continue
+            sinks.append(WebhookSink(url, timeout))
+        else:
+            print(f"⚠️  Warnung: Unbekanntes Benachrichtigungsziel '{name}'")
+    return sinks
+
+
+def main():
+    """Test-Funktion: ein langsames und ein fehlerhaftes Ziel bremsen die anderen nicht"""
+    import tempfile
+    import time
+
+    class SlowSink(Sink):
+        name = 'langsam'
+
+        async def deliver(self, ausfaelle, meta):
+            await asyncio.sleep(5)
+
+    class BrokenSink(Sink):
+        name = 'kaputt'
+
+        async def deliver(self, ausfaelle, meta):
+            raise ConnectionError("Verbindung abgelehnt")
+
+    path = os.path.join(tempfile.mkdtemp(), 'ausfaelle.ndjson')
+    notifier = Notifier([StdoutSink(), NdjsonSink(path), SlowSink(timeout=0.3), BrokenSink()])
+    ausfaelle = [
+        {'datum': '01.12.2025', 'wochentag': 'Montag', 'stunde': 3, 'lehrer': 'Nie',
+         'ausfall_id': '01.12.2025_3_Nie', 'neu': True},
+        {'datum': '02.12.2025', 'wochentag': 'Dienstag', 'stunde': 7, 'lehrer': 'Smi',
+         'ausfall_id': '02.12.2025_7_Smi', 'neu': True},
+    ]
+
+    start = time.perf_counter()
+    result = notifier.notify_sync(ausfaelle, scan=1)
+    elapsed = time.perf_counter() - start
+
+    assert result['stdout'] == 'ok' and result['ndjson'] == 'ok'
+    assert result['langsam'] == 'timeout' and result['kaputt'].startswith('fehler')
+    assert elapsed < 1.0, "Das langsame Ziel darf die anderen nicht aufhalten"
+    with open(path, 'r', encoding='utf-8') as f:
+        zeilen = [json.loads(line) for line in f]
+    assert [z['ausfall_id'] for z in zeilen] == ['01.12.2025_3_Nie', '02.12.2025_7_Smi']
+    assert zeilen[0]['scan'] == 1
+    print(f"📣 {result} nach {elapsed:.2f}s")
+
+    # Ergebnis und Statistik sind nach Namen geschlüsselt: doppelte Namen werden abgelehnt
+    try:
+        Notifier([StdoutSink(), StdoutSink()])
+        raise AssertionError("Doppelte Namen wurden angenommen")
+    except ValueError as e:
+        print(f"🚫 {e}")
+    print("\n✅ Notifier funktioniert")
+
+
+if __name__ == "__main__":
+    main()
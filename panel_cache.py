@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Panel-Cache
+Zerlegt die Vertretungsplan-Seite in ihre Tag-Panels und parst nur die
+Panels neu, deren HTML sich seit einem früheren Scan geändert hat
+"""
+
+import hashlib
+import re
+from collections import OrderedDict
+
+# Öffnendes Tag eines Tag-Panels: <div class="panel ..." id="tag01_12_2025">
+PANEL_START = re.compile(
+    r'<div\b'
+    r'(?=[^>]*\bclass=["\'](?:[^"\']*\s)?panel(?:\s[^"\']*)?["\'])'
+    r'(?=[^>]*\bid=["\']tag)'
+    r'[^>]*>',
+    re.IGNORECASE
+)
+
+# Öffnende und schließende div-Tags für die Suche nach dem Panel-Ende
+DIV_TAG = re.compile(r'<(/?)div\b[^>]*>', re.IGNORECASE)
+
+# Standardgröße: einige Tage mal einige Änderungen pro Tag
+PANEL_CACHE_SIZE = 32
+
+
+def panel_end(html_content: str, start: int, limit: int) -> int:
+    """
+    Position hinter dem schließenden </div> des Panels, das bei start beginnt
+
+    Args:
+        html_content: HTML der Vertretungsplan-Seite
+        start: Anfang des öffnenden Panel-Tags
+        limit: Spätestes Ende (Anfang des nächsten Panels oder Dokumentende)
+
+    Returns:
+        int: Ende des Panels, limit wenn die Tags bis dahin nicht aufgehen
+    """
+    depth = 0
+    for match in DIV_TAG.finditer(html_content, start, limit):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            return match.end()
+    return limit
+
+
+def split_panels(html_content: str) -> list:
+    """
+    Schneidet die Tag-Panels aus dem HTML heraus
+
+    Jedes Stück reicht vom Panel-Anfang bis zu seinem schließenden Tag und
+    lässt sich für sich allein parsen. Was nach dem letzten Panel folgt
+    (Fußzeile, Skripte), gehört zu keinem Stück und ändert keinen Schlüssel.
+
+    Args:
+        html_content: HTML der Vertretungsplan-Seite
+
+    Returns:
+        list: HTML-Stücke, leer wenn die Seite keine Tag-Panels enthält
+    """
+    starts = [m.start() for m in PANEL_START.finditer(html_content)]
+    limits = starts[1:] + [len(html_content)]
+    return [html_content[start:panel_end(html_content, start, limit)]
+            for start, limit in zip(starts, limits)]
+
+
+class PanelCache:
+    """LRU-Cache geparster Tage, Schlüssel ist der Hash des Panel-HTML"""
+
+    def __init__(self, maxsize: int = PANEL_CACHE_SIZE):
+        """
+        Args:
+            maxsize: Maximale Anzahl gespeicherter Panels
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(panel_html: str) -> str:
+        """
+        Hash des unveränderten Panel-HTML
+
+        Nicht normalisiert wie der Fingerabdruck der Seite: schon Leerraum in
+        einer Zelle kann das Ergebnis ändern, ein Treffer muss dieselben Tage liefern.
+        """
+        return hashlib.sha256(panel_html.encode('utf-8')).hexdigest()
+
+    def get(self, key: str):
+        """Liefert die Tage zu einem Panel oder None (zählt Treffer/Fehlschläge)"""
+        days = self._entries.get(key)
+        if days is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return days
+
+    def put(self, key: str, days: list):
+        """Speichert die Tage eines Panels und verdrängt das älteste bei vollem Cache"""
+        self._entries[key] = days
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def parse(self, html_content: str, parse_chunk) -> list:
+        """
+        Parst alle Tage und verwendet unveränderte Panels aus dem Cache
+
+        Die gelieferten Dictionaries werden zwischen Scans geteilt und
+        dürfen nicht verändert werden.
+
+        Args:
+            html_content: HTML der Vertretungsplan-Seite
+            parse_chunk: Funktion HTML -> Liste der Tage (z.B. parse_days)
+
+        Returns:
+            list: Liste mit Dictionaries für jeden Tag
+        """
+        chunks = split_panels(html_content)
+        if not chunks:
+            return parse_chunk(html_content)
+
+        all_days = []
+        for chunk in chunks:
+            key = self.key(chunk)
+            days = self.get(key)
+            if days is None:
+                days = parse_chunk(chunk)
+                self.put(key, days)
+            all_days.extend(days)
+        return all_days
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: hits, misses und size
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Parser-Engines
+Schnelles selectolax-Backend für parse_days und ein Paritäts-Check, der
+alle Backends (und die DOM-Extraktion im Browser) mit der bisherigen
+Implementierung vergleicht
+"""
+
+import sys
+
+from bs4 import BeautifulSoup
+
+from panel_cache import PanelCache, split_panels
+from schulportal_lib import (
+    DOM_EXTRACT_SCRIPT,
+    PARSER_BACKENDS,
+    days_from_dom,
+    parse_datum_text,
+    parse_days,
+    parse_info_table,
+    parse_vertretungsplan_table,
+)
+
+INFO_SUBHEADERS = ["Abwesende Lehrende", "Hinweis", "Von Entfall betroffene Klassen"]
+
+
+def available_backends() -> list:
+    """
+    Liefert die installierten Parser-Backends
+
+    Returns:
+        list: Namen der nutzbaren Backends
+    """
+    backends = ["html.parser"]
+    try:
+        import lxml  # noqa: F401
+        backends.insert(0, "lxml")
+    except ImportError:
+        pass
+    try:
+        import selectolax  # noqa: F401
+        backends.append("selectolax")
+    except ImportError:
+        pass
+    return [b for b in PARSER_BACKENDS if b in backends]
+
+
+# ----------------------------------------------------------------------
+# selectolax-Backend
+# ----------------------------------------------------------------------
+
+def _text(node) -> str:
+    """Entspricht get_text(strip=True) von BeautifulSoup"""
+    return node.text(deep=True, separator='', strip=True)
+
+
+def _attr(node, name: str, default: str = '') -> str:
+    # Attribute ohne Wert liefern bei selectolax None, bei BeautifulSoup ''
+    if name not in node.attributes:
+        return default
+    return node.attributes[name] or ''
+
+
+def _classes(node) -> list:
+    return _attr(node, 'class').split()
+
+
+def _string(node):
+    """Entspricht Tag.string von BeautifulSoup (einziger Text-Kindknoten)"""
+    children = [c for c in node.iter(include_text=True)]
+    if len(children) != 1:
+        return None
+    child = children[0]
+    if child.tag == '-text':
+        return child.text_content
+    return _string(child)
+
+
+def _parse_info_table(panel_body) -> dict:
+    info = {
+        "abwesende_lehrer": "",
+        "hinweis": "",
+        "entfall_klassen": ""
+    }
+
+    info_table = panel_body.css_first('table.infos')
+    if info_table is None:
+        return info
+
+    current_key = None
+    for row in info_table.css('tr'):
+        if 'subheader' in _classes(row):
+            header_text = _text(row)
+            if "Abwesende Lehrende" in header_text:
+                current_key = "abwesende_lehrer"
+            elif "Hinweis" in header_text:
+                current_key = "hinweis"
+            elif "Von Entfall betroffene Klassen" in header_text:
+                current_key = "entfall_klassen"
+        elif current_key:
+            cells = row.css('td')
+            if cells:
+                text = _text(cells[0])
+                if text and text not in INFO_SUBHEADERS:
+                    info[current_key] = text
+
+    return info
+
+
+def _parse_vertretungsplan_table(panel_body, table_id: str):
+    tables = panel_body.css('table')
+
+    table = None
+    for t in tables:
+        if _attr(t, 'id', None) == table_id:
+            table = t
+            break
+
+    if table is None:
+        for t in tables:
+            if _attr(t, 'id').startswith('vtable'):
+                table = t
+                break
+
+    if table is None:
+        return None
+
+    headers = []
+    thead = table.css_first('thead')
+    if thead is not None:
+        for th in thead.css('th'):
+            field_name = _attr(th, 'data-field')
+            if field_name:
+                headers.append(field_name)
+            else:
+                inner = th.css_first('div.th-inner')
+                headers.append(_text(inner if inner is not None else th))
+
+    rows = []
+    tbody = table.css_first('tbody')
+    if tbody is not None:
+        for tr in tbody.css('tr'):
+            rows.append([_text(td) for td in tr.css('td')])
+
+    return {
+        'headers': headers,
+        'rows': rows,
+        'row_count': len(rows),
+        'table_id': _attr(table, 'id', 'unknown')
+    }
+
+
+def extract_all_days_selectolax(html_content: str) -> list:
+    """
+    Extrahiert alle Tage mit selectolax (gleiche Struktur wie extract_all_days)
+
+    Args:
+        html_content: HTML der Vertretungsplan-Seite
+
+    Returns:
+        list: Liste mit Dictionaries für jeden Tag
+    """
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html_content)
+    days_data = []
+
+    for panel in tree.css('div.panel'):
+        panel_id = _attr(panel, 'id')
+        if not panel_id.startswith('tag'):
+            continue
+
+        heading = panel.css_first('div.panel-heading')
+        datum = "Unbekannt"
+        badges = []
+
+        if heading is not None:
+            datum = parse_datum_text(_text(heading))
+            badges = [_text(b) for b in heading.css('span.badge')]
+
+        panel_body = panel.css_first('div.panel-body')
+        if panel_body is None:
+            continue
+
+        info = _parse_info_table(panel_body)
+        table_id = f"vtable{panel_id.replace('tag', '')}"
+        table_data = _parse_vertretungsplan_table(panel_body, table_id)
+
+        update_time = "Unbekannt"
+        for i_elem in panel_body.css('i'):
+            text = _string(i_elem)
+            if text and 'Letzte Aktualisierung' in text:
+                update_time = _text(i_elem)
+                break
+
+        days_data.append({
+            'datum': datum,
+            'badges': badges,
+            'panel_id': panel_id,
+            'informationen': info,
+            'vertretungen': table_data,
+            'letzte_aktualisierung': update_time
+        })
+
+    return days_data
+
+
+# ----------------------------------------------------------------------
+# Paritäts-Check
+# ----------------------------------------------------------------------
+
+def extract_all_days_reference(html_content: str) -> list:
+    """
+    Bisherige Implementierung als Referenz: html.parser und zwei neue
+    BeautifulSoup-Bäume pro Panel
+
+    Args:
+        html_content: HTML der Vertretungsplan-Seite
+
+    Returns:
+        list: Liste mit Dictionaries für jeden Tag
+    """
+    soup = BeautifulSoup(html_content, 'html.parser')
+    days_data = []
+
+    for panel in soup.find_all('div', class_='panel'):
+        panel_id = panel.get('id', '')
+        if not panel_id.startswith('tag'):
+            continue
+
+        heading = panel.find('div', class_='panel-heading')
+        datum = "Unbekannt"
+        badges = []
+
+        if heading:
+            datum_text = heading.get_text(strip=True)
+            badge_elems = heading.find_all('span', class_='badge')
+            badges = [b.get_text(strip=True) for b in badge_elems]
+
+            if ',' in datum_text:
+                parts = datum_text.split()
+                for part in parts:
+                    if '.' in part and len(part) >= 5:
+                        datum = part.replace('den', '').strip()
+                        break
+
+        panel_body = panel.find('div', class_='panel-body')
+        if not panel_body:
+            continue
+
+        info = parse_info_table(BeautifulSoup(str(panel_body), 'html.parser'))
+        table_id = f"vtable{panel_id.replace('tag', '')}"
+        table_data = parse_vertretungsplan_table(BeautifulSoup(str(panel_body), 'html.parser'), table_id)
+
+        update_elem = panel_body.find('i', string=lambda t: t and 'Letzte Aktualisierung' in t)
+        update_time = update_elem.get_text(strip=True) if update_elem else "Unbekannt"
+
+        days_data.append({
+            'datum': datum,
+            'badges': badges,
+            'panel_id': panel_id,
+            'informationen': info,
+            'vertretungen': table_data,
+            'letzte_aktualisierung': update_time
+        })
+
+    return days_data
+
+
+SAMPLE_HTML = """<!DOCTYPE html>
+<html><head><title>Vertretungsplan</title></head><body>
+<div class="panel panel-info" id="menu"><div class="panel-body">Kein Tag</div></div>
+<div class="panel panel-primary" id="tag01_12_2025">
+  <div class="panel-heading">
+    Vertretungen am Montag, den 01.12.2025
+    <span class="badge">heute</span> <span class="badge pull-right">49. KW</span>
+  </div>
+  <div class="panel-body">
+    <table class="table infos">
+      <tr class="subheader"><td>Abwesende Lehrende</td></tr>
+      <tr><td>Nie, Smi</td></tr>
+      <tr class="subheader"><td>Hinweis</td></tr>
+      <tr><td>  Wandertag der <b>E-Phase</b>&nbsp;</td></tr>
+    </table>
+    <table class="table" data-toggle="table" id="vtable01_12_2025">
+      <thead><tr>
+        <th data-field="Stunde"><div class="th-inner">Stunde</div></th>
+        <th data-field="Klasse">Klasse</th>
+        <th data-field="Vertreter">Vertreter</th>
+        <th data-field="Lehrer">Lehrer</th>
+        <th data-field="Art">Art</th>
+        <th data-field="Fach">Fach</th>
+        <th data-field="Raum">Raum</th>
+        <th><div class="th-inner">Hinweis</div></th>
+      </tr></thead>
+      <tbody>
+        <tr><td>3</td><td>E</td><td></td><td>Nie</td><td>Entfall</td><td>PH 2</td><td></td><td></td></tr>
+        <tr><td>9 - 10</td><td>E</td><td>Ori</td><td><span>Ori</span></td><td>Raumvertretung</td>
+            <td>ET 2</td><td>027</td><td>&nbsp;</td></tr>
+      </tbody>
+    </table>
+    <i>Letzte Aktualisierung: 01.12.2025 um 07:12:00 Uhr</i>
+  </div>
+</div>
+<div class="panel panel-primary" id="tag02_12_2025" style="display: none">
+  <div class="panel-heading">Dienstag, den 02.12.2025 <span class="badge">morgen</span></div>
+  <div class="panel-body">
+    <table class="table infos">
+      <tr class="subheader"><td>Von Entfall betroffene Klassen</td></tr>
+      <tr><td>E</td></tr>
+    </table>
+    <table class="table" id="vtable_anders">
+      <thead><tr><th data-field="Stunde">Stunde</th><th data-field="Lehrer">Lehrer</th></tr></thead>
+      <tbody><tr><td>7</td><td>Smi</td></tr></tbody>
+    </table>
+    <i>Letzte Aktualisierung: <b>01.12.2025</b></i>
+    <i>Letzte Aktualisierung: 01.12.2025 um 15:30:00 Uhr</i>
+  </div>
+</div>
+<div class="panel" id="tag03_12_2025">
+  <div class="panel-heading">Mittwoch 03.12.2025</div>
+  <div class="panel-body"><p>Keine Einträge</p></div>
+</div>
+</body></html>"""
+
+
+def check_parity(html_content: str) -> dict:
+    """
+    Vergleicht alle installierten Backends mit der Referenz
+
+    Args:
+        html_content: HTML der Vertretungsplan-Seite
+
+    Returns:
+        dict: {backend: True/False}
+    """
+    reference = extract_all_days_reference(html_content)
+    results = {}
+    for backend in available_backends():
+        results[backend] = parse_days(html_content, backend) == reference
+        # Mit Panel-Cache: erster Lauf parst Stück für Stück, zweiter kommt aus dem Cache
+        cache = PanelCache()
+        results[f"{backend}+cache"] = all(
+            parse_days(html_content, backend, cache) == reference for _ in range(2)
+        )
+    return results
+
+
+def check_dom_parity(html_content: str):
+    """
+    Vergleicht die Extraktion im Browser (DOM_EXTRACT_SCRIPT) mit der Referenz
+
+    Returns:
+        bool oder None, wenn kein Browser verfügbar ist
+    """
+    try:
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=True)
+            try:
+                page = browser.new_page()
+                page.set_content(html_content)
+                days = days_from_dom(page.evaluate(DOM_EXTRACT_SCRIPT))
+            finally:
+                browser.close()
+    except Exception as e:
+        print(f"   ℹ️  DOM-Extraktion übersprungen (kein Browser: {str(e).splitlines()[0]})")
+        return None
+    return days == extract_all_days_reference(html_content)
+
+
+def main():
+    """Paritäts-Check: python parser_engines.py [gespeicherte_seite.html ...]"""
+    import time
+
+    sources = {}
+    for path in sys.argv[1:]:
+        with open(path, 'r', encoding='utf-8') as f:
+            sources[path] = f.read()
+    if not sources:
+        sources['Beispielseite'] = SAMPLE_HTML
+
+    ok = True
+    for name, html_content in sources.items():
+        print(f"\n📄 {name}")
+        for backend, equal in check_parity(html_content).items():
+            if backend.endswith('+cache'):
+                print(f"   {'✅' if equal else '❌'} {backend}")
+                ok = ok and equal
+                continue
+            start = time.perf_counter()
+            for _ in range(20):
+                parse_days(html_content, backend)
+            elapsed = (time.perf_counter() - start) / 20 * 1000
+            print(f"   {'✅' if equal else '❌'} {backend:<12} {elapsed:7.2f} ms")
+            ok = ok and equal
+
+        start = time.perf_counter()
+        for _ in range(20):
+            extract_all_days_reference(html_content)
+        elapsed = (time.perf_counter() - start) / 20 * 1000
+        print(f"   ℹ️  {'Referenz':<12} {elapsed:7.2f} ms")
+
+        # Pro Durchlauf ändert sich nur das letzte Panel: nur dieses wird neu geparst
+        chunks = split_panels(html_content)
+        if len(chunks) > 1:
+            last = html_content.rindex(chunks[-1])
+            head, tail = html_content[:last], html_content[last + len(chunks[-1]):]
+            cache = PanelCache()
+            start = time.perf_counter()
+            for i in range(20):
+                parse_days(head + chunks[-1].replace('</div>', f'<i>{i}</i></div>', 1) + tail, cache=cache)
+            elapsed = (time.perf_counter() - start) / 20 * 1000
+            print(f"   ℹ️  {'Panel-Cache':<12} {elapsed:7.2f} ms "
+                  f"({cache.hits} Treffer, {cache.misses} neu geparst, 1 geändertes Panel pro Scan)")
+
+            # Änderungen nach dem letzten Panel (Fußzeile) parsen kein Panel neu
+            cache = PanelCache()
+            parse_days(html_content, cache=cache)
+            parse_days(head + chunks[-1] + '<footer>Stand 07:31</footer>' + tail, cache=cache)
+            footer_ok = cache.misses == len(chunks)
+            print(f"   {'✅' if footer_ok else '❌'} {'Panel-Ende':<12} Fußzeile ändert kein Panel")
+            ok = ok and footer_ok
+
+            # Panels, die sich nur im Leerraum unterscheiden, teilen keinen Eintrag
+            cache = PanelCache()
+            varianten = [head + chunks[-1].replace('</div>', f'<i>{text}</i></div>', 1) + tail
+                         for text in ('Raum  027', 'Raum 027')]
+            for variante in varianten:
+                parse_days(variante, cache=cache)
+            space_ok = cache.misses == len(chunks) + 1
+            print(f"   {'✅' if space_ok else '❌'} {'Leerraum':<12} eigener Cache-Eintrag")
+            ok = ok and space_ok
+
+        dom_equal = check_dom_parity(html_content)
+        if dom_equal is not None:
+            print(f"   {'✅' if dom_equal else '❌'} {'dom':<12}")
+            ok = ok and dom_equal
+
+    if not ok:
+        print("\n❌ Abweichungen gefunden!")
+        sys.exit(1)
+    print("\n✅ Alle Backends liefern identische Ergebnisse")
+
+
+if __name__ == "__main__":
+    main()
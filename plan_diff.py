@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Plan-Diff
+Vergleicht zwei Vertretungspläne zeilenweise und liefert pro Tag die
+hinzugekommenen, weggefallenen und geänderten Vertretungen
+"""
+
+from collections import defaultdict
+from typing import Optional
+
+from vertretung_model import tage_from_result
+
+# Felder, die eine Vertretung identifizieren - Änderungen an den übrigen
+# Feldern (Vertreter, Raum, Art, Hinweis, ...) gelten als Änderung der Zeile
+KEY_FIELDS = ('Stunde', 'Klasse', 'Lehrer', 'Fach')
+
+
+def _row_dict(tag, vertretung) -> dict:
+    return dict(zip(tag.headers, vertretung.values))
+
+
+def _keyed_rows(tag) -> dict:
+    """
+    Ordnet die Zeilen eines Tages ihrem Schlüssel zu
+
+    Gleiche Schlüssel (z.B. zwei Klassen mit demselben Eintrag) werden
+    durchnummeriert, damit jede Zeile einen eindeutigen Schlüssel hat.
+    """
+    rows = {}
+    if not tag.vertretungen:
+        return rows
+    key_fields = [f for f in KEY_FIELDS if f in tag.columns] or list(tag.headers)
+    seen = defaultdict(int)
+    for vertretung in tag.vertretungen:
+        key = tuple(vertretung.get(f, '') for f in key_fields)
+        rows[key + (seen[key],)] = _row_dict(tag, vertretung)
+        seen[key] += 1
+    return rows
+
+
+def _day_key(tag) -> str:
+    return tag.date.isoformat() if tag.date else tag.datum
+
+
+def diff_tag(alt, neu) -> dict:
+    """
+    Vergleicht die Zeilen eines Tages
+
+    Args:
+        alt: Tag-Objekt des alten Plans oder None
+        neu: Tag-Objekt des neuen Plans oder None
+
+    Returns:
+        dict: added, removed (Zeilen als {Spalte: Wert}) und modified
+            ([{'vorher', 'nachher', 'felder'}])
+    """
+    alt_rows = _keyed_rows(alt) if alt is not None else {}
+    neu_rows = _keyed_rows(neu) if neu is not None else {}
+
+    added = [row for key, row in neu_rows.items() if key not in alt_rows]
+    removed = [row for key, row in alt_rows.items() if key not in neu_rows]
+    modified = []
+    for key, row in neu_rows.items():
+        vorher = alt_rows.get(key)
+        if vorher is None or vorher == row:
+            continue
+        felder = [f for f in row.keys() | vorher.keys() if row.get(f) != vorher.get(f)]
+        modified.append({'vorher': vorher, 'nachher': row, 'felder': sorted(felder)})
+
+    return {'added': added, 'removed': removed, 'modified': modified}
+
+
+def diff_plans(alt: Optional[dict], neu: dict) -> dict:
+    """
+    Vergleicht zwei Pläne (Ergebnisse von get_vertretungsplan oder
+    SnapshotArchive.at) in linearer Zeit
+
+    Args:
+        alt: Älterer Plan oder None (dann ist alles neu)
+        neu: Neuerer Plan
+
+    Returns:
+        dict: {'tage': {datum: diff_tag(...)} nur für Tage mit Änderungen,
+               'neue_tage': [...], 'entfernte_tage': [...]}
+               datum ist ISO ("2025-12-01") oder der Text, wenn unlesbar
+    """
+    alt_tage = {_day_key(t): t for t in tage_from_result(alt)} if alt else {}
+    neu_tage = {_day_key(t): t for t in tage_from_result(neu)}
+
+    tage = {}
+    for datum in list(neu_tage) + [d for d in alt_tage if d not in neu_tage]:
+        diff = diff_tag(alt_tage.get(datum), neu_tage.get(datum))
+        if diff['added'] or diff['removed'] or diff['modified']:
+            tage[datum] = diff
+
+    return {
+        'tage': tage,
+        'neue_tage': [d for d in neu_tage if d not in alt_tage],
+        'entfernte_tage': [d for d in alt_tage if d not in neu_tage]
+    }
+
+
+def summarize(diff: dict) -> str:
+    """Kurze Zusammenfassung für Logs ("+2 −1 ~1 in 2 Tag(en)")"""
+    added = sum(len(d['added']) for d in diff['tage'].values())
+    removed = sum(len(d['removed']) for d in diff['tage'].values())
+    modified = sum(len(d['modified']) for d in diff['tage'].values())
+    return f"+{added} −{removed} ~{modified} in {len(diff['tage'])} Tag(en)"
+
+
+def main():
+    """Test-Funktion: Änderungen erkennen und Laufzeit bei großen Plänen"""
+    import copy
+    import time
+
+    from parser_engines import SAMPLE_HTML
+    from schulportal_lib import parse_days
+
+    alt = {'tage': parse_days(SAMPLE_HTML)}
+    neu = copy.deepcopy(alt)
+    rows = neu['tage'][0]['vertretungen']['rows']
+    rows[1][6] = '101'  # Raum geändert
+    rows.append(['5', 'Q1', '', 'Smi', 'Entfall', 'M', '', ''])  # neu
+    del rows[0]  # zurückgenommen
+    neu['tage'][0]['vertretungen']['row_count'] = len(rows)
+
+    diff = diff_plans(alt, neu)
+    tag = diff['tage']['2025-12-01']
+    assert [r['Lehrer'] for r in tag['added']] == ['Smi']
+    assert [r['Lehrer'] for r in tag['removed']] == ['Nie']
+    assert tag['modified'][0]['felder'] == ['Raum']
+    assert diff_plans(alt, alt)['tage'] == {}
+    print(f"🔍 Beispiel: {summarize(diff)}")
+
+    # Großer Plan: 10 Tage mit je n Zeilen, 1 % geändert
+    headers = ['Stunde', 'Klasse', 'Vertreter', 'Lehrer', 'Art', 'Fach', 'Raum', 'Hinweis']
+    for n in (100, 1000, 10000):
+        def plan(changed: bool) -> dict:
+            tage = []
+            for d in range(10):
+                rows = [[str(i % 10 + 1), f"K{i}", '', f"L{i % 50}", 'Vertretung', 'M', 'R1', '']
+                        for i in range(n)]
+                if changed:
+                    for i in range(0, n, 100):
+                        rows[i][6] = 'R2'
+                tage.append({'datum': f"{d + 1:02d}.12.2025", 'badges': [], 'panel_id': f"tag{d}",
+                             'informationen': {}, 'letzte_aktualisierung': '',
+                             'vertretungen': {'headers': headers, 'rows': rows,
+                                              'row_count': n, 'table_id': f"vtable{d}"}})
+            return {'tage': tage}
+
+        alt, neu = plan(False), plan(True)
+        start = time.perf_counter()
+        diff = diff_plans(alt, neu)
+        elapsed = time.perf_counter() - start
+        print(f"   {10 * n:>7} Zeilen: {elapsed * 1000:7.1f} ms ({summarize(diff)})")
+
+    print("\n✅ Diff erkennt hinzugekommene, weggefallene und geänderte Zeilen")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Regel-Engine
+Deklarative Abo-Regeln (Klasse, Fach, Raum, Art, Lehrer, Stunden, Wochentag),
+die einmal zu Prädikaten und Nachschlagetabellen kompiliert und dann in
+einem Durchlauf über die Zeilen jedes Tages ausgewertet werden
+
+Die Nachschlagetabelle ist nach (Wochentag, Stunde, Feld, Wert) geschlüsselt,
+Feld ist das selektivste Feld der Regel (Lehrer vor Klasse, Fach, Raum).
+Regeln ohne Wochentag oder Stunden stehen dort mit None. Pro Zeile sind es
+damit höchstens 2 x (Stunden + 1) x (Zellen + 1) Nachschlagungen, egal wie
+viele Regeln und Abonnenten es gibt.
+
+Beispielregel (JSON):
+    {"id": "q1-mathe", "abonnent": 1234, "klasse": ["Q1"], "fach": ["M"],
+     "art": ["Entfall", "Raumänderung"], "stunden": "1-6"}
+"""
+
+import json
+import re
+from collections import defaultdict
+from typing import Callable, Dict, Hashable, List
+
+from vertretung_model import tage_from_result
+
+# Felder mit exaktem Vergleich: Regeln werden über sie in Tabellen einsortiert
+INDEX_FIELDS = {
+    'lehrer': 'Lehrer',
+    'klasse': 'Klasse',
+    'fach': 'Fach',
+    'raum': 'Raum',
+}
+# Reihenfolge der Einsortierung: das selektivste vorhandene Feld zuerst
+INDEX_ORDER = ('lehrer', 'klasse', 'fach', 'raum')
+REGEL_FELDER = set(INDEX_FIELDS) | {'art', 'stunden', 'wochentag', 'id', 'abonnent'}
+
+# Mehrere Klassen in einer Zelle: "05a, 05b" oder "Q1 Q2"
+KLASSEN_TRENNER = re.compile(r'[,\s]+')
+
+
+def _values(value) -> tuple:
+    if isinstance(value, (list, tuple, set)):
+        return tuple(str(v).strip() for v in value)
+    return (str(value).strip(),)
+
+
+def _parse_stunden(value) -> range:
+    """"3", "1-6", [1, 6] oder 3 -> range"""
+    if isinstance(value, int):
+        return range(value, value + 1)
+    if isinstance(value, (list, tuple)):
+        return range(int(value[0]), int(value[-1]) + 1)
+    parts = str(value).split('-')
+    return range(int(parts[0]), int(parts[-1]) + 1)
+
+
+def _cell_tokens(field: str, cell: str) -> tuple:
+    cell = cell.strip()
+    if field == 'klasse':
+        return tuple(t for t in KLASSEN_TRENNER.split(cell) if t) or (cell,)
+    return (cell,)
+
+
+class Regel:
+    """Eine kompilierte Regel: Prädikate für alle nicht eingetragenen Felder"""
+
+    __slots__ = ('id', 'abonnent', 'stunden', 'wochentage', 'predicates', 'index_field', 'index_values')
+
+    def __init__(self, spec: dict):
+        """
+        Args:
+            spec: Regel als Dictionary (siehe Modul-Dokumentation)
+        """
+        unbekannt = set(spec) - REGEL_FELDER
+        if unbekannt:
+            raise ValueError(f"Unbekannte Regelfelder: {', '.join(sorted(unbekannt))}")
+
+        self.id = spec.get('id')
+        self.abonnent = spec.get('abonnent')
+        self.stunden = _parse_stunden(spec['stunden']) if 'stunden' in spec else None
+        self.wochentage = _values(spec['wochentag']) if 'wochentag' in spec else None
+
+        # Das selektivste Feld übernimmt die Nachschlagetabelle, der Rest wird Prädikat
+        self.index_field = next((f for f in INDEX_ORDER if f in spec), None)
+        self.index_values = _values(spec[self.index_field]) if self.index_field else ()
+
+        predicates: List[Callable] = []
+        for field, column in INDEX_FIELDS.items():
+            if field in spec and field != self.index_field:
+                wanted = frozenset(_values(spec[field]))
+                predicates.append(self._exact(field, column, wanted))
+        if 'art' in spec:
+            arten = _values(spec['art'])
+            predicates.append(lambda tag, v: v.art is not None and any(a in v.art for a in arten))
+        # Wochentag und Stunden stecken im Schlüssel der Tabelle, nicht in den Prädikaten
+        self.predicates = tuple(predicates)
+
+    def keys(self) -> list:
+        """Schlüssel (wochentag, stunde, feld, wert) der Regel, None = beliebig"""
+        return [(wochentag, stunde, self.index_field, value)
+                for wochentag in (self.wochentage or (None,))
+                for stunde in (self.stunden or (None,))
+                for value in (self.index_values or (None,))]
+
+    @staticmethod
+    def _exact(field: str, column: str, wanted: frozenset) -> Callable:
+        def predicate(tag, v):
+            cell = v.get(column)
+            return cell is not None and any(t in wanted for t in _cell_tokens(field, cell))
+        return predicate
+
+    def matching_stunden(self, vertretung) -> list:
+        """Stunden der Zeile, die im Stundenbereich der Regel liegen"""
+        if self.stunden is None:
+            return list(vertretung.stunden)
+        return [s for s in vertretung.stunden if s in self.stunden]
+
+
+def regeln_aus_stundenplan(stundenplan: dict, abonnent: Hashable = None) -> List[dict]:
+    """
+    Übersetzt einen Stundenplan in Regeln mit der Logik von StundenplanChecker
+    (Entfall beim eigenen Lehrer in der eigenen Stunde)
+
+    Args:
+        stundenplan: {wochentag: {stunde: lehrerkuerzel}}
+        abonnent: Kennung des Abonnenten
+
+    Returns:
+        list: Regeln als Dictionaries
+    """
+    return [
+        {'id': f"{wochentag}-{stunde}", 'abonnent': abonnent, 'wochentag': wochentag,
+         'stunden': stunde, 'lehrer': lehrer, 'art': 'Entfall'}
+        for wochentag, stunden in stundenplan.items()
+        for stunde, lehrer in stunden.items()
+    ]
+
+
+def ausfaelle_aus_treffern(treffer: List[dict]) -> List[dict]:
+    """
+    Übersetzt Treffer von RegelEngine.match in das Format der Ausfälle von
+    StundenplanChecker (ein Eintrag pro Stunde), damit sie wie Ausfälle
+    gespeichert und gemeldet werden
+
+    Args:
+        treffer: Treffer eines Abonnenten
+
+    Returns:
+        list: Ausfälle mit datum, wochentag, stunde, lehrer, art, regel und
+            ausfall_id (um die Regel ergänzt, damit mehrere Regeln derselben
+            Zeile getrennt gemeldet werden)
+    """
+    ausfaelle = []
+    for t in treffer:
+        zeile = t['zeile']
+        lehrer = zeile.get('Lehrer', '')
+        for stunde in t['stunden'] or [zeile.get('Stunde', '')]:
+            ausfaelle.append({
+                'datum': t['datum'],
+                'wochentag': t['wochentag'],
+                'stunde': stunde,
+                'lehrer': lehrer,
+                'art': zeile.get('Art', ''),
+                'regel': t['regel'],
+                'ausfall_id': f"{t['datum']}_{stunde}_{lehrer}_{t['regel']}"
+            })
+    return ausfaelle
+
+
+class RegelEngine:
+    """Wertet viele Regeln in einem Durchlauf über die Zeilen aus"""
+
+    def __init__(self, regeln: List[dict] = ()):
+        """
+        Args:
+            regeln: Regeln als Dictionaries
+        """
+        self.regeln: List[Regel] = []
+        self._table: Dict[tuple, List[Regel]] = defaultdict(list)
+        self._fields = set()  # Felder, nach denen mindestens eine Regel eingetragen ist
+        for spec in regeln:
+            self.add(spec)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'RegelEngine':
+        """Lädt Regeln aus einer JSON-Datei (Liste von Regeln)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def add(self, spec: dict) -> Regel:
+        """Kompiliert eine Regel und trägt sie in die Tabellen ein"""
+        regel = Regel(spec)
+        self.regeln.append(regel)
+        for key in regel.keys():
+            self._table[key].append(regel)
+        if regel.index_field is not None:
+            self._fields.add(regel.index_field)
+        return regel
+
+    def _candidates(self, tag, vertretung) -> list:
+        """Regeln, deren Schlüssel zu Wochentag, Stunden und Zellen der Zeile passen"""
+        cells = [(None, None)]
+        for field in INDEX_ORDER:
+            if field not in self._fields:
+                continue
+            cell = vertretung.get(INDEX_FIELDS[field])
+            if cell is not None:
+                cells.extend((field, token) for token in _cell_tokens(field, cell))
+
+        candidates = []
+        table = self._table
+        for wochentag in (tag.wochentag, None):
+            for stunde in (*vertretung.stunden, None):
+                for field, value in cells:
+                    candidates.extend(table.get((wochentag, stunde, field, value), ()))
+        return candidates
+
+    def match(self, vertretungsplan_data: dict) -> Dict[Hashable, List[dict]]:
+        """
+        Wertet alle Regeln gegen einen Plan aus
+
+        Args:
+            vertretungsplan_data: Ergebnis von get_vertretungsplan
+
+        Returns:
+            dict: {abonnent: [treffer, ...]} mit treffer = regel, datum,
+                wochentag, stunden und zeile ({Spalte: Wert})
+        """
+        treffer = defaultdict(list)
+        for tag in tage_from_result(vertretungsplan_data):
+            for vertretung in tag.vertretungen:
+                seen = set()
+                for regel in self._candidates(tag, vertretung):
+                    if id(regel) in seen:
+                        continue
+                    seen.add(id(regel))
+                    if not all(p(tag, vertretung) for p in regel.predicates):
+                        continue
+                    stunden = regel.matching_stunden(vertretung)
+                    if regel.stunden is not None and not stunden:
+                        continue
+                    treffer[regel.abonnent].append({
+                        'regel': regel.id,
+                        'datum': tag.datum,
+                        'wochentag': tag.wochentag,
+                        'stunden': stunden,
+                        'zeile': dict(zip(tag.headers, vertretung.values))
+                    })
+        return dict(treffer)
+
+
+def main():
+    """Test-Funktion: Beispielregeln und Laufzeit bei wachsender Regelanzahl"""
+    import random
+    import time
+
+    from parser_engines import SAMPLE_HTML
+    from schulportal_lib import parse_days
+
+    vp_data = {'tage': parse_days(SAMPLE_HTML)}
+    engine = RegelEngine([
+        {'id': 'nie-entfall', 'abonnent': 'a', 'lehrer': 'Nie', 'art': 'Entfall'},
+        {'id': 'e-phase-spaet', 'abonnent': 'b', 'klasse': 'E', 'stunden': '8-10'},
+        {'id': 'raum-027', 'abonnent': 'c', 'raum': '027', 'wochentag': 'Montag'},
+        {'id': 'alles-dienstag', 'abonnent': 'd', 'wochentag': 'Dienstag'},
+        {'id': 'nie-raumvertretung', 'abonnent': 'e', 'lehrer': 'Nie', 'art': 'Raumvertretung'},
+    ])
+    result = engine.match(vp_data)
+    assert [t['stunden'] for t in result['a']] == [[3]]
+    assert [t['stunden'] for t in result['b']] == [[9, 10]]
+    assert result['c'][0]['zeile']['Lehrer'] == 'Ori'
+    assert [t['datum'] for t in result['d']] == ['02.12.2025']
+    assert 'e' not in result
+    for abonnent, liste in sorted(result.items()):
+        print(f"   {abonnent}: {[(t['regel'], t['datum'], t['stunden']) for t in liste]}")
+
+    # Der bisherige Stundenplan-Abgleich lässt sich als Regeln ausdrücken
+    plan_regeln = regeln_aus_stundenplan({'Montag': {3: 'Nie', 4: 'Smi'}, 'Dienstag': {7: 'Smi'}}, 'f')
+    assert [t['stunden'] for t in RegelEngine(plan_regeln).match(vp_data)['f']] == [[3]]
+
+    # Laufzeit: gleicher Plan, immer mehr Regeln
+    random.seed(17)
+    headers = ['Stunde', 'Klasse', 'Vertreter', 'Lehrer', 'Art', 'Fach', 'Raum', 'Hinweis']
+    arten = ['Entfall', 'Vertretung', 'Raumänderung']
+    rows = [[str(random.randint(1, 10)), f"K{random.randint(1, 40)}", '', f"L{random.randint(1, 80)}",
+             random.choice(arten), f"F{random.randint(1, 15)}", f"R{random.randint(1, 60)}", '']
+            for _ in range(200)]
+    tage = [{'datum': f"0{d}.12.2025", 'badges': [], 'panel_id': f"tag{d}", 'informationen': {},
+             'letzte_aktualisierung': '', 'vertretungen': {'headers': headers, 'rows': rows,
+                                                          'row_count': len(rows), 'table_id': 'v'}}
+            for d in range(1, 6)]
+    plan = {'tage': tage}
+    plan['records'] = tage_from_result(plan)  # einmal aufbereiten wie in build_result
+
+    for anzahl in (100, 1000, 10000, 50000):
+        specs = []
+        for i in range(anzahl):
+            feld = random.choice(['lehrer', 'klasse', 'fach', 'raum'])
+            wert = {'lehrer': 'L', 'klasse': 'K', 'fach': 'F', 'raum': 'R'}[feld] + str(random.randint(1, 80))
+            spec = {'id': i, 'abonnent': i % 1000, feld: wert}
+            if random.random() < 0.5:
+                spec['art'] = random.choice(arten)
+            if random.random() < 0.3:
+                spec['stunden'] = '1-6'
+            specs.append(spec)
+        engine = RegelEngine(specs)
+        start = time.perf_counter()
+        result = engine.match(plan)
+        elapsed = time.perf_counter() - start
+        anzahl_treffer = sum(len(v) for v in result.values())
+        print(f"   {anzahl:>6} Regeln: {elapsed * 1000:7.1f} ms für 1000 Zeilen, "
+              f"{anzahl_treffer} Treffer ({elapsed / max(anzahl_treffer, 1) * 1e6:.1f} µs/Treffer)")
+
+    print("\n✅ Regel-Engine funktioniert")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Scan-Koordinator
+Sorgt dafür, dass immer nur ein Scan gleichzeitig läuft: Aufrufer während
+eines laufenden Scans warten auf dessen Ergebnis, und ein Ergebnis, das
+jünger als das Frische-Fenster ist, wird ohne neuen Scan zurückgegeben
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+
+class ScanCoordinator:
+    """Single-Flight für einen asynchronen Scan"""
+
+    def __init__(self, scan: Callable[[], Awaitable[Any]], freshness: float = 60.0):
+        """
+        Args:
+            scan: Coroutine-Funktion, die einen Scan ausführt. Ein Ergebnis
+                von None gilt als Fehlschlag und wird nicht wiederverwendet.
+            freshness: Sekunden, die ein erfolgreiches Ergebnis wiederverwendet wird
+        """
+        self.scan = scan
+        self.freshness = freshness
+        self._inflight: Optional[asyncio.Future] = None
+        self.last_result = None
+        self.last_finished: Optional[float] = None
+        self.stats = {'started': 0, 'joined': 0, 'reused': 0}
+
+    @property
+    def in_flight(self) -> bool:
+        """Ob gerade ein Scan läuft"""
+        return self._inflight is not None
+
+    def age(self) -> Optional[float]:
+        """Alter des letzten erfolgreichen Ergebnisses in Sekunden"""
+        if self.last_finished is None:
+            return None
+        return time.monotonic() - self.last_finished
+
+    async def _run(self):
+        self.stats['started'] += 1
+        try:
+            result = await self.scan()
+            if result is not None:
+                self.last_result = result
+                self.last_finished = time.monotonic()
+            return result
+        finally:
+            self._inflight = None
+
+    async def run(self, max_age: float = None):
+        """
+        Liefert ein Scan-Ergebnis
+
+        Args:
+            max_age: Höchstalter eines wiederverwendeten Ergebnisses in
+                Sekunden (Standard: freshness, 0 = nur laufende Scans teilen)
+
+        Returns:
+            Ergebnis von scan (frisch, geteilt oder wiederverwendet)
+        """
+        if self._inflight is not None:
+            self.stats['joined'] += 1
+        else:
+            max_age = self.freshness if max_age is None else max_age
+            age = self.age()
+            if age is not None and age < max_age:
+                self.stats['reused'] += 1
+                return self.last_result
+            self._inflight = asyncio.ensure_future(self._run())
+
+        # shield: bricht ein Aufrufer ab (z.B. /stop), läuft der Scan für die anderen weiter
+        return await asyncio.shield(self._inflight)
+
+
+def main():
+    """Test-Funktion: gleichzeitige Aufrufer teilen sich einen Scan"""
+
+    async def demo():
+        calls = []
+
+        async def scan():
+            calls.append(time.monotonic())
+            await asyncio.sleep(0.2)
+            return {'scan': len(calls)}
+
+        coordinator = ScanCoordinator(scan, freshness=0.5)
+
+        # 10 gleichzeitige Aufrufer -> ein Scan
+        results = await asyncio.gather(*(coordinator.run() for _ in range(10)))
+        assert len(calls) == 1 and all(r == {'scan': 1} for r in results)
+
+        # Innerhalb des Frische-Fensters wiederverwendet, mit max_age=0 neu gescannt
+        assert await coordinator.run() == {'scan': 1}
+        assert await coordinator.run(max_age=0) == {'scan': 2}
+
+        # Ein abgebrochener Aufrufer beendet den Scan der anderen nicht
+        first = asyncio.ensure_future(coordinator.run(max_age=0))
+        await asyncio.sleep(0.05)
+        second = asyncio.ensure_future(coordinator.run())
+        first.cancel()
+        assert await second == {'scan': 3}
+
+        # Fehler erreichen alle Wartenden und werden nicht wiederverwendet
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("Login fehlgeschlagen")
+
+        coordinator.scan = failing
+        results = await asyncio.gather(coordinator.run(max_age=0), coordinator.run(),
+                                       return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert not coordinator.in_flight
+        print(f"📊 {coordinator.stats}")
+
+    asyncio.run(demo())
+    print("\n✅ Scan-Koordinator teilt laufende und frische Scans")
+
+
+if __name__ == "__main__":
+    main()
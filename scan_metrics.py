@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Scan-Metriken
+Sammelt die Phasen-Dauern der PhaseTimer aller Scans in Histogrammen
+(rollierende Perzentile für /scanstatus, kumulative Buckets für
+Prometheus) und stellt sie optional über einen lokalen HTTP-Endpunkt bereit
+"""
+
+import json
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from schulportal_lib import PhaseTimer
+
+# Bucket-Grenzen in Sekunden (Prometheus-Histogramm)
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Anzahl Messungen pro Phase für die Perzentile
+WINDOW = 500
+
+# Reihenfolge der Phasen in Ausgaben (unbekannte Phasen folgen alphabetisch)
+PHASE_ORDER = (
+    'browser_start', 'context_open', 'login_page', 'login_form', 'login_submit',
+    'page_load', 'table_wait', 'ready_wait', 'extract', 'check', 'notify', 'persist', 'total'
+)
+
+
+class PhaseHistogram:
+    """Messungen einer Phase: letzte WINDOW Werte plus kumulative Buckets"""
+
+    def __init__(self, window: int = WINDOW):
+        self.recent = deque(maxlen=window)
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        """Nimmt eine Messung auf"""
+        self.recent.append(seconds)
+        self.count += 1
+        self.sum += seconds
+        for i, grenze in enumerate(BUCKETS):
+            if seconds <= grenze:
+                self.buckets[i] += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Perzentil über die letzten Messungen (nächster Rang)
+
+        Args:
+            p: 0-100
+        """
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        rank = max(int(round(p / 100 * len(values) + 0.5)) - 1, 0)
+        return values[min(rank, len(values) - 1)]
+
+    def summary(self) -> dict:
+        """count, p50, p95 und max der letzten Messungen"""
+        return {
+            'count': self.count,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'max': max(self.recent) if self.recent else None
+        }
+
+
+class ScanMetrics:
+    """Histogramme aller Phasen, thread-sicher (der HTTP-Endpunkt liest aus einem Thread)"""
+
+    def __init__(self, window: int = WINDOW):
+        """
+        Args:
+            window: Anzahl Messungen pro Phase für die Perzentile
+        """
+        self.window = window
+        self._phases: Dict[str, PhaseHistogram] = {}
+        self._lock = threading.Lock()
+        self.scans = {'ok': 0, 'failed': 0}
+
+    def observe(self, phase: str, seconds: float):
+        """Nimmt eine einzelne Messung auf"""
+        with self._lock:
+            if phase not in self._phases:
+                self._phases[phase] = PhaseHistogram(self.window)
+            self._phases[phase].observe(seconds)
+
+    def record(self, timer: PhaseTimer, total: float = None, ok: bool = True):
+        """
+        Übernimmt alle Phasen eines Scans
+
+        Args:
+            timer: PhaseTimer des Scans
+            total: Gesamtdauer des Scans in Sekunden (Phase 'total')
+            ok: Ob der Scan erfolgreich war
+        """
+        for phase, seconds in timer.phases.items():
+            self.observe(phase, seconds)
+        if total is not None:
+            self.observe('total', total)
+        with self._lock:
+            self.scans['ok' if ok else 'failed'] += 1
+
+    def _ordered(self) -> list:
+        order = {name: i for i, name in enumerate(PHASE_ORDER)}
+        return sorted(self._phases.items(), key=lambda item: (order.get(item[0], len(order)), item[0]))
+
+    def summary(self) -> Dict[str, dict]:
+        """{phase: {'count', 'p50', 'p95', 'max'}} in Ablaufreihenfolge"""
+        with self._lock:
+            return {phase: hist.summary() for phase, hist in self._ordered()}
+
+    def to_json(self) -> str:
+        """Zusammenfassung als JSON"""
+        with self._lock:
+            scans = dict(self.scans)
+        return json.dumps({'scans': scans, 'phases': self.summary()}, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Histogramme im Prometheus-Textformat"""
+        lines = [
+            '# HELP schulportal_scans_total Abgeschlossene Scans nach Ergebnis',
+            '# TYPE schulportal_scans_total counter',
+        ]
+        with self._lock:
+            for result, count in self.scans.items():
+                lines.append(f'schulportal_scans_total{{result="{result}"}} {count}')
+            lines += [
+                '# HELP schulportal_scan_phase_seconds Dauer der Scan-Phasen',
+                '# TYPE schulportal_scan_phase_seconds histogram',
+            ]
+            for phase, hist in self._ordered():
+                for grenze, count in zip(BUCKETS, hist.buckets):
+                    lines.append(f'schulportal_scan_phase_seconds_bucket{{phase="{phase}",le="{grenze:g}"}} {count}')
+                lines.append(f'schulportal_scan_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {hist.count}')
+                lines.append(f'schulportal_scan_phase_seconds_sum{{phase="{phase}"}} {hist.sum:.6f}')
+                lines.append(f'schulportal_scan_phase_seconds_count{{phase="{phase}"}} {hist.count}')
+        return '\n'.join(lines) + '\n'
+
+    def format_table(self) -> str:
+        """Kurze Tabelle für Discord ("page_load  1.20s / 2.50s  (42)")"""
+        zeilen = []
+        for phase, s in self.summary().items():
+            zeilen.append(f"{phase:<13} {s['p50']:6.2f}s / {s['p95']:6.2f}s ({s['count']})")
+        return '\n'.join(zeilen)
+
+
+class MetricsServer:
+    """
+    Lokaler HTTP-Endpunkt in einem Hintergrund-Thread
+
+    GET /metrics       -> Prometheus-Textformat
+    GET /metrics.json  -> JSON-Zusammenfassung
+    """
+
+    def __init__(self, metrics: ScanMetrics, port: int, host: str = '127.0.0.1'):
+        """
+        Args:
+            metrics: Auszuliefernde Metriken
+            port: TCP-Port (0 = freien Port wählen)
+            host: Adresse (Standard: nur lokal erreichbar)
+        """
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = metrics.to_prometheus(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = metrics.to_json(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # keine Zeile pro Abruf im Log
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True)
+
+    def start(self) -> 'MetricsServer':
+        """Startet den Endpunkt"""
+        self._thread.start()
+        print(f"📈 Metriken unter http://{self._server.server_address[0]}:{self.port}/metrics")
+        return self
+
+    def close(self):
+        """Beendet den Endpunkt"""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    """Test-Funktion: Perzentile, Prometheus-Format und HTTP-Endpunkt"""
+    import random
+    import urllib.request
+
+    random.seed(20)
+    metrics = ScanMetrics()
+    for i in range(200):
+        timer = PhaseTimer()
+        timer.phases = {
+            'page_load': random.uniform(0.8, 1.5) + (8.0 if i % 50 == 0 else 0.0),
+            'ready_wait': random.uniform(0.1, 0.3),
+            'extract': random.uniform(0.02, 0.08),
+            'check': random.uniform(0.001, 0.01),
+        }
+        if i % 40 == 0:
+            timer.phases['browser_start'] = random.uniform(1.5, 3.0)
+        metrics.record(timer, total=sum(timer.phases.values()), ok=i % 25 != 0)
+
+    summary = metrics.summary()
+    assert list(summary)[:2] == ['browser_start', 'page_load']
+    assert summary['page_load']['p50'] < 2 and summary['page_load']['max'] > 8
+    print(metrics.format_table())
+
+    server = MetricsServer(metrics, port=0).start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+            text = response.read().decode('utf-8')
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics.json") as response:
+            data = json.loads(response.read())
+    finally:
+        server.close()
+    assert 'schulportal_scan_phase_seconds_count{phase="page_load"} 200' in text
+    assert data['scans'] == {'ok': 192, 'failed': 8}
+    print("\n✅ Metriken und Endpunkt funktionieren")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Scan-Scheduler
+Bestimmt den Zeitpunkt des nächsten Scans aus Schulzeit-Fenstern, Ferien,
+der Häufigkeit der letzten Planänderungen und der "Letzte Aktualisierung"
+des Portals; nach Fehlern wird mit Jitter exponentiell gewartet
+"""
+
+import random
+import re
+from collections import deque
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from vertretung_model import tage_from_result
+
+# Standard: Schultage morgens bis nachmittags, Sonntagabend für den Montagsplan
+DEFAULT_ZEITFENSTER = "Mo-Fr 06:00-16:30; So 17:00-21:00"
+
+WOCHENTAG_KUERZEL = ['Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa', 'So']
+AKTUALISIERUNG_PATTERN = re.compile(r'(\d{2}\.\d{2}\.\d{4})(?:\D+(\d{1,2}:\d{2}(?::\d{2})?))?')
+
+# Zeitraum, in dem Änderungen als "kürzlich" zählen
+AENDERUNGS_FENSTER = timedelta(hours=1)
+
+
+def parse_zeitfenster(spec: str) -> List[Tuple[frozenset, time, time]]:
+    """
+    Parst Schulzeit-Fenster
+
+    Args:
+        spec: z.B. "Mo-Fr 06:00-16:30; So 17:00-21:00"
+
+    Returns:
+        list: [(wochentage (0=Montag), start, ende)]
+    """
+    fenster = []
+    for teil in re.split(r'[;,]', spec):
+        teil = teil.strip()
+        if not teil:
+            continue
+        tage_spec, zeiten = teil.split()
+        if '-' in tage_spec:
+            von, bis = (WOCHENTAG_KUERZEL.index(t) for t in tage_spec.split('-'))
+            tage = frozenset(range(von, bis + 1))
+        else:
+            tage = frozenset(WOCHENTAG_KUERZEL.index(t) for t in tage_spec.split('/'))
+        start, ende = (time.fromisoformat(z) for z in zeiten.split('-'))
+        fenster.append((tage, start, ende))
+    return fenster
+
+
+def parse_ferien(spec: str) -> List[Tuple[date, date]]:
+    """
+    Parst Ferienzeiträume
+
+    Args:
+        spec: z.B. "22.12.2025-09.01.2026, 30.03.2026-10.04.2026"
+
+    Returns:
+        list: [(erster Tag, letzter Tag)]
+    """
+    ferien = []
+    for teil in spec.split(','):
+        teil = teil.strip()
+        if not teil:
+            continue
+        von, _, bis = teil.partition('-')
+        von = datetime.strptime(von.strip(), '%d.%m.%Y').date()
+        ferien.append((von, datetime.strptime(bis.strip(), '%d.%m.%Y').date() if bis else von))
+    return ferien
+
+
+def parse_aktualisierung(text: str) -> Optional[datetime]:
+    """
+    Parst "Letzte Aktualisierung: 01.12.2025 um 07:12:00 Uhr"
+
+    Returns:
+        datetime oder None, wenn kein Datum enthalten ist
+    """
+    match = AKTUALISIERUNG_PATTERN.search(text or '')
+    if not match:
+        return None
+    datum = datetime.strptime(match.group(1), '%d.%m.%Y')
+    if match.group(2):
+        stunden, minuten, *sekunden = (int(x) for x in match.group(2).split(':'))
+        datum = datum.replace(hour=stunden, minute=minuten, second=sekunden[0] if sekunden else 0)
+    return datum
+
+
+def letzte_aktualisierung(vertretungsplan_data: dict) -> Optional[datetime]:
+    """Jüngste "Letzte Aktualisierung" über alle Tage eines Plans"""
+    zeitpunkte = [parse_aktualisierung(tag.letzte_aktualisierung)
+                  for tag in tage_from_result(vertretungsplan_data)]
+    zeitpunkte = [z for z in zeitpunkte if z is not None]
+    return max(zeitpunkte) if zeitpunkte else None
+
+
+class ScanScheduler:
+    """
+    Liefert die Wartezeit bis zum nächsten Scan
+
+    - außerhalb der Zeitfenster und in den Ferien: ruhe_interval, aber
+      nie über den Beginn des nächsten Fensters hinaus
+    - im Zeitfenster: interval, verkürzt bis min_interval, je mehr
+      Änderungen in der letzten Stunde gesehen wurden oder je frischer
+      die letzte Aktualisierung des Portals ist
+    - nach Fehlern: interval * 2^(n-1) mit Jitter, höchstens ruhe_interval
+    """
+
+    def __init__(self, interval: float = 300, min_interval: float = 120,
+                 ruhe_interval: float = 3600, zeitfenster: str = DEFAULT_ZEITFENSTER,
+                 ferien: str = '', rng: random.Random = None):
+        """
+        Args:
+            interval: Normaler Abstand im Zeitfenster (Sekunden)
+            min_interval: Kürzester Abstand bei häufigen Änderungen
+            ruhe_interval: Abstand außerhalb der Zeitfenster und Obergrenze für Backoff
+            zeitfenster: Schulzeit-Fenster (siehe parse_zeitfenster)
+            ferien: Ferienzeiträume (siehe parse_ferien)
+            rng: Zufallsgenerator für den Jitter
+        """
+        self.interval = interval
+        self.min_interval = min(min_interval, interval)
+        self.ruhe_interval = max(ruhe_interval, interval)
+        self.zeitfenster = parse_zeitfenster(zeitfenster)
+        self.ferien = parse_ferien(ferien)
+        self.rng = rng or random.Random()
+
+        self.failures = 0
+        self.changes = deque()
+        self.portal_update: Optional[datetime] = None
+        self.next_scan: Optional[datetime] = None
+        self.reason = 'Start'
+
+    # ------------------------------------------------------------------
+    # Kalender
+    # ------------------------------------------------------------------
+
+    def is_ferien(self, tag: date) -> bool:
+        """Prüft ob ein Tag in den Ferien liegt"""
+        return any(von <= tag <= bis for von, bis in self.ferien)
+
+    def in_zeitfenster(self, now: datetime) -> bool:
+        """Prüft ob now in einem Schulzeit-Fenster (und nicht in den Ferien) liegt"""
+        if self.is_ferien(now.date()):
+            return False
+        return any(now.weekday() in tage and start <= now.time() < ende
+                   for tage, start, ende in self.zeitfenster)
+
+    def next_fenster_start(self, now: datetime) -> Optional[datetime]:
+        """Beginn des nächsten Zeitfensters (innerhalb von 8 Tagen) oder None"""
+        kandidaten = []
+        for offset in range(8):
+            tag = now.date() + timedelta(days=offset)
+            if self.is_ferien(tag):
+                continue
+            for tage, start, _ in self.zeitfenster:
+                beginn = datetime.combine(tag, start)
+                if tag.weekday() in tage and beginn > now:
+                    kandidaten.append(beginn)
+            if kandidaten:
+                return min(kandidaten)
+        return None
+
+    # ------------------------------------------------------------------
+    # Ergebnisse
+    # ------------------------------------------------------------------
+
+    def record_success(self, changed: bool, now: datetime = None, aktualisierung: datetime = None):
+        """
+        Meldet einen erfolgreichen Scan
+
+        Args:
+            changed: Ob sich der Plan gegenüber dem letzten Scan geändert hat
+            now: Zeitpunkt des Scans
+            aktualisierung: Jüngste "Letzte Aktualisierung" des Plans
+        """
+        now = now or datetime.now()
+        self.failures = 0
+        if changed:
+            self.changes.append(now)
+        if aktualisierung is not None:
+            self.portal_update = aktualisierung
+
+    def record_failure(self):
+        """Meldet einen fehlgeschlagenen Scan"""
+        self.failures += 1
+
+    def recent_changes(self, now: datetime) -> int:
+        """Anzahl gesehener Änderungen innerhalb von AENDERUNGS_FENSTER"""
+        while self.changes and now - self.changes[0] > AENDERUNGS_FENSTER:
+            self.changes.popleft()
+        return len(self.changes)
+
+    # ------------------------------------------------------------------
+    # Planung
+    # ------------------------------------------------------------------
+
+    def _active_interval(self, now: datetime) -> Tuple[float, str]:
+        aktivitaet = self.recent_changes(now)
+        if self.portal_update is not None and now - self.portal_update < AENDERUNGS_FENSTER / 2:
+            aktivitaet += 1
+        if not aktivitaet:
+            return self.interval, 'Schulzeit'
+        return max(self.min_interval, self.interval / (1 + aktivitaet)), f'{aktivitaet}× Aktivität'
+
+    def next_delay(self, now: datetime = None) -> float:
+        """
+        Wartezeit bis zum nächsten Scan in Sekunden (setzt next_scan und reason)
+
+        Args:
+            now: Aktueller Zeitpunkt
+        """
+        now = now or datetime.now()
+        if self.failures:
+            # Exponentiell mit "equal jitter": zwischen der Hälfte und dem vollen Wert
+            backoff = min(self.ruhe_interval, self.interval * 2 ** (self.failures - 1))
+            delay = backoff / 2 + self.rng.uniform(0, backoff / 2)
+            self.reason = f'Backoff nach {self.failures} Fehler(n)'
+        elif self.in_zeitfenster(now):
+            delay, self.reason = self._active_interval(now)
+        else:
+            delay = self.ruhe_interval
+            self.reason = 'Ferien' if self.is_ferien(now.date()) else 'außerhalb der Schulzeit'
+            beginn = self.next_fenster_start(now)
+            if beginn is not None:
+                delay = min(delay, (beginn - now).total_seconds())
+
+        self.next_scan = now + timedelta(seconds=delay)
+        return delay
+
+
+def simulate(scheduler: ScanScheduler, start: datetime, ende: datetime,
+             aenderungen: Iterable[datetime] = (), fehler: Iterable[datetime] = ()) -> List[datetime]:
+    """
+    Spielt einen Zeitraum mit dem Scheduler durch
+
+    Args:
+        scheduler: Zu prüfender Scheduler
+        start, ende: Zeitraum
+        aenderungen: Zeitpunkte, zu denen sich der Plan ändert
+        fehler: Zeitpunkte, ab denen der nächste Scan fehlschlägt
+
+    Returns:
+        list: Zeitpunkte aller Scans
+    """
+    aenderungen = sorted(aenderungen)
+    fehler = sorted(fehler)
+    scans = []
+    now = start
+    while now < ende:
+        scans.append(now)
+        if fehler and fehler[0] <= now:
+            fehler.pop(0)
+            scheduler.record_failure()
+        else:
+            changed = False
+            while aenderungen and aenderungen[0] <= now:
+                aenderungen.pop(0)
+                changed = True
+            scheduler.record_success(changed, now)
+        now += timedelta(seconds=scheduler.next_delay(now))
+    return scans
+
+
+def main():
+    """Test-Funktion: eine Woche mit festem Intervall gegen den Scheduler"""
+    montag = datetime(2025, 12, 1)
+    woche = montag + timedelta(days=7)
+
+    assert parse_aktualisierung("Letzte Aktualisierung: 01.12.2025 um 07:12:00 Uhr") == datetime(2025, 12, 1, 7, 12)
+    assert parse_aktualisierung("Unbekannt") is None
+
+    scheduler = ScanScheduler(rng=random.Random(18))
+    assert scheduler.in_zeitfenster(montag.replace(hour=8))
+    assert not scheduler.in_zeitfenster(montag.replace(hour=3))
+    assert scheduler.next_fenster_start(montag.replace(hour=17)) == montag.replace(day=2, hour=6)
+
+    # Backoff: wächst exponentiell, bleibt unter ruhe_interval
+    delays = []
+    for _ in range(6):
+        scheduler.record_failure()
+        delays.append(scheduler.next_delay(montag.replace(hour=8)))
+    assert delays[1] > delays[0] / 2 and max(delays) <= scheduler.ruhe_interval
+    print(f"🔁 Backoff: {', '.join(f'{d:.0f}s' for d in delays)}")
+
+    # Eine Woche: morgens zwischen 07:00 und 07:45 ändert sich der Plan mehrmals
+    aenderungen = [montag + timedelta(days=d, hours=7, minutes=m, seconds=30)
+                   for d in range(5) for m in (2, 13, 27, 41)]
+
+    def reaktion(scans: list) -> list:
+        return [min((s - a).total_seconds() for s in scans if s >= a) for a in aenderungen]
+
+    fix = [montag + timedelta(seconds=300 * i) for i in range(int((woche - montag).total_seconds() // 300))]
+    scans = simulate(ScanScheduler(rng=random.Random(18)), montag, woche, aenderungen)
+    for name, liste in (('festes Intervall', fix), ('Scheduler', scans)):
+        latenz = reaktion(liste)
+        print(f"📅 {name:<16}: {len(liste):>4} Scans/Woche, Reaktionszeit "
+              f"Ø {sum(latenz) / len(latenz):.0f}s, max {max(latenz):.0f}s")
+    assert len(scans) < len(fix) / 2
+
+    ferien = simulate(ScanScheduler(ferien='01.12.2025-07.12.2025'), montag, woche)
+    print(f"🎄 Ferienwoche: {len(ferien)} Scans")
+    print("\n✅ Scan-Scheduler funktioniert")
+
+
+if __name__ == "__main__":
+    main()
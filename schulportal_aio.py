@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Schulportal Hessen Library (async)
+Asynchrone Varianten von Login und Vertretungsplan-Abruf für
+playwright.async_api - die Auswertung teilt sich der Code mit schulportal_lib
+"""
+
+import asyncio
+from concurrent.futures import Executor
+
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
+
+from change_detector import ChangeDetector
+from schulportal_lib import (
+    DOM_EXTRACT_SCRIPT,
+    LOGIN_URL,
+    PANEL_SELECTOR,
+    START_HOST,
+    VERTRETUNGSPLAN_URL,
+    WAIT_TIMEOUTS,
+    PhaseTimer,
+    build_detected_result,
+    build_dom_result,
+    build_result,
+    build_vertretungsplan,
+    check_login_url,
+    is_login_redirect,
+    parse_days,
+    print_login_header,
+    print_vertretungsplan_header,
+    resolve_extraction,
+    resolve_parser,
+    write_session_state,
+)
+
+
+async def login(page: Page, username: str, password: str, institution_id: str,
+                timer: PhaseTimer = None) -> bool:
+    """
+    Führt den Login im Schulportal durch
+
+    Args:
+        page: Playwright Page Objekt (async)
+        username: Benutzername
+        password: Passwort
+        institution_id: Institutions-ID (z.B. "6081")
+        timer: Optionaler PhaseTimer für die Zeitmessung
+
+    Returns:
+        bool: True wenn Login erfolgreich, False sonst
+    """
+    login_url = LOGIN_URL.format(institution_id=institution_id)
+    print_login_header(username, login_url)
+    timer = timer or PhaseTimer()
+
+    try:
+        # Login-Seite laden
+        with timer.phase('login_page'):
+            await page.goto(login_url, timeout=WAIT_TIMEOUTS['page_load'])
+        print("✅ Login-Seite geladen")
+
+        # Warte auf das Login-Formular
+        with timer.phase('login_form'):
+            await page.wait_for_selector("#username2", state="visible", timeout=WAIT_TIMEOUTS['login_form'])
+
+        # Credentials eingeben
+        await page.fill("#username2", username)
+        await page.fill("#inputPassword", password)
+
+        print("📝 Login-Daten eingegeben")
+
+        with timer.phase('login_submit'):
+            # Login-Button klicken
+            await page.click("button:has-text('Anmelden')")
+
+            # Warte auf die Weiterleitung statt einer festen Pause
+            try:
+                await page.wait_for_url(lambda url: START_HOST in url,
+                                        timeout=WAIT_TIMEOUTS['login_redirect'])
+            except PlaywrightTimeoutError:
+                pass  # Keine Weiterleitung - check_login_url meldet den Fehler
+
+        # Prüfe ob Login erfolgreich
+        return check_login_url(page.url)
+
+    except Exception as e:
+        print(f"❌ Fehler beim Login: {e}")
+        return False
+
+
+async def parse_in_executor(html_content: str, executor: Executor,
+                            detector: ChangeDetector = None) -> dict:
+    """
+    Wie build_vertretungsplan, parst aber in executor (z.B. ProcessPoolExecutor)
+
+    Der Event-Loop bleibt frei, während viele Seiten gleichzeitig ausgewertet
+    werden. Fingerabdruck und Detector-Stand bleiben im Hauptprozess, der
+    PanelCache wird dabei nicht genutzt.
+
+    Args:
+        html_content: HTML der Vertretungsplan-Seite
+        executor: Executor für parse_days
+        detector: Optionaler ChangeDetector für unveränderte Seiten
+
+    Returns:
+        dict: Dictionary mit zeitstempel, tage, anzahl_tage, unveraendert und records
+    """
+    loop = asyncio.get_running_loop()
+    # Parser hier auflösen: DEFAULT_PARSER gilt nur in diesem Prozess
+    parser = resolve_parser(None)
+    if detector is None:
+        print("\n📅 Extrahiere Daten für alle Tage...")
+        return build_result(await loop.run_in_executor(executor, parse_days, html_content, parser))
+
+    fingerprint = detector.fingerprint_html(html_content)
+    all_days = None
+    if detector.cached_days(fingerprint) is None:
+        all_days = await loop.run_in_executor(executor, parse_days, html_content, parser)
+    return build_detected_result(detector, fingerprint, lambda: all_days)
+
+
+async def extract_from_page(page: Page, extraction: str = None,
+                            detector: ChangeDetector = None,
+                            parse_executor: Executor = None) -> dict:
+    """
+    Extrahiert den Vertretungsplan aus der geladenen Seite
+
+    Args:
+        page: Playwright Page Objekt (async) mit geladenem Vertretungsplan
+        extraction: "html" oder "dom" (Standard: DEFAULT_EXTRACTION)
+        detector: Optionaler ChangeDetector für unveränderte Seiten
+        parse_executor: Optionaler Executor für das Parsen (nur "html")
+
+    Returns:
+        dict: Dictionary mit zeitstempel, tage, anzahl_tage, unveraendert und records
+    """
+    if resolve_extraction(extraction) == "dom":
+        return build_dom_result(await page.evaluate(DOM_EXTRACT_SCRIPT), detector)
+    if parse_executor is not None:
+        return await parse_in_executor(await page.content(), parse_executor, detector)
+    return build_vertretungsplan(await page.content(), detector=detector)
+
+
+async def wait_until_ready(page: Page):
+    """
+    Wartet bis die Seite nichts mehr nachlädt (höchstens WAIT_TIMEOUTS['network_idle'])
+
+    Args:
+        page: Playwright Page Objekt (async) mit geladenem Vertretungsplan
+    """
+    try:
+        await page.wait_for_load_state("networkidle", timeout=WAIT_TIMEOUTS['network_idle'])
+    except PlaywrightTimeoutError:
+        print("⚠️  Seite lädt noch nach - fahre trotzdem fort")
+    print(f"✅ {await page.locator(PANEL_SELECTOR).count()} Tag-Panel(s) bereit")
+
+
+async def get_vertretungsplan(page: Page, timer: PhaseTimer = None,
+                              detector: ChangeDetector = None,
+                              parse_executor: Executor = None) -> dict:
+    """
+    Lädt den Vertretungsplan und extrahiert alle Daten
+
+    Args:
+        page: Playwright Page Objekt (async, muss bereits eingeloggt sein)
+        timer: Optionaler PhaseTimer für die Zeitmessung
+        detector: Optionaler ChangeDetector für unveränderte Seiten
+        parse_executor: Optionaler Executor für das Parsen (siehe parse_in_executor)
+
+    Returns:
+        dict: Dictionary mit allen Vertretungsplan-Daten oder None bei Fehler
+    """
+    vp_url = VERTRETUNGSPLAN_URL
+    print_vertretungsplan_header(vp_url)
+    timer = timer or PhaseTimer()
+
+    try:
+        # Vertretungsplan-Seite laden
+        with timer.phase('page_load'):
+            await page.goto(vp_url, timeout=WAIT_TIMEOUTS['page_load'])
+
+        # Session abgelaufen? Dann direkt abbrechen statt auf die Tabelle zu warten
+        if is_login_redirect(page.url):
+            print("🔒 Session abgelaufen - Login erforderlich")
+            return None
+        print(f"✅ Vertretungsplan-Seite geladen")
+
+        # Warte bis die Tabelle geladen ist
+        with timer.phase('table_wait'):
+            await page.wait_for_selector('table[data-toggle="table"]', timeout=WAIT_TIMEOUTS['table'])
+        print("✅ Tabelle gefunden")
+
+        # Warte bis nichts mehr nachgeladen wird (statt fester Pause)
+        with timer.phase('ready_wait'):
+            await wait_until_ready(page)
+
+        # Daten extrahieren (HTML oder direkt im Browser)
+        with timer.phase('extract'):
+            return await extract_from_page(page, detector=detector, parse_executor=parse_executor)
+
+    except Exception as e:
+        print(f"❌ Fehler beim Abrufen: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+async def fetch_vertretungsplan(page: Page, username: str, password: str, institution_id: str,
+                                session_file: str = None, timer: PhaseTimer = None,
+                                detector: ChangeDetector = None,
+                                parse_executor: Executor = None) -> dict:
+    """
+    Ruft den Vertretungsplan ab und loggt sich nur bei abgelaufener Session ein
+
+    Args:
+        page: Playwright Page Objekt (async)
+        username: Benutzername
+        password: Passwort
+        institution_id: Institutions-ID
+        session_file: Pfad zur Session-Datei (None = nicht speichern)
+        timer: Optionaler PhaseTimer für die Zeitmessung
+        detector: Optionaler ChangeDetector für unveränderte Seiten
+        parse_executor: Optionaler Executor für das Parsen (siehe parse_in_executor)
+
+    Returns:
+        dict: Vertretungsplan-Daten oder None bei Fehler
+    """
+    timer = timer or PhaseTimer()
+    vp_data = await get_vertretungsplan(page, timer, detector, parse_executor)
+    if vp_data is not None or not is_login_redirect(page.url):
+        return vp_data
+
+    if not await login(page, username, password, institution_id, timer):
+        return None
+
+    if session_file:
+        try:
+            write_session_state(await page.context.storage_state(), session_file)
+        except Exception as e:
+            print(f"⚠️  Warnung: Session konnte nicht gespeichert werden: {e}")
+
+    return await get_vertretungsplan(page, timer, detector, parse_executor)
@@ -4,39 +4,278 @@ Schulportal Hessen Library
 Funktionen für Login und Vertretungsplan-Abruf
 """
 
-from playwright.sync_api import Page
+from playwright.sync_api import Page, TimeoutError as PlaywrightTimeoutError
 from bs4 import BeautifulSoup
+from contextlib import contextmanager
+from datetime import datetime
+import hashlib
+import json
+import os
 import time
 
+from change_detector import ChangeDetector
+from panel_cache import PanelCache
+from vertretung_model import Tag, TageAnsicht
 
-def login(page: Page, username: str, password: str, institution_id: str) -> bool:
+
+LOGIN_URL = "https://login.schulportal.hessen.de/?i={institution_id}"
+VERTRETUNGSPLAN_URL = "https://start.schulportal.hessen.de/vertretungsplan.php"
+SESSION_DIR = ".sessions"
+START_HOST = "start.schulportal.hessen.de"
+PANEL_SELECTOR = 'div.panel[id^="tag"]'
+
+# Obergrenzen für Wartezeiten in Millisekunden - gewartet wird nur so lange,
+# bis das jeweilige Signal eintritt
+WAIT_TIMEOUTS = {
+    'page_load': 30000,       # page.goto
+    'login_form': 10000,      # Login-Formular sichtbar
+    'login_redirect': 10000,  # Weiterleitung auf START_HOST nach "Anmelden"
+    'table': 10000,           # Vertretungsplan-Tabelle vorhanden
+    'network_idle': 3000,     # Nachladen nach der Tabelle (nicht fatal)
+}
+
+# Parser-Backends: "lxml", "html.parser", "selectolax" oder "auto"
+PARSER_BACKENDS = ("lxml", "html.parser", "selectolax")
+DEFAULT_PARSER = "auto"
+
+# Extraktion: "html" (page.content() + Parser) oder "dom" (Skript im Browser)
+EXTRACTION_MODES = ("html", "dom")
+DEFAULT_EXTRACTION = "html"
+
+# Liest die Tage direkt aus dem DOM - gleiche Regeln wie extract_all_days
+DOM_EXTRACT_SCRIPT = r"""
+() => {
+    // Wie get_text(strip=True): alle Textknoten getrimmt aneinandergehängt
+    const text = (el) => {
+        const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+        let out = '';
+        for (let n = walker.nextNode(); n; n = walker.nextNode()) {
+            out += n.nodeValue.trim();
+        }
+        return out;
+    };
+    // Wie Tag.string: einziger Kindknoten, rekursiv
+    const single = (el) => {
+        if (el.childNodes.length !== 1) return null;
+        const child = el.childNodes[0];
+        if (child.nodeType === Node.TEXT_NODE) return child.nodeValue;
+        if (child.nodeType === Node.ELEMENT_NODE) return single(child);
+        return null;
+    };
+    const attr = (el, name, fallback) => el.hasAttribute(name) ? el.getAttribute(name) : fallback;
+
+    const parseInfo = (body) => {
+        const info = {abwesende_lehrer: '', hinweis: '', entfall_klassen: ''};
+        const table = body.querySelector('table.infos');
+        if (!table) return info;
+        const subheaders = ['Abwesende Lehrende', 'Hinweis', 'Von Entfall betroffene Klassen'];
+        let key = null;
+        for (const row of table.querySelectorAll('tr')) {
+            if (row.classList.contains('subheader')) {
+                const header = text(row);
+                if (header.includes('Abwesende Lehrende')) key = 'abwesende_lehrer';
+                else if (header.includes('Hinweis')) key = 'hinweis';
+                else if (header.includes('Von Entfall betroffene Klassen')) key = 'entfall_klassen';
+            } else if (key) {
+                const cell = row.querySelector('td');
+                if (cell) {
+                    const value = text(cell);
+                    if (value && !subheaders.includes(value)) info[key] = value;
+                }
+            }
+        }
+        return info;
+    };
+
+    const parseTable = (body, tableId) => {
+        const tables = Array.from(body.querySelectorAll('table'));
+        let table = tables.find(t => t.getAttribute('id') === tableId)
+            || tables.find(t => (t.getAttribute('id') || '').startsWith('vtable'));
+        if (!table) return null;
+
+        const headers = [];
+        const thead = table.querySelector('thead');
+        if (thead) {
+            for (const th of thead.querySelectorAll('th')) {
+                const field = th.getAttribute('data-field') || '';
+                if (field) {
+                    headers.push(field);
+                } else {
+                    const inner = th.querySelector('div.th-inner');
+                    headers.push(text(inner || th));
+                }
+            }
+        }
+        const rows = [];
+        const tbody = table.querySelector('tbody');
+        if (tbody) {
+            for (const tr of tbody.querySelectorAll('tr')) {
+                rows.push(Array.from(tr.querySelectorAll('td'), text));
+            }
+        }
+        return {headers: headers, rows: rows, row_count: rows.length,
+                table_id: attr(table, 'id', 'unknown')};
+    };
+
+    const days = [];
+    for (const panel of document.querySelectorAll('div.panel')) {
+        const panelId = panel.getAttribute('id') || '';
+        if (!panelId.startsWith('tag')) continue;
+
+        const heading = panel.querySelector('div.panel-heading');
+        const body = panel.querySelector('div.panel-body');
+        if (!body) continue;
+
+        let update = 'Unbekannt';
+        for (const i of body.querySelectorAll('i')) {
+            const value = single(i);
+            if (value && value.includes('Letzte Aktualisierung')) {
+                update = text(i);
+                break;
+            }
+        }
+
+        days.push({
+            datum_text: heading ? text(heading) : null,
+            badges: heading ? Array.from(heading.querySelectorAll('span.badge'), text) : [],
+            panel_id: panelId,
+            informationen: parseInfo(body),
+            vertretungen: parseTable(body, 'vtable' + panelId.replace('tag', '')),
+            letzte_aktualisierung: update
+        });
+    }
+    return days;
+}
+"""
+
+
+def session_state_path(username: str, institution_id: str, session_dir: str = SESSION_DIR) -> str:
     """
-    Führt den Login im Schulportal durch
+    Liefert den Pfad der gespeicherten Session (Cookies) für ein Konto
+    
+    Der Benutzername wird gehasht, damit er nicht im Dateinamen steht.
     
     Args:
-        page: Playwright Page Objekt
         username: Benutzername
-        password: Passwort
-        institution_id: Institutions-ID (z.B. "6081")
+        institution_id: Institutions-ID
+        session_dir: Ordner für Session-Dateien
     
     Returns:
-        bool: True wenn Login erfolgreich, False sonst
+        str: Pfad zur Session-Datei
     """
-    login_url = f"https://login.schulportal.hessen.de/?i={institution_id}"
+    user_hash = hashlib.sha256(username.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(session_dir, f"{institution_id}_{user_hash}.json")
+
+
+def load_session_state(session_file: str):
+    """
+    Gibt den Pfad zurück, falls eine gespeicherte Session existiert
+    
+    Args:
+        session_file: Pfad zur Session-Datei
+    
+    Returns:
+        str oder None: Wert für new_context(storage_state=...)
+    """
+    if session_file and os.path.exists(session_file):
+        return session_file
+    return None
+
+
+def write_session_state(state: dict, session_file: str):
+    """
+    Schreibt den Storage-State (Cookies) atomar und nur für den Besitzer lesbar
     
+    Args:
+        state: Ergebnis von context.storage_state()
+        session_file: Pfad zur Session-Datei
+    """
+    os.makedirs(os.path.dirname(session_file) or '.', exist_ok=True)
+    tmp_file = f"{session_file}.tmp"
+    fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_file, session_file)
+
+
+def is_login_redirect(url: str) -> bool:
+    """Prüft ob die Seite auf das Login-Formular umgeleitet wurde"""
+    return "login.schulportal.hessen.de" in url
+
+
+class PhaseTimer:
+    """Misst die Dauer einzelner Phasen eines Abrufs"""
+    
+    def __init__(self):
+        self.phases = {}
+    
+    @contextmanager
+    def phase(self, name: str):
+        """Misst den Block als Phase `name` und gibt die Dauer aus"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            print(f"   ⏱️  {name}: {elapsed:.2f} s")
+
+
+def print_login_header(username: str, login_url: str):
+    """Gibt die Kopfzeilen für den Login aus"""
     print("=" * 60)
     print("LOGIN")
     print("=" * 60)
     print(f"Benutzername: {username}")
     print(f"Login-URL: {login_url}\n")
+
+
+def check_login_url(current_url: str) -> bool:
+    """
+    Prüft anhand der URL nach dem Absenden, ob der Login erfolgreich war
+    
+    Args:
+        current_url: Aktuelle URL der Seite
+    
+    Returns:
+        bool: True wenn Login erfolgreich, False sonst
+    """
+    if START_HOST in current_url:
+        print("✅ Login erfolgreich!\n")
+        return True
+    print(f"❌ Login fehlgeschlagen!")
+    print(f"   Aktuelle URL: {current_url}")
+    return False
+
+
+def login(page: Page, username: str, password: str, institution_id: str,
+          timer: PhaseTimer = None) -> bool:
+    """
+    Führt den Login im Schulportal durch
+    
+    Args:
+        page: Playwright Page Objekt
+        username: Benutzername
+        password: Passwort
+        institution_id: Institutions-ID (z.B. "6081")
+        timer: Optionaler PhaseTimer für die Zeitmessung
+    
+    Returns:
+        bool: True wenn Login erfolgreich, False sonst
+    """
+    login_url = LOGIN_URL.format(institution_id=institution_id)
+    print_login_header(username, login_url)
+    timer = timer or PhaseTimer()
     
     try:
         # Login-Seite laden
-        page.goto(login_url, timeout=30000)
+        with timer.phase('login_page'):
+            page.goto(login_url, timeout=WAIT_TIMEOUTS['page_load'])
         print("✅ Login-Seite geladen")
         
         # Warte auf das Login-Formular
-        page.wait_for_selector("#username2", state="visible", timeout=10000)
+        with timer.phase('login_form'):
+            page.wait_for_selector("#username2", state="visible", timeout=WAIT_TIMEOUTS['login_form'])
         
         # Credentials eingeben
         page.fill("#username2", username)
@@ -44,22 +283,20 @@ def login(page: Page, username: str, password: str, institution_id: str) -> bool
         
         print("📝 Login-Daten eingegeben")
         
-        # Login-Button klicken
-        page.click("button:has-text('Anmelden')")
-        
-        # Warte auf Navigation
-        time.sleep(3)
+        with timer.phase('login_submit'):
+            # Login-Button klicken
+            page.click("button:has-text('Anmelden')")
+            
+            # Warte auf die Weiterleitung statt einer festen Pause
+            try:
+                page.wait_for_url(lambda url: START_HOST in url,
+                                  timeout=WAIT_TIMEOUTS['login_redirect'])
+            except PlaywrightTimeoutError:
+                pass  # Keine Weiterleitung - check_login_url meldet den Fehler
         
         # Prüfe ob Login erfolgreich
-        current_url = page.url
-        if "start.schulportal.hessen.de" in current_url:
-            print("✅ Login erfolgreich!\n")
-            return True
-        else:
-            print(f"❌ Login fehlgeschlagen!")
-            print(f"   Aktuelle URL: {current_url}")
-            return False
-            
+        return check_login_url(page.url)
+        
     except Exception as e:
         print(f"❌ Fehler beim Login: {e}")
         return False
@@ -70,7 +307,7 @@ def parse_info_table(soup: BeautifulSoup) -> dict:
     Extrahiert die Informationen (Abwesende Lehrer, Hinweise, etc.)
     
     Args:
-        soup: BeautifulSoup Objekt
+        soup: BeautifulSoup Objekt oder Teilbaum (z.B. Panel-Body)
     
     Returns:
         dict: Dictionary mit abwesende_lehrer, hinweis, entfall_klassen
@@ -117,7 +354,7 @@ def parse_vertretungsplan_table(soup: BeautifulSoup, table_id: str = None) -> di
     Extrahiert die Vertretungsplan-Tabelle
     
     Args:
-        soup: BeautifulSoup Objekt
+        soup: BeautifulSoup Objekt oder Teilbaum (z.B. Panel-Body)
         table_id: Optionale Table-ID
     
     Returns:
@@ -176,6 +413,23 @@ def parse_vertretungsplan_table(soup: BeautifulSoup, table_id: str = None) -> di
     }
 
 
+def parse_datum_text(datum_text: str) -> str:
+    """
+    Extrahiert das Datum aus dem Text des Panel-Headings
+    
+    Args:
+        datum_text: Text des Headings (z.B. "Montag, den 01.12.2025heute")
+    
+    Returns:
+        str: Datum-Teil oder "Unbekannt"
+    """
+    if ',' in datum_text:
+        for part in datum_text.split():
+            if '.' in part and len(part) >= 5:  # Format: DD.MM oder DD.MM.YYYY
+                return part.replace('den', '').strip()
+    return "Unbekannt"
+
+
 def extract_all_days(soup: BeautifulSoup) -> list:
     """
     Extrahiert alle verfügbaren Tage (auch die versteckten Panels)
@@ -208,24 +462,19 @@ def extract_all_days(soup: BeautifulSoup) -> list:
             badges = [b.get_text(strip=True) for b in badge_elems]
             
             # Datum extrahieren (z.B. "Montag, den 01.12.2025")
-            if ',' in datum_text:
-                parts = datum_text.split()
-                for part in parts:
-                    if '.' in part and len(part) >= 5:  # Format: DD.MM oder DD.MM.YYYY
-                        datum = part.replace('den', '').strip()
-                        break
+            datum = parse_datum_text(datum_text)
         
         # Panel Body
         panel_body = panel.find('div', class_='panel-body')
         if not panel_body:
             continue
         
-        # Informationen extrahieren
-        info = parse_info_table(BeautifulSoup(str(panel_body), 'html.parser'))
+        # Informationen extrahieren (direkt im Teilbaum, ohne erneutes Parsen)
+        info = parse_info_table(panel_body)
         
         # Vertretungsplan-Tabelle extrahieren
         table_id = f"vtable{panel_id.replace('tag', '')}"
-        table_data = parse_vertretungsplan_table(BeautifulSoup(str(panel_body), 'html.parser'), table_id)
+        table_data = parse_vertretungsplan_table(panel_body, table_id)
         
         # Letzte Aktualisierung
         update_elem = panel_body.find('i', string=lambda t: t and 'Letzte Aktualisierung' in t)
@@ -243,63 +492,359 @@ def extract_all_days(soup: BeautifulSoup) -> list:
     return days_data
 
 
-def get_vertretungsplan(page: Page) -> dict:
+_PARITAET = {}  # {backend: bool}, einmal pro Prozess geprüft
+_GEWARNT = set()  # Auswahlen, vor denen schon gewarnt wurde
+
+
+def _parse_backend(html_content: str, parser: str) -> list:
+    """Parst mit einem bereits aufgelösten Backend"""
+    if parser == "selectolax":
+        from parser_engines import extract_all_days_selectolax
+        return extract_all_days_selectolax(html_content)
+    return extract_all_days(BeautifulSoup(html_content, parser))
+
+
+def backend_paritaet(parser: str) -> bool:
     """
-    Lädt den Vertretungsplan und extrahiert alle Daten
+    Prüft, ob ein Backend auf der Beispielseite dasselbe liefert wie die
+    Referenz-Implementierung (einmal pro Prozess, danach aus dem Cache)
     
     Args:
-        page: Playwright Page Objekt (muss bereits eingeloggt sein)
+        parser: Name des Backends (siehe PARSER_BACKENDS)
     
     Returns:
-        dict: Dictionary mit allen Vertretungsplan-Daten oder None bei Fehler
+        bool: True bei identischem Ergebnis
+    """
+    if parser not in _PARITAET:
+        # Spät importiert: parser_engines importiert dieses Modul
+        from parser_engines import SAMPLE_HTML, extract_all_days_reference
+        _PARITAET[parser] = _parse_backend(SAMPLE_HTML, parser) == extract_all_days_reference(SAMPLE_HTML)
+    return _PARITAET[parser]
+
+
+def resolve_parser(parser: str = None) -> str:
+    """
+    Wählt das Parser-Backend aus
+    
+    Bei "auto" wird das erste installierte Backend aus lxml und html.parser
+    genommen, das auf der Beispielseite dasselbe liefert wie die Referenz.
+    Ein ausdrücklich gewähltes Backend ohne Parität wird mit einer Warnung
+    trotzdem verwendet.
+    
+    Args:
+        parser: Gewünschtes Backend oder None/"auto"
+    
+    Returns:
+        str: Name des Backends
+    """
+    parser = parser or DEFAULT_PARSER
+    if parser == "auto":
+        from parser_engines import available_backends
+        installiert = available_backends()
+        for backend in ("lxml", "html.parser"):
+            if backend in installiert and backend_paritaet(backend):
+                return backend
+        if "auto" not in _GEWARNT:
+            _GEWARNT.add("auto")
+            print("⚠️  Warnung: Kein Parser liefert dasselbe wie die Referenz - verwende html.parser")
+        return "html.parser"
+    if parser not in PARSER_BACKENDS:
+        raise ValueError(f"Unbekannter Parser: {parser} (erlaubt: {', '.join(PARSER_BACKENDS)})")
+    if not backend_paritaet(parser) and parser not in _GEWARNT:
+        _GEWARNT.add(parser)
+        print(f"⚠️  Warnung: Parser {parser} liefert auf der Beispielseite andere Daten als die Referenz")
+    return parser
+
+
+def parse_days(html_content: str, parser: str = None, cache: PanelCache = None) -> list:
+    """
+    Parst alle Tage aus dem HTML mit dem gewählten Backend
+    
+    Alle Backends liefern dieselbe Struktur wie extract_all_days.
+    
+    Args:
+        html_content: HTML der Vertretungsplan-Seite
+        parser: Backend (siehe PARSER_BACKENDS, Standard: DEFAULT_PARSER)
+        cache: Optionaler PanelCache - unveränderte Panels werden nicht neu geparst
+    
+    Returns:
+        list: Liste mit Dictionaries für jeden Tag
+    """
+    parser = resolve_parser(parser)
+    if cache is not None:
+        return cache.parse(html_content, lambda chunk: _parse_backend(chunk, parser))
+    return _parse_backend(html_content, parser)
+
+
+def build_vertretungsplan(html_content: str, parser: str = None,
+                          detector: ChangeDetector = None) -> dict:
+    """
+    Parst das HTML der Vertretungsplan-Seite zum Gesamtresultat
+    
+    Wird vom synchronen und vom asynchronen Abruf gemeinsam genutzt.
+    
+    Args:
+        html_content: HTML der Vertretungsplan-Seite
+        parser: Parser-Backend (siehe parse_days)
+        detector: Optionaler ChangeDetector - bei unveränderter Seite wird
+            nicht erneut geparst
+    
+    Returns:
+        dict: Dictionary mit zeitstempel, tage, anzahl_tage, unveraendert und records
+    """
+    if detector is not None:
+        def parse():
+            cache = detector.panel_cache
+            if cache is None:
+                return parse_days(html_content, parser)
+            hits, misses = cache.hits, cache.misses
+            all_days = parse_days(html_content, parser, cache)
+            print(f"🧩 Panels: {cache.hits - hits} aus dem Cache, {cache.misses - misses} neu geparst")
+            return all_days
+        
+        fingerprint = detector.fingerprint_html(html_content)
+        return build_detected_result(detector, fingerprint, parse)
+    
+    # Extrahiere alle Tage
+    print("\n📅 Extrahiere Daten für alle Tage...")
+    return build_result(parse_days(html_content, parser))
+
+
+def build_detected_result(detector: ChangeDetector, fingerprint: str, parse) -> dict:
+    """
+    Baut das Gesamtresultat und überspringt das Parsen bei unveränderter Seite
+    
+    Args:
+        detector: ChangeDetector mit dem Stand des letzten Scans
+        fingerprint: Fingerabdruck der aktuellen Seite
+        parse: Funktion ohne Argumente, die die Tage liefert
+    
+    Returns:
+        dict: Gesamtresultat, 'unveraendert' ist True wenn Seite und
+            Eingabe dem zuletzt geprüften Stand entsprechen, 'fingerprint'
+            ist nach erfolgreicher Prüfung an detector.commit zu übergeben
     """
-    vp_url = "https://start.schulportal.hessen.de/vertretungsplan.php"
+    key = detector.key(fingerprint)
+    unchanged = detector.is_unchanged(key)
+    cached = detector.cached_days(fingerprint)
+    if cached is not None:
+        print("\n♻️  Seite unverändert seit dem letzten Scan - Parsen übersprungen")
+        result = build_result(cached, unchanged=unchanged)
+    else:
+        print("\n📅 Extrahiere Daten für alle Tage...")
+        result = build_result(parse(), unchanged=unchanged)
+        detector.remember(fingerprint, result['records'])
+    result['fingerprint'] = key
+    return result
+
+
+def days_from_dom(raw_days: list) -> list:
+    """
+    Wandelt das Ergebnis von DOM_EXTRACT_SCRIPT in die Struktur von extract_all_days
+    
+    Args:
+        raw_days: Rückgabe von page.evaluate(DOM_EXTRACT_SCRIPT)
     
+    Returns:
+        list: Liste mit Dictionaries für jeden Tag
+    """
+    days_data = []
+    for raw in raw_days:
+        datum_text = raw['datum_text']
+        days_data.append({
+            'datum': parse_datum_text(datum_text) if datum_text is not None else "Unbekannt",
+            'badges': raw['badges'],
+            'panel_id': raw['panel_id'],
+            'informationen': raw['informationen'],
+            'vertretungen': raw['vertretungen'],
+            'letzte_aktualisierung': raw['letzte_aktualisierung']
+        })
+    return days_data
+
+
+def build_result(all_days: list, unchanged: bool = False) -> dict:
+    """
+    Baut aus den extrahierten Tagen das Gesamtresultat
+    
+    Gespeichert werden nur die Tag-Objekte; 'tage' ist eine Ansicht, die das
+    bisherige Format erst beim Zugriff exportiert (vertretung_model.TageAnsicht).
+    
+    Args:
+        all_days: Ergebnis von extract_all_days bzw. parse_days oder bereits
+            gebaute Tag-Objekte (z.B. aus dem ChangeDetector)
+        unchanged: Seite entspricht dem letzten Scan (siehe ChangeDetector)
+    
+    Returns:
+        dict: Dictionary mit zeitstempel, tage, anzahl_tage, unveraendert und
+            records (die Tage als Tag-Objekte, siehe vertretung_model)
+    """
+    records = [day if isinstance(day, Tag) else Tag.from_dict(day) for day in all_days]
+    print(f"✅ {len(records)} Tag(e) gefunden:")
+    for tag in records:
+        print(f"   - {tag.datum_text} ({', '.join(tag.badges)}): {len(tag.vertretungen)} Vertretung(en)")
+    
+    # Gesamtresultat
+    return {
+        'zeitstempel': datetime.now().isoformat(),
+        'anzahl_tage': len(records),
+        'tage': TageAnsicht(records),
+        'unveraendert': unchanged,
+        'records': records
+    }
+
+
+def print_vertretungsplan_header(vp_url: str):
+    """Gibt die Kopfzeilen für den Abruf aus"""
     print("=" * 60)
     print("VERTRETUNGSPLAN ABRUFEN")
     print("=" * 60)
     print(f"URL: {vp_url}\n")
+
+
+def resolve_extraction(extraction: str = None) -> str:
+    """Prüft den Extraktions-Modus (Standard: DEFAULT_EXTRACTION)"""
+    extraction = extraction or DEFAULT_EXTRACTION
+    if extraction not in EXTRACTION_MODES:
+        raise ValueError(f"Unbekannte Extraktion: {extraction} (erlaubt: {', '.join(EXTRACTION_MODES)})")
+    return extraction
+
+
+def build_dom_result(raw_days: list, detector: ChangeDetector = None) -> dict:
+    """
+    Baut das Gesamtresultat aus dem Ergebnis von DOM_EXTRACT_SCRIPT
+    
+    Args:
+        raw_days: Rückgabe von page.evaluate(DOM_EXTRACT_SCRIPT)
+        detector: Optionaler ChangeDetector (Fingerabdruck über das JSON)
+    
+    Returns:
+        dict: Dictionary mit zeitstempel, tage, anzahl_tage, unveraendert und records
+    """
+    if detector is not None:
+        fingerprint = detector.fingerprint_data(raw_days)
+        return build_detected_result(detector, fingerprint, lambda: days_from_dom(raw_days))
+    print("\n📅 Extrahiere Daten für alle Tage (im Browser)...")
+    return build_result(days_from_dom(raw_days))
+
+
+def extract_from_page(page: Page, extraction: str = None,
+                      detector: ChangeDetector = None) -> dict:
+    """
+    Extrahiert den Vertretungsplan aus der geladenen Seite
+    
+    Im Modus "dom" läuft die Extraktion als Skript im Browser und liefert
+    direkt JSON - ohne das DOM zu serialisieren und in Python neu zu parsen.
+    
+    Args:
+        page: Playwright Page Objekt mit geladenem Vertretungsplan
+        extraction: "html" oder "dom" (Standard: DEFAULT_EXTRACTION)
+        detector: Optionaler ChangeDetector für unveränderte Seiten
+    
+    Returns:
+        dict: Dictionary mit zeitstempel, tage, anzahl_tage, unveraendert und records
+    """
+    if resolve_extraction(extraction) == "dom":
+        return build_dom_result(page.evaluate(DOM_EXTRACT_SCRIPT), detector)
+    return build_vertretungsplan(page.content(), detector=detector)
+
+
+def wait_until_ready(page: Page):
+    """
+    Wartet bis die Seite nichts mehr nachlädt (höchstens WAIT_TIMEOUTS['network_idle'])
+    
+    Args:
+        page: Playwright Page Objekt mit geladenem Vertretungsplan
+    """
+    try:
+        page.wait_for_load_state("networkidle", timeout=WAIT_TIMEOUTS['network_idle'])
+    except PlaywrightTimeoutError:
+        print("⚠️  Seite lädt noch nach - fahre trotzdem fort")
+    print(f"✅ {page.locator(PANEL_SELECTOR).count()} Tag-Panel(s) bereit")
+
+
+def get_vertretungsplan(page: Page, timer: PhaseTimer = None,
+                        detector: ChangeDetector = None) -> dict:
+    """
+    Lädt den Vertretungsplan und extrahiert alle Daten
+    
+    Args:
+        page: Playwright Page Objekt (muss bereits eingeloggt sein)
+        timer: Optionaler PhaseTimer für die Zeitmessung
+        detector: Optionaler ChangeDetector für unveränderte Seiten
+    
+    Returns:
+        dict: Dictionary mit allen Vertretungsplan-Daten oder None bei Fehler
+    """
+    vp_url = VERTRETUNGSPLAN_URL
+    print_vertretungsplan_header(vp_url)
+    timer = timer or PhaseTimer()
     
     try:
         # Vertretungsplan-Seite laden
-        page.goto(vp_url, timeout=30000)
+        with timer.phase('page_load'):
+            page.goto(vp_url, timeout=WAIT_TIMEOUTS['page_load'])
+        
+        # Session abgelaufen? Dann direkt abbrechen statt auf die Tabelle zu warten
+        if is_login_redirect(page.url):
+            print("🔒 Session abgelaufen - Login erforderlich")
+            return None
         print(f"✅ Vertretungsplan-Seite geladen")
         
         # Warte bis die Tabelle geladen ist
-        page.wait_for_selector('table[data-toggle="table"]', timeout=10000)
+        with timer.phase('table_wait'):
+            page.wait_for_selector('table[data-toggle="table"]', timeout=WAIT_TIMEOUTS['table'])
         print("✅ Tabelle gefunden")
         
-        # Warte kurz damit alles vollständig geladen ist
-        time.sleep(2)
-        
-        # Hole HTML-Content
-        html_content = page.content()
-        
-        # HTML parsen
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Extrahiere alle Tage
-        print("\n📅 Extrahiere Daten für alle Tage...")
-        all_days = extract_all_days(soup)
-        
-        print(f"✅ {len(all_days)} Tag(e) gefunden:")
-        for day in all_days:
-            badges_str = ', '.join(day['badges']) if day['badges'] else ''
-            vp_count = day['vertretungen']['row_count'] if day['vertretungen'] else 0
-            print(f"   - {day['datum']} ({badges_str}): {vp_count} Vertretung(en)")
-        
-        # Gesamtresultat
-        from datetime import datetime
-        result = {
-            'zeitstempel': datetime.now().isoformat(),
-            'tage': all_days,
-            'anzahl_tage': len(all_days)
-        }
+        # Warte bis nichts mehr nachgeladen wird (statt fester Pause)
+        with timer.phase('ready_wait'):
+            wait_until_ready(page)
         
-        return result
+        # Daten extrahieren (HTML oder direkt im Browser)
+        with timer.phase('extract'):
+            return extract_from_page(page, detector=detector)
         
     except Exception as e:
         print(f"❌ Fehler beim Abrufen: {e}")
         import traceback
         traceback.print_exc()
         return None
+
+
+def fetch_vertretungsplan(page: Page, username: str, password: str, institution_id: str,
+                          session_file: str = None, timer: PhaseTimer = None,
+                          detector: ChangeDetector = None) -> dict:
+    """
+    Ruft den Vertretungsplan ab und loggt sich nur bei abgelaufener Session ein
+    
+    Die Seite sollte aus einem Kontext stammen, der mit der gespeicherten
+    Session erstellt wurde (storage_state=load_session_state(session_file)).
+    
+    Args:
+        page: Playwright Page Objekt
+        username: Benutzername
+        password: Passwort
+        institution_id: Institutions-ID
+        session_file: Pfad zur Session-Datei (None = nicht speichern)
+        timer: Optionaler PhaseTimer für die Zeitmessung
+        detector: Optionaler ChangeDetector - bei unveränderter, bereits
+            geprüfter Seite ist vp_data['unveraendert'] True; nach der Prüfung
+            detector.commit(vp_data['fingerprint']) aufrufen
+    
+    Returns:
+        dict: Vertretungsplan-Daten oder None bei Fehler
+    """
+    timer = timer or PhaseTimer()
+    vp_data = get_vertretungsplan(page, timer, detector)
+    if vp_data is not None or not is_login_redirect(page.url):
+        return vp_data
+    
+    if not login(page, username, password, institution_id, timer):
+        return None
+    
+    if session_file:
+        try:
+            write_session_state(page.context.storage_state(), session_file)
+        except Exception as e:
+            print(f"⚠️  Warnung: Session konnte nicht gespeichert werden: {e}")
+    
+    return get_vertretungsplan(page, timer, detector)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Snapshot-Archiv
+Speichert jeden unterschiedlichen Tag des Vertretungsplans genau einmal
+(komprimiert, Dateiname = Inhalts-Hash) und führt einen Index, aus dem
+sich der Plan zu jedem Zeitpunkt wiederherstellen lässt
+"""
+
+import bisect
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from vertretung_model import parse_datum, tage_dicts
+
+try:
+    import zstandard
+except ImportError:  # optionale Abhängigkeit
+    zstandard = None
+
+ARCHIVE_DIR = os.path.join('Vertretungsplan_saves', 'archiv')
+INDEX_DATEI = 'index.jsonl'
+DEFAULT_KEEP_DAYS = 180
+
+
+def keep_days_from_env() -> int:
+    """Aufbewahrung in Tagen aus ARCHIV_AUFBEWAHRUNG_TAGE (0 = nie kompaktieren)"""
+    return int(os.getenv('ARCHIV_AUFBEWAHRUNG_TAGE', str(DEFAULT_KEEP_DAYS)))
+
+
+def _encode_day(day: dict) -> bytes:
+    return json.dumps(day, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _datum_key(day: dict) -> str:
+    datum, date_obj = parse_datum(day.get('datum', 'Unbekannt'))
+    return date_obj.isoformat() if date_obj else datum
+
+
+def _as_datetime(zeitpunkt) -> datetime:
+    return datetime.fromisoformat(zeitpunkt) if isinstance(zeitpunkt, str) else zeitpunkt
+
+
+class SnapshotArchive:
+    """
+    Nur anhängendes Archiv: objekte/<hash>.json.zst|.gz plus index.jsonl
+
+    Eine Indexzeile entsteht nur, wenn sich der Plan gegenüber der vorigen
+    Zeile geändert hat. Sie enthält den Abrufzeitpunkt und pro Tag das
+    Datum und den Hash des Tages.
+    """
+
+    def __init__(self, folder: str = ARCHIVE_DIR, compression: str = None):
+        """
+        Args:
+            folder: Ordner des Archivs
+            compression: 'zstd' oder 'gzip' (Standard: zstd wenn installiert)
+        """
+        self.folder = folder
+        self.objects_dir = os.path.join(folder, 'objekte')
+        self.index_path = os.path.join(folder, INDEX_DATEI)
+        self.compression = compression or ('zstd' if zstandard is not None else 'gzip')
+        if self.compression == 'zstd' and zstandard is None:
+            raise RuntimeError("zstd-Kompression benötigt das Paket 'zstandard'")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.entries = self._load_index()
+        self._kompaktiert_am = None
+
+    # ------------------------------------------------------------------
+    # Objekte
+    # ------------------------------------------------------------------
+
+    def _object_path(self, digest: str, compression: str) -> str:
+        suffix = '.json.zst' if compression == 'zstd' else '.json.gz'
+        return os.path.join(self.objects_dir, digest[:2], digest + suffix)
+
+    def _write_object(self, digest: str, data: bytes) -> bool:
+        """Schreibt ein Objekt, falls es noch nicht existiert"""
+        for compression in ('zstd', 'gzip'):
+            if os.path.exists(self._object_path(digest, compression)):
+                return False
+        if self.compression == 'zstd':
+            payload = zstandard.ZstdCompressor(level=10).compress(data)
+        else:
+            payload = gzip.compress(data, compresslevel=9, mtime=0)
+        path = self._object_path(digest, self.compression)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return True
+
+    def _read_object(self, digest: str) -> dict:
+        path = self._object_path(digest, 'zstd')
+        if os.path.exists(path):
+            if zstandard is None:
+                raise RuntimeError("zstd-Objekt im Archiv, aber 'zstandard' ist nicht installiert")
+            with open(path, 'rb') as f:
+                data = zstandard.ZstdDecompressor().decompress(f.read())
+        else:
+            with open(self._object_path(digest, 'gzip'), 'rb') as f:
+                data = gzip.decompress(f.read())
+        return json.loads(data)
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    def _load_index(self) -> list:
+        entries = []
+        if not os.path.exists(self.index_path):
+            return entries
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Abgebrochene letzte Zeile (z.B. Absturz beim Schreiben) überspringen
+                    print(f"⚠️  Warnung: Defekte Zeile in {self.index_path} übersprungen")
+        return entries
+
+    def add(self, vertretungsplan_data: dict) -> bool:
+        """
+        Archiviert einen Abruf
+
+        Args:
+            vertretungsplan_data: Ergebnis von get_vertretungsplan
+
+        Returns:
+            bool: True wenn sich der Plan geändert hat und ein Indexeintrag entstand
+        """
+        tage = []
+        neue_objekte = 0
+        for day in tage_dicts(vertretungsplan_data):
+            data = _encode_day(day)
+            digest = hashlib.sha256(data).hexdigest()
+            if self._write_object(digest, data):
+                neue_objekte += 1
+            tage.append([_datum_key(day), digest])
+
+        if self.entries and self.entries[-1]['tage'] == tage:
+            return False
+
+        entry = {'zeitstempel': vertretungsplan_data['zeitstempel'], 'tage': tage}
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.entries.append(entry)
+        print(f"🗄️  Archiviert: {len(tage)} Tag(e), {neue_objekte} neu gespeichert")
+        return True
+
+    def at(self, zeitpunkt) -> Optional[dict]:
+        """
+        Stellt den Plan wieder her, wie er zu einem Zeitpunkt bekannt war
+
+        Args:
+            zeitpunkt: datetime oder ISO-String
+
+        Returns:
+            dict: zeitstempel (des Abrufs), tage, anzahl_tage oder None,
+                wenn das Archiv zu diesem Zeitpunkt noch leer war
+        """
+        zeitpunkt = _as_datetime(zeitpunkt)
+        stamps = [_as_datetime(e['zeitstempel']) for e in self.entries]
+        position = bisect.bisect_right(stamps, zeitpunkt)
+        if position == 0:
+            return None
+        entry = self.entries[position - 1]
+        tage = [self._read_object(digest) for _, digest in entry['tage']]
+        return {'zeitstempel': entry['zeitstempel'], 'tage': tage, 'anzahl_tage': len(tage)}
+
+    def history(self, datum: str) -> list:
+        """
+        Alle Stände eines Tages
+
+        Args:
+            datum: "2025-12-01" oder "01.12.2025"
+
+        Returns:
+            list: [(zeitstempel, hash)] bei jeder Änderung dieses Tages
+        """
+        datum = _datum_key({'datum': datum}) if '.' in datum else datum
+        result = []
+        for entry in self.entries:
+            for key, digest in entry['tage']:
+                if key == datum and (not result or result[-1][1] != digest):
+                    result.append((entry['zeitstempel'], digest))
+        return result
+
+    def day(self, digest: str) -> dict:
+        """Lädt einen archivierten Tag über seinen Hash"""
+        return self._read_object(digest)
+
+    # ------------------------------------------------------------------
+    # Aufbewahrung
+    # ------------------------------------------------------------------
+
+    def add_and_compact(self, vertretungsplan_data: dict, keep_days: int = None,
+                        now: datetime = None) -> bool:
+        """
+        Archiviert einen Abruf und kompaktiert höchstens einmal pro Tag
+
+        compact() liest alle Objektnamen, daher nicht nach jedem Abruf.
+
+        Args:
+            vertretungsplan_data: Ergebnis von get_vertretungsplan
+            keep_days: Aufbewahrung in Tagen (Standard: keep_days_from_env(),
+                0 = nie kompaktieren)
+            now: Aktueller Zeitpunkt (für Tests)
+
+        Returns:
+            bool: Ergebnis von add()
+        """
+        changed = self.add(vertretungsplan_data)
+        keep_days = keep_days_from_env() if keep_days is None else keep_days
+        now = now or datetime.now()
+        if keep_days > 0 and self._kompaktiert_am != now.date():
+            self.compact(keep_days, now)
+            self._kompaktiert_am = now.date()
+        return changed
+
+    def compact(self, keep_days: int = DEFAULT_KEEP_DAYS, now: datetime = None) -> dict:
+        """
+        Entfernt Indexeinträge älter als keep_days und danach alle Objekte,
+        auf die kein Eintrag mehr verweist
+
+        Der letzte Eintrag vor der Grenze bleibt erhalten, damit at() für
+        den gesamten Aufbewahrungszeitraum funktioniert.
+
+        Returns:
+            dict: entries_removed, objects_removed
+        """
+        cutoff = (now or datetime.now()) - timedelta(days=keep_days)
+        stamps = [_as_datetime(e['zeitstempel']) for e in self.entries]
+        first_kept = max(bisect.bisect_right(stamps, cutoff) - 1, 0)
+        kept = self.entries[first_kept:]
+        entries_removed = len(self.entries) - len(kept)
+
+        if entries_removed:
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in kept:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            os.replace(tmp_path, self.index_path)
+            self.entries = kept
+
+        referenced = {digest for entry in kept for _, digest in entry['tage']}
+        objects_removed = 0
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                if name.split('.', 1)[0] not in referenced:
+                    os.remove(os.path.join(prefix_dir, name))
+                    objects_removed += 1
+            if not os.listdir(prefix_dir):
+                os.rmdir(prefix_dir)
+
+        print(f"🧹 Archiv kompaktiert: {entries_removed} Einträge, {objects_removed} Objekte entfernt")
+        return {'entries_removed': entries_removed, 'objects_removed': objects_removed}
+
+
+def main():
+    """Test-Funktion: Deduplizierung, Wiederherstellung und Aufbewahrung"""
+    import copy
+    import tempfile
+
+    from parser_engines import SAMPLE_HTML
+    from schulportal_lib import parse_days
+
+    archive = SnapshotArchive(tempfile.mkdtemp())
+    days = parse_days(SAMPLE_HTML)
+    start = datetime(2025, 12, 1, 7, 0)
+
+    # 288 Abrufe an einem Tag, der Plan ändert sich zweimal
+    snapshots = {}
+    for i in range(288):
+        if i in (0, 100, 200):
+            days = copy.deepcopy(days)
+            days[0]['vertretungen']['rows'].append([str(i), 'E', '', 'Nie', 'Entfall', '', '', ''])
+            days[0]['vertretungen']['row_count'] += 1
+        zeitstempel = (start + timedelta(minutes=5 * i)).isoformat()
+        archive.add({'zeitstempel': zeitstempel, 'tage': days})
+        snapshots[zeitstempel] = days
+
+    objects = sum(len(files) for _, _, files in os.walk(archive.objects_dir))
+    assert len(archive.entries) == 3, "Unveränderte Abrufe dürfen keinen Eintrag erzeugen"
+    for zeitstempel in list(snapshots)[::37]:
+        assert archive.at(zeitstempel)['tage'] == snapshots[zeitstempel]
+    assert archive.at(start - timedelta(minutes=1)) is None
+    print(f"📦 288 Abrufe -> {len(archive.entries)} Indexeinträge, {objects} Objekte ({archive.compression})")
+    print(f"📅 Stände des 01.12.2025: {len(archive.history('01.12.2025'))}")
+
+    archive.compact(keep_days=1, now=start + timedelta(days=30))
+    assert archive.at(start + timedelta(days=30))['tage'] == days
+
+    # Nach dem Archivieren wird einmal pro Tag kompaktiert
+    days = copy.deepcopy(days)
+    days[0]['vertretungen']['rows'].pop()
+    days[0]['vertretungen']['row_count'] -= 1
+    spaeter = start + timedelta(days=60)
+    archive.add_and_compact({'zeitstempel': spaeter.isoformat(), 'tage': days}, keep_days=1, now=spaeter)
+    assert archive._kompaktiert_am == spaeter.date() and archive.at(spaeter)['tage'] == days
+    print("\n✅ Snapshot-Archiv funktioniert")
+
+
+if __name__ == "__main__":
+    main()
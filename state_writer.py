@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+State-Writer
+Atomares Schreiben von Zustandsdateien (Temp-Datei + Umbenennen) und ein
+Hintergrund-Schreiber, der schnell aufeinanderfolgende Speicherungen
+derselben Datei zu einem Schreibvorgang zusammenfasst
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+
+def file_signature(path: str):
+    """
+    Signatur einer Datei für das Erkennen von Änderungen
+
+    Returns:
+        Tuple (mtime_ns, size) oder None wenn die Datei fehlt
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def atomic_write_text(path: str, text: str):
+    """
+    Schreibt eine Datei so, dass sie nach einem Absturz entweder den alten
+    oder den neuen Inhalt hat, nie einen abgeschnittenen
+
+    Args:
+        path: Zieldatei
+        text: Neuer Inhalt
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def atomic_write_json(path: str, data, indent: int = 2):
+    """Schreibt data als JSON atomar (siehe atomic_write_text)"""
+    atomic_write_text(path, json.dumps(data, indent=indent, ensure_ascii=False))
+
+
+class StateWriter:
+    """
+    Schreibt Zustandsdateien in einem eigenen Thread
+
+    write_json serialisiert sofort (spätere Änderungen am Objekt wirken sich
+    nicht aus) und kehrt zurück. Der Thread wartet `delay` Sekunden, sodass
+    weitere Speicherungen derselben Datei nur den Inhalt ersetzen, und
+    schreibt dann jede Datei einmal atomar.
+    """
+
+    def __init__(self, delay: float = 1.0):
+        """
+        Args:
+            delay: Sammelzeit in Sekunden vor dem Schreiben
+        """
+        self.delay = delay
+        self._pending: Dict[str, str] = {}
+        self._writing = set()
+        self._signatures = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._flush_requested = False
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'requested': 0, 'written': 0, 'errors': 0}
+
+    def write_json(self, path: str, data, indent: int = 2):
+        """
+        Plant das Schreiben einer JSON-Datei ein (blockiert nicht)
+
+        Args:
+            path: Zieldatei
+            data: JSON-serialisierbare Daten
+            indent: Einrückung
+        """
+        text = json.dumps(data, indent=indent, ensure_ascii=False)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("StateWriter ist bereits geschlossen")
+            self._pending[path] = text
+            self.stats['requested'] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='state-writer', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def pending(self, path: str = None) -> bool:
+        """Ob für path (oder irgendeine Datei) noch ein Schreibvorgang aussteht"""
+        with self._cond:
+            if path is None:
+                return bool(self._pending or self._writing)
+            return path in self._pending or path in self._writing
+
+    def signature(self, path: str):
+        """file_signature der Datei direkt nach dem letzten eigenen Schreiben"""
+        with self._cond:
+            return self._signatures.get(path)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Schreibt ausstehende Dateien sofort und wartet darauf
+
+        Returns:
+            bool: True wenn nichts mehr aussteht
+        """
+        with self._cond:
+            if self._thread is None:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def close(self, timeout: float = 10.0):
+        """Schreibt alles Ausstehende und beendet den Thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending and self._closed:
+                    return
+                # Sammelzeit: weitere Speicherungen ersetzen nur den Inhalt
+                self._cond.wait_for(lambda: self._closed or self._flush_requested, self.delay)
+                self._flush_requested = False
+                batch, self._pending = self._pending, {}
+                self._writing = set(batch)
+
+            for path, text in batch.items():
+                try:
+                    atomic_write_text(path, text)
+                    signature = file_signature(path)
+                    ok = True
+                except OSError as e:
+                    print(f"⚠️  Warnung: Fehler beim Speichern von {path}: {e}")
+                    ok = False
+                with self._cond:
+                    if ok:
+                        self._signatures[path] = signature
+                        self.stats['written'] += 1
+                    else:
+                        self.stats['errors'] += 1
+                    self._writing.discard(path)
+                    self._cond.notify_all()
+
+
+def main():
+    """Test-Funktion: Zusammenfassen, Atomarität und Flush beim Beenden"""
+    import tempfile
+    import time
+
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, 'bot_stats.json')
+
+    writer = StateWriter(delay=0.2)
+    stats = {'total_scans': 0}
+    blockiert = 0.0
+    for i in range(100):
+        stats['total_scans'] = i + 1
+        start = time.perf_counter()
+        writer.write_json(path, stats)
+        blockiert += (time.perf_counter() - start) / 100
+        time.sleep(0.001)  # über die Sammelzeit verteilt wie mehrere Speicherungen pro Scan
+    assert writer.pending(path)
+
+    writer.flush()
+    with open(path, 'r', encoding='utf-8') as f:
+        assert json.load(f) == {'total_scans': 100}
+    assert writer.signature(path) == file_signature(path)
+    assert not os.path.exists(f"{path}.tmp")
+    print(f"💾 100 Speicherungen -> {writer.stats['written']} Schreibvorgang, "
+          f"{blockiert * 1e6:.0f} µs pro Aufruf im Aufrufer")
+
+    # close() schreibt ausstehende Daten, ohne die Sammelzeit abzuwarten
+    writer.delay = 60
+    writer.write_json(path, {'total_scans': 101})
+    start = time.perf_counter()
+    writer.close()
+    with open(path, 'r', encoding='utf-8') as f:
+        assert json.load(f) == {'total_scans': 101}
+    print(f"⏹️  close() nach {time.perf_counter() - start:.2f}s, Daten geschrieben")
+    print("\n✅ State-Writer funktioniert")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,114 +5,181 @@ Gleicht den persönlichen Stundenplan mit dem Vertretungsplan ab
 und meldet Ausfälle in der Konsole
 """
 
-import json
 import os
-from datetime import datetime
+from datetime import date
 from typing import Dict, List, Set, Tuple
 
+from ausfall_store import ohne_abgelaufene, open_store
+from state_writer import file_signature
+from vertretung_model import WOCHENTAGE_DE, parse_datum, tage_from_result
+
+
+def parse_stundenplan_datei(stundenplan_datei: str) -> Dict[str, Dict[int, str]]:
+    """
+    Parst eine Stundenplan-Datei ("Montag" / "Stunde 1 = Shm" / ...)
+    
+    Args:
+        stundenplan_datei: Pfad zur Stundenplan-Datei
+    
+    Returns:
+        Dictionary: {wochentag: {stunde: lehrerkuerzel}}
+    """
+    stundenplan = {}
+    
+    if not os.path.exists(stundenplan_datei):
+        print(f"⚠️  Warnung: {stundenplan_datei} nicht gefunden!")
+        return stundenplan
+    
+    with open(stundenplan_datei, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    
+    current_day = None
+    
+    for line in lines:
+        line = line.strip()
+        
+        if not line:
+            continue
+        
+        # Prüfe ob es ein Wochentag ist
+        if line in WOCHENTAGE_DE.values():
+            current_day = line
+            stundenplan[current_day] = {}
+        elif current_day and '=' in line:
+            # Parse Stundenzeile: "Stunde 1 = Shm"
+            parts = line.split('=')
+            if len(parts) == 2:
+                stunden_text = parts[0].strip()
+                lehrer = parts[1].strip()
+                
+                # Extrahiere Stundennummer
+                if 'Stunde' in stunden_text:
+                    try:
+                        stunde_num = int(stunden_text.split()[1])
+                        if lehrer != "None":
+                            stundenplan[current_day][stunde_num] = lehrer
+                    except (ValueError, IndexError):
+                        pass
+    
+    return stundenplan
+
 
 class StundenplanChecker:
     """Klasse zum Abgleichen von Stundenplan und Vertretungsplan"""
     
-    WOCHENTAGE_DE = {
-        0: "Montag",
-        1: "Dienstag", 
-        2: "Mittwoch",
-        3: "Donnerstag",
-        4: "Freitag",
-        5: "Samstag",
-        6: "Sonntag"
-    }
+    WOCHENTAGE_DE = WOCHENTAGE_DE
     
     def __init__(self, stundenplan_datei: str = "Stundenplan.txt", 
-                 tracking_datei: str = "known_ausfaelle.json"):
+                 tracking_datei: str = "known_ausfaelle.json", store=None):
         """
         Initialisiert den Checker
         
         Args:
             stundenplan_datei: Pfad zur Stundenplan-Datei
-            tracking_datei: Pfad zur JSON-Datei für bereits gemeldete Ausfälle
+            tracking_datei: Datei für bereits gemeldete Ausfälle
+                (.json oder .db für SQLite, siehe ausfall_store)
+            store: Optionaler Store statt open_store(tracking_datei)
         """
         self.stundenplan_datei = stundenplan_datei
         self.tracking_datei = tracking_datei
+        self.store = store or open_store(tracking_datei)
+        # Signatur vor dem Lesen merken: Änderungen währenddessen lösen ein erneutes Laden aus
+        self._stundenplan_signature = file_signature(stundenplan_datei)
         self.stundenplan = self._parse_stundenplan()
+        self._tracking_signature = file_signature(tracking_datei)
         self.known_ausfaelle = self._load_known_ausfaelle()
+        self._bereinigt_am = date.today()  # load() liefert nur IDs ab heute
     
-    def _parse_stundenplan(self) -> Dict[str, Dict[int, str]]:
+    def reload_if_changed(self) -> bool:
         """
-        Parst die Stundenplan.txt Datei
+        Lädt Stundenplan und bekannte Ausfälle neu, wenn sich die Dateien
+        (mtime oder Größe) geändert haben
+        
+        Neu geladen wird vollständig nebenher, danach werden die Daten mit
+        einer Zuweisung ausgetauscht - ein laufender Abgleich sieht nie
+        einen halb geladenen Stundenplan.
         
         Returns:
-            Dictionary: {wochentag: {stunde: lehrerkuerzel}}
+            bool: True wenn etwas neu geladen wurde
         """
-        stundenplan = {}
+        reloaded = False
         
-        if not os.path.exists(self.stundenplan_datei):
-            print(f"⚠️  Warnung: {self.stundenplan_datei} nicht gefunden!")
-            return stundenplan
+        signature = file_signature(self.stundenplan_datei)
+        if signature != self._stundenplan_signature:
+            stundenplan = self._parse_stundenplan()
+            self.stundenplan, self._stundenplan_signature = stundenplan, signature
+            print(f"🔄 {self.stundenplan_datei} neu geladen")
+            reloaded = True
         
-        with open(self.stundenplan_datei, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+        signature = file_signature(self.tracking_datei)
+        if signature is not None and signature == self.store.own_signature():
+            # Eigener Schreibvorgang aus dem Hintergrund, der Speicher ist bereits aktuell
+            self._tracking_signature = signature
+        elif signature != self._tracking_signature and not self.store.pending():
+            known_ausfaelle = self._load_known_ausfaelle()
+            self.known_ausfaelle, self._tracking_signature = known_ausfaelle, signature
+            print(f"🔄 {self.tracking_datei} neu geladen")
+            reloaded = True
         
-        current_day = None
+        return reloaded
+    
+    def input_signature(self):
+        """
+        Signatur der Stundenplan-Datei für ChangeDetector.input_signature
         
-        for line in lines:
-            line = line.strip()
-            
-            if not line:
-                continue
-            
-            # Prüfe ob es ein Wochentag ist
-            if line in self.WOCHENTAGE_DE.values():
-                current_day = line
-                stundenplan[current_day] = {}
-            elif current_day and '=' in line:
-                # Parse Stundenzeile: "Stunde 1 = Shm"
-                parts = line.split('=')
-                if len(parts) == 2:
-                    stunden_text = parts[0].strip()
-                    lehrer = parts[1].strip()
-                    
-                    # Extrahiere Stundennummer
-                    if 'Stunde' in stunden_text:
-                        try:
-                            stunde_num = int(stunden_text.split()[1])
-                            if lehrer != "None":
-                                stundenplan[current_day][stunde_num] = lehrer
-                        except (ValueError, IndexError):
-                            pass
+        Ändert sich der Stundenplan, muss auch ein unveränderter
+        Vertretungsplan erneut abgeglichen werden.
+        """
+        return file_signature(self.stundenplan_datei)
+    
+    def _parse_stundenplan(self) -> Dict[str, Dict[int, str]]:
+        """
+        Parst die Stundenplan.txt Datei
         
-        return stundenplan
+        Returns:
+            Dictionary: {wochentag: {stunde: lehrerkuerzel}}
+        """
+        return parse_stundenplan_datei(self.stundenplan_datei)
     
     def _load_known_ausfaelle(self) -> Set[str]:
         """
-        Lädt bereits gemeldete Ausfälle aus JSON-Datei
+        Lädt bereits gemeldete Ausfälle aus dem Store
         
         Returns:
             Set mit IDs bereits gemeldeter Ausfälle
         """
-        if not os.path.exists(self.tracking_datei):
-            return set()
+        return self.store.load()
+    
+    def _prune_known_ausfaelle(self) -> bool:
+        """
+        Entfernt einmal pro Tag die Ausfälle vergangener Tage aus dem Speicher
+        und schreibt den gekürzten Stand in den Store
         
-        try:
-            with open(self.tracking_datei, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return set(data.get('ausfaelle', []))
-        except Exception as e:
-            print(f"⚠️  Warnung: Fehler beim Laden von {self.tracking_datei}: {e}")
-            return set()
+        Returns:
+            bool: True wenn IDs entfernt wurden
+        """
+        heute = date.today()
+        if self._bereinigt_am == heute:
+            return False
+        self._bereinigt_am = heute
+        aktuell = ohne_abgelaufene(self.known_ausfaelle, heute)
+        if len(aktuell) == len(self.known_ausfaelle):
+            return False
+        self.known_ausfaelle = aktuell
+        self._save_known_ausfaelle()
+        return True
     
-    def _save_known_ausfaelle(self):
-        """Speichert bekannte Ausfälle in JSON-Datei"""
-        try:
-            data = {
-                'ausfaelle': list(self.known_ausfaelle),
-                'letzte_aktualisierung': datetime.now().isoformat()
-            }
-            with open(self.tracking_datei, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"⚠️  Warnung: Fehler beim Speichern von {self.tracking_datei}: {e}")
+    def _save_known_ausfaelle(self, neue_ids: List[str] = ()):
+        """
+        Speichert bekannte Ausfälle im Store
+        
+        Args:
+            neue_ids: Seit dem letzten Speichern hinzugekommene IDs
+                (SQLite fügt nur diese ein, JSON schreibt die ganze Menge)
+        """
+        self.store.save(self.known_ausfaelle, neue_ids)
+        # Eigene Schreibzugriffe lösen kein erneutes Laden aus
+        self._tracking_signature = file_signature(self.tracking_datei)
     
     def _create_ausfall_id(self, datum: str, stunde: str, lehrer: str) -> str:
         """
@@ -138,28 +205,35 @@ class StundenplanChecker:
         Returns:
             Tuple: (sauberes Datum "01.12.2025", Wochentag)
         """
-        # Extrahiere nur das Datum im Format DD.MM.YYYY
-        datum_clean = ""
-        for part in datum_str.split():
-            if '.' in part and len(part) >= 8:
-                # Finde das Datum-Pattern
-                import re
-                match = re.search(r'(\d{2}\.\d{2}\.\d{4})', part)
-                if match:
-                    datum_clean = match.group(1)
-                    break
+        datum_clean, date_obj = parse_datum(datum_str)
+        wochentag = self.WOCHENTAGE_DE[date_obj.weekday()] if date_obj else "Unbekannt"
+        return datum_clean, wochentag
+    
+    def neue_markieren(self, ausfaelle: List[dict]) -> List[dict]:
+        """
+        Markiert bereits gefundene Ausfälle als neu oder bekannt und speichert
+        die neuen (für Abgleiche über StundenplanIndex bzw. RegelEngine)
         
-        if not datum_clean:
-            datum_clean = datum_str
+        Args:
+            ausfaelle: Ausfälle mit mindestens 'ausfall_id'
+            
+        Returns:
+            Dieselben Ausfälle, jeweils mit 'neu'
+        """
+        self.reload_if_changed()
+        self._prune_known_ausfaelle()
+        known_ausfaelle = self.known_ausfaelle
         
-        # Bestimme Wochentag aus Datum
-        try:
-            date_obj = datetime.strptime(datum_clean, '%d.%m.%Y')
-            wochentag = self.WOCHENTAGE_DE[date_obj.weekday()]
-        except:
-            wochentag = "Unbekannt"
+        neue_ids = []
+        for ausfall in ausfaelle:
+            ausfall['neu'] = ausfall['ausfall_id'] not in known_ausfaelle
+            if ausfall['neu']:
+                known_ausfaelle.add(ausfall['ausfall_id'])
+                neue_ids.append(ausfall['ausfall_id'])
         
-        return datum_clean, wochentag
+        if neue_ids:
+            self._save_known_ausfaelle(neue_ids)
+        return ausfaelle
     
     def check_vertretungsplan(self, vertretungsplan_data: dict) -> List[dict]:
         """
@@ -171,77 +245,54 @@ class StundenplanChecker:
         Returns:
             Liste mit relevanten Ausfällen
         """
+        # Geänderte Dateien übernehmen, danach mit einem festen Stand arbeiten
+        self.reload_if_changed()
+        self._prune_known_ausfaelle()
+        stundenplan = self.stundenplan
+        known_ausfaelle = self.known_ausfaelle
+        
         relevante_ausfaelle = []
         neue_ausfaelle_count = 0
+        neue_ids = []
         bereits_bekannt_count = 0
         
         print("\n" + "=" * 70)
         print("STUNDENPLAN-ABGLEICH")
         print("=" * 70)
         
-        # Iteriere durch alle Tage im Vertretungsplan
-        for tag in vertretungsplan_data.get('tage', []):
-            datum_raw = tag.get('datum', 'Unbekannt')
-            datum, wochentag = self._parse_datum(datum_raw)
+        # Iteriere durch alle Tage im Vertretungsplan (Datum und Stunden sind vorab geparst)
+        for tag in tage_from_result(vertretungsplan_data):
+            datum, wochentag = tag.datum, tag.wochentag
             
             print(f"\n📅 Prüfe {wochentag}, {datum}")
             
             # Hole den Stundenplan für diesen Wochentag
-            mein_stundenplan = self.stundenplan.get(wochentag, {})
+            mein_stundenplan = stundenplan.get(wochentag, {})
             
             if not mein_stundenplan:
                 print(f"   ℹ️  Kein Unterricht laut Stundenplan")
                 continue
             
             # Prüfe Vertretungen für diesen Tag
-            vertretungen = tag.get('vertretungen')
-            if not vertretungen or vertretungen.get('row_count', 0) == 0:
+            if not tag.vertretungen:
                 print(f"   ✅ Keine Vertretungen/Ausfälle")
                 continue
             
-            headers = vertretungen.get('headers', [])
-            rows = vertretungen.get('rows', [])
-            
-            # Finde Index der relevanten Spalten
-            try:
-                stunde_idx = headers.index('Stunde')
-                lehrer_idx = headers.index('Lehrer')
-                art_idx = headers.index('Art')
-            except ValueError as e:
-                print(f"   ⚠️  Fehler beim Parsen der Tabelle: {e}")
+            # Relevante Spalten müssen vorhanden sein
+            fehlend = [name for name in ('Stunde', 'Lehrer', 'Art') if name not in tag.columns]
+            if fehlend:
+                print(f"   ⚠️  Fehler beim Parsen der Tabelle: Spalte '{fehlend[0]}' fehlt")
                 continue
             
             # Prüfe jede Vertretungszeile
-            for row in rows:
-                if len(row) <= max(stunde_idx, lehrer_idx, art_idx):
-                    continue
-                
-                stunde_str = row[stunde_idx].strip()
-                lehrer = row[lehrer_idx].strip()
-                art = row[art_idx].strip()
-                
-                # Prüfe ob es ein Entfall ist
-                if 'Entfall' not in art:
+            for vertretung in tag.vertretungen:
+                # Kein Entfall (oder Zeile zu kurz für Lehrer/Art)
+                if vertretung.lehrer is None or not vertretung.ist_entfall:
                     continue
-                
-                # Parse Stundennummer (kann "3" oder "9 - 10" sein)
-                stunden = []
-                if '-' in stunde_str:
-                    parts = stunde_str.split('-')
-                    try:
-                        start = int(parts[0].strip())
-                        end = int(parts[1].strip())
-                        stunden = list(range(start, end + 1))
-                    except ValueError:
-                        continue
-                else:
-                    try:
-                        stunden = [int(stunde_str)]
-                    except ValueError:
-                        continue
+                lehrer = vertretung.lehrer
                 
                 # Prüfe ob eine dieser Stunden in meinem Stundenplan ist
-                for stunde in stunden:
+                for stunde in vertretung.stunden:
                     if stunde in mein_stundenplan:
                         mein_lehrer = mein_stundenplan[stunde]
                         
@@ -251,7 +302,7 @@ class StundenplanChecker:
                             ausfall_id = self._create_ausfall_id(datum, str(stunde), lehrer)
                             
                             # Prüfe ob bereits bekannt
-                            is_new = ausfall_id not in self.known_ausfaelle
+                            is_new = ausfall_id not in known_ausfaelle
                             
                             ausfall_info = {
                                 'datum': datum,
@@ -266,15 +317,16 @@ class StundenplanChecker:
                             
                             if is_new:
                                 print(f"   🚨 NEUER AUSFALL: Stunde {stunde} ({lehrer}) fällt aus!")
-                                self.known_ausfaelle.add(ausfall_id)
+                                known_ausfaelle.add(ausfall_id)
                                 neue_ausfaelle_count += 1
+                                neue_ids.append(ausfall_id)
                             else:
                                 print(f"   🔄 [DEBUG] Bereits bekannt: Stunde {stunde} ({lehrer}) fällt aus")
                                 bereits_bekannt_count += 1
         
         # Speichere aktualisierte Liste der bekannten Ausfälle
         if neue_ausfaelle_count > 0:
-            self._save_known_ausfaelle()
+            self._save_known_ausfaelle(neue_ids)
         
         # Zusammenfassung
         print("\n" + "=" * 70)
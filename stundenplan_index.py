@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Stundenplan-Index
+Hält die Stundenpläne vieler Abonnenten in einem invertierten Index über
+(Wochentag, Stunde, Lehrerkürzel), sodass ein Durchlauf über die
+Entfall-Zeilen eines Scans die Betroffenen aller Abonnenten liefert
+"""
+
+import sys
+from collections import defaultdict
+from typing import Dict, Hashable, List
+
+from stundenplan_checker import parse_stundenplan_datei
+from vertretung_model import tage_from_result
+
+
+class StundenplanIndex:
+    """Invertierter Index: (wochentag, stunde, lehrer) -> Abonnenten"""
+
+    def __init__(self):
+        self._index = defaultdict(set)
+        self._plans = {}
+
+    def __len__(self):
+        return len(self._plans)
+
+    def __contains__(self, subscriber: Hashable):
+        return subscriber in self._plans
+
+    def add(self, subscriber: Hashable, stundenplan: Dict[str, Dict[int, str]]):
+        """
+        Nimmt einen Stundenplan auf (ersetzt einen vorhandenen)
+
+        Args:
+            subscriber: Kennung des Abonnenten (z.B. Discord-User-ID)
+            stundenplan: {wochentag: {stunde: lehrerkuerzel}} wie von
+                parse_stundenplan_datei
+        """
+        self.remove(subscriber)
+        keys = set()
+        for wochentag, stunden in stundenplan.items():
+            for stunde, lehrer in stunden.items():
+                key = (wochentag, stunde, sys.intern(lehrer))
+                self._index[key].add(subscriber)
+                keys.add(key)
+        self._plans[subscriber] = keys
+
+    def add_file(self, subscriber: Hashable, stundenplan_datei: str):
+        """Nimmt den Stundenplan aus einer Stundenplan-Datei auf"""
+        self.add(subscriber, parse_stundenplan_datei(stundenplan_datei))
+
+    def remove(self, subscriber: Hashable):
+        """Entfernt einen Abonnenten aus dem Index"""
+        for key in self._plans.pop(subscriber, ()):
+            subscribers = self._index[key]
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._index[key]
+
+    def match(self, vertretungsplan_data: dict) -> Dict[Hashable, List[dict]]:
+        """
+        Findet für alle Abonnenten die Ausfälle in ihrem Stundenplan
+
+        Args:
+            vertretungsplan_data: Ergebnis von get_vertretungsplan
+
+        Returns:
+            dict: {abonnent: [ausfall, ...]} nur für betroffene Abonnenten.
+                Ein Ausfall hat dieselben Felder wie bei StundenplanChecker
+                (datum, wochentag, stunde, lehrer, ausfall_id) ohne 'neu'.
+        """
+        betroffene = defaultdict(list)
+        index = self._index
+        for tag in tage_from_result(vertretungsplan_data):
+            wochentag = tag.wochentag
+            for vertretung in tag.entfaelle():
+                lehrer = vertretung.lehrer
+                for stunde in vertretung.stunden:
+                    subscribers = index.get((wochentag, stunde, lehrer))
+                    if not subscribers:
+                        continue
+                    ausfall = {
+                        'datum': tag.datum,
+                        'wochentag': wochentag,
+                        'stunde': stunde,
+                        'lehrer': lehrer,
+                        'ausfall_id': f"{tag.datum}_{stunde}_{lehrer}"
+                    }
+                    for subscriber in subscribers:
+                        betroffene[subscriber].append(dict(ausfall))
+        return dict(betroffene)
+
+
+def match_naiv(stundenplaene: dict, vertretungsplan_data: dict) -> Dict[Hashable, List[dict]]:
+    """
+    Vergleichsimplementierung: jeder Stundenplan einzeln wie im StundenplanChecker
+
+    Args:
+        stundenplaene: {abonnent: {wochentag: {stunde: lehrerkuerzel}}}
+        vertretungsplan_data: Ergebnis von get_vertretungsplan
+
+    Returns:
+        dict: wie StundenplanIndex.match
+    """
+    betroffene = {}
+    tage = tage_from_result(vertretungsplan_data)
+    for subscriber, stundenplan in stundenplaene.items():
+        for tag in tage:
+            mein_stundenplan = stundenplan.get(tag.wochentag, {})
+            if not mein_stundenplan:
+                continue
+            for vertretung in tag.entfaelle():
+                for stunde in vertretung.stunden:
+                    if mein_stundenplan.get(stunde) == vertretung.lehrer:
+                        betroffene.setdefault(subscriber, []).append({
+                            'datum': tag.datum,
+                            'wochentag': tag.wochentag,
+                            'stunde': stunde,
+                            'lehrer': vertretung.lehrer,
+                            'ausfall_id': f"{tag.datum}_{stunde}_{vertretung.lehrer}"
+                        })
+    return betroffene
+
+
+def main():
+    """Benchmark: naiver Abgleich pro Stundenplan gegen den Index"""
+    import random
+    import time
+
+    from vertretung_model import Tag
+
+    random.seed(49)
+    lehrer = [f"L{i:02d}" for i in range(80)]
+    wochentage = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag"]
+    daten = ["01.12.2025", "02.12.2025", "03.12.2025", "04.12.2025", "05.12.2025"]
+
+    # Eine Woche mit je 30 Zeilen pro Tag, davon etwa die Hälfte Entfall
+    tage = []
+    for datum in daten:
+        rows = []
+        for _ in range(30):
+            start = random.randint(1, 9)
+            stunde = f"{start} - {start + 1}" if random.random() < 0.3 else str(start)
+            art = "Entfall" if random.random() < 0.5 else "Vertretung"
+            rows.append([stunde, random.choice(lehrer), art])
+        tage.append(Tag(datum, [], f"tag{datum}", {}, ['Stunde', 'Lehrer', 'Art'],
+                        rows, f"vtable{datum}", "Unbekannt"))
+    vp_data = {'records': tage}
+
+    print(f"{'Stundenpläne':>12} {'naiv':>10} {'Index':>10} {'Aufbau':>10} {'Betroffene':>11}")
+    for anzahl in (100, 1000, 5000, 20000):
+        plaene = {
+            user: {tag: {stunde: random.choice(lehrer) for stunde in range(1, 11)
+                         if random.random() < 0.8}
+                   for tag in wochentage}
+            for user in range(anzahl)
+        }
+
+        start = time.perf_counter()
+        index = StundenplanIndex()
+        for user, plan in plaene.items():
+            index.add(user, plan)
+        aufbau = time.perf_counter() - start
+
+        start = time.perf_counter()
+        naiv = match_naiv(plaene, vp_data)
+        t_naiv = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = index.match(vp_data)
+        t_index = time.perf_counter() - start
+
+        assert result == naiv, "Index liefert andere Ausfälle als der naive Abgleich"
+        print(f"{anzahl:>12} {t_naiv * 1000:>8.1f}ms {t_index * 1000:>8.1f}ms "
+              f"{aufbau * 1000:>8.0f}ms {len(result):>11}")
+
+    print("\n✅ Index und naiver Abgleich liefern identische Ergebnisse")
+
+
+if __name__ == "__main__":
+    main()
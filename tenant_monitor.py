@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Tenant-Monitor
+Überwacht mehrere Abonnenten in einem Prozess: Abonnenten derselben Schule
+mit derselben Sichtbarkeit bilden eine Gruppe, pro Gruppe wird einmal
+abgerufen (höchstens max_parallel Gruppen gleichzeitig) und der Plan in
+einem Durchlauf mit den Stundenplänen (StundenplanIndex) und Regeln
+(RegelEngine) aller Mitglieder abgeglichen. Die Anzahl der Abrufe wächst
+mit der Anzahl der Schulen, nicht mit der Anzahl der Abonnenten.
+
+Abonnenten-Datei (JSON):
+    [{"id": 1234, "username": "max.mustermann", "password": "...",
+      "institution": "6081", "sichtbarkeit": "schueler",
+      "stundenplan": "Stundenplan_max.txt"},
+     {"id": 5678, "institution": "6081", "stundenplan": "Stundenplan_anna.txt",
+      "regeln": [{"klasse": "Q1", "art": "Raumänderung"}]}]
+
+Abonnenten ohne Zugangsdaten nutzen den Abruf ihrer Gruppe.
+"""
+
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from ausfall_store import open_store
+from regel_engine import RegelEngine, ausfaelle_aus_treffern
+from state_writer import StateWriter
+from stundenplan_checker import StundenplanChecker
+from stundenplan_index import StundenplanIndex
+
+DEFAULT_SICHTBARKEIT = 'schueler'
+
+
+class Abonnent:
+    """Ein überwachter Nutzer"""
+
+    __slots__ = ('id', 'username', 'password', 'institution', 'sichtbarkeit',
+                 'stundenplan_datei', 'tracking_datei', 'regeln')
+
+    def __init__(self, id: Hashable, institution: str = '6081', stundenplan: str = 'Stundenplan.txt',
+                 username: str = None, password: str = None, sichtbarkeit: str = DEFAULT_SICHTBARKEIT,
+                 tracking: str = None, regeln: List[dict] = ()):
+        """
+        Args:
+            id: Kennung (z.B. Discord-User-ID)
+            institution: Institutions-ID der Schule
+            stundenplan: Pfad zur Stundenplan-Datei des Abonnenten
+            username, password: Zugangsdaten (optional, wenn die Gruppe andere hat)
+            sichtbarkeit: Was das Konto sehen darf (z.B. schueler, lehrer) -
+                nur Abonnenten mit gleicher Sichtbarkeit teilen sich einen Abruf
+            tracking: Datei für gemeldete Ausfälle (Standard: known_ausfaelle_<id>.json)
+            regeln: Zusätzliche Regeln (siehe regel_engine, ohne "abonnent")
+        """
+        self.id = id
+        self.institution = str(institution)
+        self.stundenplan_datei = stundenplan
+        self.username = username
+        self.password = password
+        self.sichtbarkeit = sichtbarkeit
+        self.tracking_datei = tracking or f"known_ausfaelle_{id}.json"
+        self.regeln = [dict(regel, abonnent=id, id=regel.get('id', f"regel{i}"))
+                       for i, regel in enumerate(regeln)]
+
+    @property
+    def gruppe(self) -> Tuple[str, str]:
+        """Schlüssel der Abrufgruppe"""
+        return (self.institution, self.sichtbarkeit)
+
+    @property
+    def credentials(self) -> Optional[Tuple[str, str, str]]:
+        if self.username and self.password:
+            return (self.username, self.password, self.institution)
+        return None
+
+
+def load_abonnenten(path: str, id_typ: Callable = None) -> List[Abonnent]:
+    """
+    Lädt Abonnenten aus einer JSON-Datei (siehe Modul-Dokumentation)
+
+    Args:
+        path: Pfad zur Abonnenten-Datei
+        id_typ: Optionale Umwandlung der IDs (z.B. int für Discord-User-IDs)
+
+    Returns:
+        list: Abonnenten
+
+    Raises:
+        ValueError: bei fehlender, ungültiger oder doppelter ID
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        eintraege = json.load(f)
+
+    abonnenten = []
+    ids = set()
+    for nr, eintrag in enumerate(eintraege, 1):
+        if eintrag.get('id') in (None, ''):
+            raise ValueError(f"{path}: Abonnent {nr} hat keine id")
+        if id_typ is not None:
+            try:
+                eintrag = dict(eintrag, id=id_typ(eintrag['id']))
+            except (TypeError, ValueError):
+                raise ValueError(f"{path}: Abonnent {nr} hat eine ungültige id: {eintrag['id']!r}") from None
+        if eintrag['id'] in ids:
+            raise ValueError(f"{path}: id {eintrag['id']!r} ist doppelt vergeben")
+        ids.add(eintrag['id'])
+        abonnenten.append(Abonnent(**eintrag))
+    return abonnenten
+
+
+class TenantMonitor:
+    """Gemeinsame Abrufe und ein gemeinsamer Abgleich pro Gruppe"""
+
+    def __init__(self, pool, abonnenten: List[Abonnent], max_parallel: int = 2,
+                 writer: StateWriter = None):
+        """
+        Args:
+            pool: Objekt mit async scan(username, password, institution_id, timer=None,
+                input_signature=None) und commit(username, password, institution_id, vp_data)
+                (z.B. AsyncBrowserPool)
+            abonnenten: Überwachte Nutzer
+            max_parallel: Höchstzahl gleichzeitiger Abrufe
+            writer: Optionaler StateWriter für die Ausfall-Speicher
+        """
+        self.pool = pool
+        self.max_parallel = max_parallel
+        self.writer = writer
+        self.abonnenten: Dict[Hashable, Abonnent] = OrderedDict((a.id, a) for a in abonnenten)
+        self._checkers: Dict[Hashable, StundenplanChecker] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.last_plans: Dict[Tuple[str, str], dict] = {}
+        self.stats = {'abrufe': 0, 'fehlgeschlagen': 0, 'unveraendert': 0, 'abgleiche': 0,
+                      'fehler': 0}
+
+        # Pro Gruppe ein Index über die Stundenpläne und eine Engine für die Regeln
+        self._indexe: Dict[Tuple[str, str], StundenplanIndex] = {}
+        self._indexiert: Dict[Hashable, dict] = {}  # zuletzt eingetragener Stundenplan
+        self._regeln: Dict[Tuple[str, str], RegelEngine] = {}
+
+        for gruppe, mitglieder in self.gruppen().items():
+            if not any(a.credentials for a in mitglieder):
+                print(f"⚠️  Warnung: Gruppe {gruppe} hat keine Zugangsdaten und wird nicht abgerufen")
+            regeln = [regel for a in mitglieder for regel in a.regeln]
+            if regeln:
+                self._regeln[gruppe] = RegelEngine(regeln)
+
+    def gruppen(self) -> Dict[Tuple[str, str], List[Abonnent]]:
+        """{(institution, sichtbarkeit): [abonnenten]}"""
+        gruppen = OrderedDict()
+        for abonnent in self.abonnenten.values():
+            gruppen.setdefault(abonnent.gruppe, []).append(abonnent)
+        return gruppen
+
+    def checker(self, abonnent: Abonnent) -> StundenplanChecker:
+        """Checker des Abonnenten (einmal erstellt, lädt geänderte Dateien selbst neu)"""
+        if abonnent.id not in self._checkers:
+            self._checkers[abonnent.id] = StundenplanChecker(
+                stundenplan_datei=abonnent.stundenplan_datei,
+                tracking_datei=abonnent.tracking_datei,
+                store=open_store(abonnent.tracking_datei, writer=self.writer)
+            )
+        return self._checkers[abonnent.id]
+
+    def _index(self, gruppe: Tuple[str, str], mitglieder: List[Abonnent]) -> StundenplanIndex:
+        """Index der Gruppe, geänderte Stundenpläne werden neu eingetragen"""
+        index = self._indexe.setdefault(gruppe, StundenplanIndex())
+        for abonnent in mitglieder:
+            checker = self.checker(abonnent)
+            checker.reload_if_changed()
+            # reload_if_changed ersetzt den Stundenplan bei Änderungen durch ein neues Objekt
+            if self._indexiert.get(abonnent.id) is not checker.stundenplan:
+                index.add(abonnent.id, checker.stundenplan)
+                self._indexiert[abonnent.id] = checker.stundenplan
+        return index
+
+    def abgleich(self, gruppe: Tuple[str, str], mitglieder: List[Abonnent],
+                 vp_data: dict) -> Dict[Hashable, List[dict]]:
+        """
+        Ein Durchlauf über die Zeilen für alle Mitglieder der Gruppe
+
+        Returns:
+            dict: {abonnent_id: [ausfall, ...]} (ohne 'neu'), Regeltreffer
+                zusätzlich zu den Ausfällen aus dem Stundenplan
+        """
+        betroffene = self._index(gruppe, mitglieder).match(vp_data)
+        engine = self._regeln.get(gruppe)
+        if engine is not None:
+            for abonnent_id, treffer in engine.match(vp_data).items():
+                ausfaelle = betroffene.setdefault(abonnent_id, [])
+                # Schon über den Stundenplan gemeldete Stunden nicht doppelt melden
+                bekannt = {(a['datum'], a['stunde'], a['lehrer']) for a in ausfaelle}
+                ausfaelle.extend(a for a in ausfaelle_aus_treffern(treffer)
+                                 if (a['datum'], a['stunde'], a['lehrer']) not in bekannt)
+        return betroffene
+
+    async def _abruf(self, gruppe: Tuple[str, str], mitglieder: List[Abonnent],
+                     timer) -> Tuple[Optional[Tuple[str, str, str]], Optional[dict]]:
+        """
+        Ein Abruf für die Gruppe, bei Fehlern mit den nächsten Zugangsdaten
+
+        Returns:
+            tuple: (verwendete Zugangsdaten, vp_data) oder (None, None)
+        """
+        # Ändert sich der Stundenplan eines Mitglieds, wird auch ein unveränderter Plan abgeglichen
+        signature = tuple(self.checker(a).input_signature() for a in mitglieder)
+        async with self._semaphore:
+            for abonnent in mitglieder:
+                if abonnent.credentials is None:
+                    continue
+                self.stats['abrufe'] += 1
+                vp_data = await self.pool.scan(*abonnent.credentials, timer=timer,
+                                               input_signature=signature)
+                if vp_data:
+                    return abonnent.credentials, vp_data
+                self.stats['fehlgeschlagen'] += 1
+                print(f"⚠️  Abruf für Gruppe {gruppe} mit Konto {abonnent.username} fehlgeschlagen")
+        return None, None
+
+    async def _gruppe(self, gruppe, mitglieder, timer, on_neue_ausfaelle) -> Optional[bool]:
+        credentials, vp_data = await self._abruf(gruppe, mitglieder, timer)
+        if vp_data is None:
+            return None
+        if vp_data.get('unveraendert'):
+            self.stats['unveraendert'] += 1
+            return False
+
+        self.last_plans[gruppe] = vp_data
+        with timer.phase('check') if timer else nullcontext():
+            betroffene = self.abgleich(gruppe, mitglieder, vp_data)
+
+        # Fehler bei einem Abonnenten (Speicher, Benachrichtigung) treffen nur ihn
+        fehler = 0
+        for abonnent in mitglieder:
+            try:
+                ausfaelle = self.checker(abonnent).neue_markieren(betroffene.get(abonnent.id, []))
+                self.stats['abgleiche'] += 1
+                neue = [a for a in ausfaelle if a['neu']]
+                if neue and on_neue_ausfaelle is not None:
+                    await on_neue_ausfaelle(abonnent, neue, vp_data)
+            except Exception as e:
+                fehler += 1
+                self.stats['fehler'] += 1
+                print(f"⚠️  Abgleich für Abonnent {abonnent.id} fehlgeschlagen: {e}")
+
+        # Erst wenn alle Mitglieder abgeglichen sind, gilt der Plan als geprüft
+        if not fehler:
+            self.pool.commit(*credentials, vp_data)
+        return True
+
+    async def scan_all(self, timer=None,
+                       on_neue_ausfaelle: Callable[[Abonnent, List[dict], dict], Awaitable] = None) -> dict:
+        """
+        Ruft jede Gruppe einmal ab und gleicht für alle Mitglieder ab
+
+        Args:
+            timer: Optionaler PhaseTimer (Phasen aller Abrufe werden summiert)
+            on_neue_ausfaelle: Coroutine (abonnent, neue_ausfaelle, vp_data)
+
+        Returns:
+            dict: {gruppe: True (geprüft), False (unverändert) oder None (fehlgeschlagen)}
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_parallel)
+        gruppen = self.gruppen()
+        results = await asyncio.gather(*(
+            self._gruppe(gruppe, mitglieder, timer, on_neue_ausfaelle)
+            for gruppe, mitglieder in gruppen.items()
+        ))
+        return dict(zip(gruppen, results))
+
+
+def main():
+    """Test-Funktion: 3 Schulen mit je 20 Abonnenten, höchstens 2 Abrufe gleichzeitig"""
+    import contextlib
+    import io
+    import shutil
+    import tempfile
+    import time
+
+    folder = tempfile.mkdtemp()
+    stundenplan = os.path.join(folder, 'Stundenplan.txt')
+    with open(stundenplan, 'w', encoding='utf-8') as f:
+        f.write("Montag\nStunde 3 = Nie\n")
+    leer = os.path.join(folder, 'Leer.txt')
+    with open(leer, 'w', encoding='utf-8') as f:
+        f.write("Montag\n")
+
+    plan = {'zeitstempel': '2025-12-01T07:00:00', 'unveraendert': False, 'tage': [{
+        'datum': '01.12.2025', 'badges': [], 'panel_id': 'tag01_12_2025', 'informationen': {},
+        'letzte_aktualisierung': '', 'vertretungen': {
+            'headers': ['Stunde', 'Klasse', 'Vertreter', 'Lehrer', 'Art', 'Fach', 'Raum', 'Hinweis'],
+            'rows': [['3', 'Q1', '', 'Nie', 'Entfall', 'M', '', ''],
+                     ['5', 'Q1', 'Smi', 'Ori', 'Raumänderung', 'D', '027', '']],
+            'row_count': 2, 'table_id': 'v'}}]}
+
+    class FakePool:
+        def __init__(self):
+            self.calls = []
+            self.commits = []
+            self.running = 0
+            self.max_running = 0
+
+        async def scan(self, username, password, institution_id, timer=None, input_signature=None):
+            self.calls.append((username, institution_id))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            await asyncio.sleep(0.1)
+            self.running -= 1
+            return None if username == 'gesperrt' else plan
+
+        def commit(self, username, password, institution_id, vp_data):
+            self.commits.append(institution_id)
+
+    abonnenten = []
+    for schule in ('6081', '6082', '6083'):
+        for n in range(20):
+            eintrag = {}
+            if n == 0:
+                eintrag = {'username': 'gesperrt' if schule == '6083' else f"u{schule}", 'password': 'x'}
+            if n == 1:
+                eintrag = {'username': f"ersatz{schule}", 'password': 'x'}
+            if n == 2:
+                # Nur eine Regel, kein passender Stundenplan
+                eintrag = {'regeln': [{'klasse': 'Q1', 'art': 'Raumänderung'}]}
+            abonnenten.append(Abonnent(f"{schule}-{n}", schule, leer if n == 2 else stundenplan,
+                                       tracking=os.path.join(folder, f"known_{schule}_{n}.json"),
+                                       **eintrag))
+
+    pool = FakePool()
+    monitor = TenantMonitor(pool, abonnenten, max_parallel=2)
+    benachrichtigt = {}
+
+    async def on_neue(abonnent, neue, vp_data):
+        if abonnent.id == '6082-7':
+            raise RuntimeError("DMs geschlossen")
+        benachrichtigt[abonnent.id] = [(a['stunde'], a['lehrer']) for a in neue]
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = asyncio.run(monitor.scan_all(on_neue_ausfaelle=on_neue))
+    elapsed = time.perf_counter() - start
+
+    assert all(result.values())
+    assert len(benachrichtigt) == 59, "Ein fehlerhafter Abonnent bricht die Gruppe nicht ab"
+    assert benachrichtigt['6081-2'] == [(5, 'Ori')] and benachrichtigt['6081-3'] == [(3, 'Nie')]
+    assert pool.max_running <= 2
+    assert ('ersatz6083', '6083') in pool.calls, "Fehlgeschlagenes Konto wird durch das nächste ersetzt"
+    assert sorted(pool.commits) == ['6081', '6083'], "Gruppe mit Fehler bleibt ungeprüft"
+    print(f"🏫 60 Abonnenten in 3 Schulen: {len(pool.calls)} Abrufe (davon 1 Ersatzkonto), "
+          f"höchstens {pool.max_running} gleichzeitig, {elapsed:.2f}s")
+    print(f"📊 {monitor.stats}")
+
+    # IDs werden beim Laden geprüft
+    path = os.path.join(folder, 'abonnenten.json')
+    for eintraege in ([{'id': 'max'}], [{'id': 1}, {'id': '1'}], [{'institution': '6081'}]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(eintraege, f)
+        try:
+            load_abonnenten(path, id_typ=int)
+            raise AssertionError(f"Ungültige IDs angenommen: {eintraege}")
+        except ValueError as e:
+            print(f"🚫 {e}")
+    shutil.rmtree(folder)
+    print("\n✅ Tenant-Monitor funktioniert")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Vertretungs-Modell
+Kompakte Datensätze für Tage und Vertretungszeilen: Stunden, Datum und
+Lehrerkürzel werden beim Parsen einmal aufbereitet statt bei jeder Nutzung
+"""
+
+import re
+import sys
+from collections.abc import Sequence
+from datetime import date, datetime
+from typing import Optional, Tuple
+
+WOCHENTAGE_DE = {
+    0: "Montag",
+    1: "Dienstag",
+    2: "Mittwoch",
+    3: "Donnerstag",
+    4: "Freitag",
+    5: "Samstag",
+    6: "Sonntag"
+}
+
+DATUM_PATTERN = re.compile(r'(\d{2}\.\d{2}\.\d{4})')
+KEINE_STUNDEN = range(0)
+
+
+def parse_datum(datum_str: str) -> Tuple[str, Optional[date]]:
+    """
+    Parst das Datum aus dem Panel-Heading
+
+    Args:
+        datum_str: Datum-String (z.B. "01.12.2025heute49.")
+
+    Returns:
+        Tuple: (sauberes Datum "01.12.2025" bzw. datum_str, date oder None)
+    """
+    datum_clean = ""
+    for part in datum_str.split():
+        if '.' in part and len(part) >= 8:
+            match = DATUM_PATTERN.search(part)
+            if match:
+                datum_clean = match.group(1)
+                break
+
+    if not datum_clean:
+        datum_clean = datum_str
+
+    try:
+        return datum_clean, datetime.strptime(datum_clean, '%d.%m.%Y').date()
+    except ValueError:
+        return datum_clean, None
+
+
+def parse_stunden(stunde_str: str) -> range:
+    """
+    Parst die Stundenangabe einer Zeile
+
+    Args:
+        stunde_str: "3" oder "9 - 10"
+
+    Returns:
+        range: Betroffene Stunden (leer wenn nicht lesbar)
+    """
+    stunde_str = stunde_str.strip()
+    try:
+        if '-' in stunde_str:
+            parts = stunde_str.split('-')
+            return range(int(parts[0].strip()), int(parts[1].strip()) + 1)
+        stunde = int(stunde_str)
+        return range(stunde, stunde + 1)
+    except ValueError:
+        return KEINE_STUNDEN
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value.strip()) if value is not None else None
+
+
+class Vertretung:
+    """Eine Zeile des Vertretungsplans mit vorab geparsten Feldern"""
+
+    __slots__ = ('values', 'stunden', 'lehrer', 'art', '_columns')
+
+    def __init__(self, values: tuple, columns: dict):
+        """
+        Args:
+            values: Zellen der Zeile in Spaltenreihenfolge
+            columns: {Spaltenname: Index}, von allen Zeilen eines Tages geteilt
+        """
+        self.values = values
+        self._columns = columns
+        stunde = self.get('Stunde')
+        self.stunden = parse_stunden(stunde) if stunde is not None else KEINE_STUNDEN
+        self.lehrer = _intern(self.get('Lehrer'))
+        self.art = _intern(self.get('Art'))
+
+    def get(self, field: str, default=None):
+        """Liefert eine Zelle über den Spaltennamen"""
+        index = self._columns.get(field)
+        if index is None or index >= len(self.values):
+            return default
+        return self.values[index]
+
+    @property
+    def ist_entfall(self) -> bool:
+        """True wenn die Art der Vertretung ein Entfall ist"""
+        return self.art is not None and 'Entfall' in self.art
+
+    def to_row(self) -> list:
+        """Exportiert die Zeile im bisherigen Format (Liste von Strings)"""
+        return list(self.values)
+
+    def __repr__(self):
+        return f"Vertretung({', '.join(self.values)})"
+
+
+class Tag:
+    """Ein Tag des Vertretungsplans mit seinen Vertretungen"""
+
+    __slots__ = ('datum_text', 'datum', 'date', 'badges', 'panel_id', 'informationen',
+                 'headers', 'table_id', 'vertretungen', 'letzte_aktualisierung', 'columns')
+
+    def __init__(self, datum_text: str, badges, panel_id: str, informationen: dict,
+                 headers, rows, table_id: Optional[str], letzte_aktualisierung: str):
+        """
+        Args:
+            datum_text: Datum wie aus dem Heading extrahiert
+            badges: Badges des Tages (heute, morgen, ...)
+            panel_id: ID des Panels
+            informationen: abwesende_lehrer, hinweis, entfall_klassen
+            headers: Spaltennamen oder None, wenn der Tag keine Tabelle hat
+            rows: Zeilen als Listen von Strings
+            table_id: ID der Tabelle
+            letzte_aktualisierung: Text der letzten Aktualisierung
+        """
+        self.datum_text = datum_text
+        self.datum, self.date = parse_datum(datum_text)
+        self.badges = tuple(badges)
+        self.panel_id = panel_id
+        self.informationen = informationen
+        self.headers = tuple(headers) if headers is not None else None
+        self.table_id = table_id
+        self.letzte_aktualisierung = letzte_aktualisierung
+        self.columns = {name: i for i, name in enumerate(self.headers or ())}
+        # Zellen wiederholen sich stark (Kürzel, Klassen, Art) - daher interniert
+        self.vertretungen = tuple(
+            Vertretung(tuple(sys.intern(cell) for cell in row), self.columns) for row in rows
+        )
+
+    @classmethod
+    def from_dict(cls, day: dict) -> 'Tag':
+        """Baut einen Tag aus dem Format von extract_all_days"""
+        table = day.get('vertretungen')
+        return cls(
+            datum_text=day.get('datum', 'Unbekannt'),
+            badges=day.get('badges', []),
+            panel_id=day.get('panel_id', ''),
+            informationen=day.get('informationen', {}),
+            headers=table['headers'] if table else None,
+            rows=table['rows'] if table else [],
+            table_id=table['table_id'] if table else None,
+            letzte_aktualisierung=day.get('letzte_aktualisierung', 'Unbekannt')
+        )
+
+    @property
+    def wochentag(self) -> str:
+        """Wochentag auf Deutsch oder "Unbekannt" """
+        return WOCHENTAGE_DE[self.date.weekday()] if self.date else "Unbekannt"
+
+    def entfaelle(self) -> list:
+        """Alle Zeilen, deren Art ein Entfall ist"""
+        return [v for v in self.vertretungen if v.ist_entfall]
+
+    def to_dict(self) -> dict:
+        """Exportiert den Tag im Format von extract_all_days"""
+        table = None
+        if self.headers is not None:
+            table = {
+                'headers': list(self.headers),
+                'rows': [v.to_row() for v in self.vertretungen],
+                'row_count': len(self.vertretungen),
+                'table_id': self.table_id
+            }
+        return {
+            'datum': self.datum_text,
+            'badges': list(self.badges),
+            'panel_id': self.panel_id,
+            'informationen': dict(self.informationen),
+            'vertretungen': table,
+            'letzte_aktualisierung': self.letzte_aktualisierung
+        }
+
+    def __repr__(self):
+        return f"Tag({self.wochentag}, {self.datum}, {len(self.vertretungen)} Vertretung(en))"
+
+
+class TageAnsicht(Sequence):
+    """
+    Die Tage eines Abrufs im Dictionary-Format, erst beim Zugriff aus den
+    Tag-Objekten exportiert (Wert von 'tage' im Ergebnis)
+
+    Jeder Zugriff liefert neue Dictionaries; Änderungen daran wirken nicht
+    auf das Ergebnis zurück. Eine echte Liste liefert list(...) bzw. tage_dicts.
+    """
+
+    __slots__ = ('_records',)
+
+    def __init__(self, records: list):
+        self._records = records
+
+    def __len__(self):
+        return len(self._records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [tag.to_dict() for tag in self._records[index]]
+        return self._records[index].to_dict()
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, TageAnsicht)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"TageAnsicht({len(self)} Tage)"
+
+
+def tage_from_result(vertretungsplan_data: dict) -> list:
+    """
+    Liefert die Tage eines Abrufs als Tag-Objekte
+
+    Nutzt die beim Parsen gebauten 'records', sonst werden sie aus 'tage' erzeugt.
+
+    Args:
+        vertretungsplan_data: Ergebnis von get_vertretungsplan
+
+    Returns:
+        list: Liste von Tag-Objekten
+    """
+    records = vertretungsplan_data.get('records')
+    if records is not None:
+        return records
+    return [Tag.from_dict(day) for day in vertretungsplan_data.get('tage', [])]
+
+
+def tage_dicts(vertretungsplan_data: dict) -> list:
+    """
+    Liefert die Tage eines Abrufs im Dictionary-Format von extract_all_days
+
+    Die Dictionaries werden bei jedem Aufruf aus den 'records' exportiert und
+    nicht im Ergebnis gehalten (für TXT-Datei, Archiv und JSON-Ausgabe).
+
+    Args:
+        vertretungsplan_data: Ergebnis von get_vertretungsplan
+
+    Returns:
+        list: Liste mit Dictionaries für jeden Tag
+    """
+    records = vertretungsplan_data.get('records')
+    if records is None:
+        return list(vertretungsplan_data.get('tage', []))
+    return [tag.to_dict() for tag in records]
+
+
+def main():
+    """Test-Funktion: Export-Parität und Speicherbedarf gegenüber den Dictionaries"""
+    import tracemalloc
+
+    from parser_engines import SAMPLE_HTML
+    from schulportal_lib import parse_days
+
+    days = parse_days(SAMPLE_HTML)
+    tage = [Tag.from_dict(day) for day in days]
+    assert [tag.to_dict() for tag in tage] == days, "Export weicht vom Dictionary-Format ab"
+    ansicht = TageAnsicht(tage)
+    assert ansicht == days and ansicht[-1] == days[-1] and ansicht[:1] == days[:1]
+    for tag in tage:
+        print(f"   {tag!r}")
+        for v in tag.vertretungen:
+            print(f"      Stunden {list(v.stunden)}, Lehrer {v.lehrer}, Entfall: {v.ist_entfall}")
+
+    # Verlauf: viele Abrufe im Speicher halten (jeder Abruf mit frisch geparsten Strings)
+    tracemalloc.start()
+    history = [parse_days(SAMPLE_HTML) for _ in range(200)]
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del history
+
+    tracemalloc.start()
+    history = [[Tag.from_dict(day) for day in parse_days(SAMPLE_HTML)] for _ in range(200)]
+    record_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del history
+
+    print(f"\n📦 200 Abrufe: Dictionaries {dict_bytes / 1024:.0f} KB, "
+          f"Tag-Objekte {record_bytes / 1024:.0f} KB")
+    print("\n✅ Tag-Objekte exportieren das bisherige Format unverändert")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,13 @@ from datetime import datetime
 import os
 
 # Importieren meiner Schulportal_Library
-from schulportal_lib import login, get_vertretungsplan
+from schulportal_lib import fetch_vertretungsplan, load_session_state, session_state_path
 from stundenplan_checker import StundenplanChecker
+from lean_profile import LeanProfile, enable_lean_mode
+from change_detector import ChangeDetector
+from snapshot_archive import SnapshotArchive
+from notifier import Notifier, sinks_from_env
+from vertretung_model import tage_dicts
 
 
 def save_vertretungsplan_txt(data: dict, Vertretungsplan_saves: str = 'Vertretungsplan_saves') -> str:
@@ -34,7 +39,7 @@ def save_vertretungsplan_txt(data: dict, Vertretungsplan_saves: str = 'Vertretun
         # Zeit des Abrufs
         f.write(f"Abgerufen: {data['zeitstempel']}\n")
         
-        for day in data['tage']:
+        for day in tage_dicts(data):
             f.write("=" * 70 + "\n")
             f.write(f"DATUM: {day['datum']}\n")
             
@@ -86,48 +91,79 @@ def main():
         browser = p.chromium.launch(
             headless=True      
         )
-        page = browser.new_page()
+        # Gespeicherte Session wiederverwenden, Login nur wenn sie abgelaufen ist
+        session_file = session_state_path(USERNAME, INSTITUTION_ID)
+        context = browser.new_context(storage_state=load_session_state(session_file))
+        
+        # Optional: Bilder, Fonts, Stylesheets und fremde Hosts blockieren
+        lean = None
+        if os.getenv('SCHULPORTAL_LEAN', '0') == '1':
+            lean = LeanProfile(calibrate_every=0)
+            lean.start_scan()
+            enable_lean_mode(context, lean)
+        page = context.new_page()
+        
+        checker = StundenplanChecker(tracking_datei=os.getenv('AUSFALL_STORE_DATEI', 'known_ausfaelle.json'))
+        
+        # Fingerabdruck des letzten geprüften Laufs: unveränderte Seiten werden nicht erneut
+        # ausgewertet, solange sich auch der Stundenplan nicht geändert hat
+        detector = None
+        if os.getenv('SCHULPORTAL_SKIP_UNCHANGED', '1') == '1':
+            detector = ChangeDetector(os.path.splitext(session_file)[0] + '.fingerprint.json')
+            detector.input_signature = checker.input_signature()
         
         try:
-            # Login durchführen
-            if not login(page, USERNAME, PASSWORD, INSTITUTION_ID):
-                print("\n❌ Abbruch wegen Login-Fehler")
-                return
-            
             # Vertretungsplan get funktion aus Library abrufen
-            Vertretungsplan_Inhalt = get_vertretungsplan(page)
+            Vertretungsplan_Inhalt = fetch_vertretungsplan(
+                page, USERNAME, PASSWORD, INSTITUTION_ID, session_file=session_file,
+                detector=detector
+            )
             
             if not Vertretungsplan_Inhalt:
                 print("\n❌ Abbruch - Fehler beim Abrufen vom Vertretungsplan")
                 return
             
-            # Vertretungsplan speichern Funktion aufrufen
-            txt_file = save_vertretungsplan_txt(Vertretungsplan_Inhalt)
-            print(f"✅ TXT-Datei gespeichert: {txt_file}")
+            if lean:
+                lean.report()
+            
+            if Vertretungsplan_Inhalt['unveraendert']:
+                print("\n✅ Vertretungsplan unverändert seit dem letzten Lauf - nichts zu tun")
+                return
+            
+            # Vertretungsplan archivieren (jeder unterschiedliche Tag nur einmal, komprimiert)
+            # (alte Stände entfallen nach ARCHIV_AUFBEWAHRUNG_TAGE)
+            archive = SnapshotArchive()
+            if archive.add_and_compact(Vertretungsplan_Inhalt):
+                print(f"✅ Archiv aktualisiert: {archive.folder}")
+            
+            # Optional zusätzlich wie bisher als TXT-Datei
+            if os.getenv('VERTRETUNGSPLAN_TXT', '0') == '1':
+                txt_file = save_vertretungsplan_txt(Vertretungsplan_Inhalt)
+                print(f"✅ TXT-Datei gespeichert: {txt_file}")
             
             # Stundenplan-Abgleich durchführen
             print("\n" + "=" * 70)
             print("STARTE STUNDENPLAN-ABGLEICH")
             print("=" * 70)
             
-            checker = StundenplanChecker()
             relevante_ausfaelle = checker.check_vertretungsplan(Vertretungsplan_Inhalt)
             
             # Zusätzliche Ausgabe für neue Ausfälle
             neue_ausfaelle = [a for a in relevante_ausfaelle if a['neu']]
             
+            zugestellt = True
             if neue_ausfaelle:
-                print("\n" + "🚨" * 35)
-                print("WICHTIG: NEUE AUSFÄLLE IN DEINEM STUNDENPLAN!")
-                print("🚨" * 35)
-                for ausfall in neue_ausfaelle:
-                    print(f"📅 {ausfall['wochentag']}, {ausfall['datum']}")
-                    print(f"   ⏰ Stunde {ausfall['stunde']}")
-                    print(f"   👨‍🏫 Lehrer: {ausfall['lehrer']}")
-                    print()
+                # Konsole plus weitere Ziele aus NOTIFY_SINKS, alle gleichzeitig
+                notifier = Notifier(sinks_from_env(stdout=True))
+                ergebnis = notifier.notify_sync(neue_ausfaelle, zeitstempel=Vertretungsplan_Inhalt['zeitstempel'])
+                zugestellt = all(status == 'ok' for status in ergebnis.values())
             else:
                 print("\n✅ Keine neuen Ausfälle in deinem Stundenplan!")
             
+            # Erst jetzt gilt diese Seite als geprüft (bei Fehlern prüft der nächste Lauf erneut)
+            if detector and zugestellt:
+                detector.commit(Vertretungsplan_Inhalt['fingerprint'])
+            
         finally:
             browser.close()
     